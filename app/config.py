@@ -6,13 +6,37 @@ used in the code
 import datetime
 
 URL = 'http://www.fifeweather.co.uk/cowdenbeath/200606.csv'
-CHUNK_SIZE = 1024
+SOURCES = [] # URLs, paths or glob patterns of several sources in time order, that do not overlap in time (they may split a day), overrides URL
+SOURCE_WORKERS = 4 # sources processed concurrently
+READ_SIZE = 64 * 1024 # bytes per read from the network or disk (and per decompression step)
+CHUNK_ROWS = 1024 # rows per data chunk
+CHUNK_BYTES = None # approximate memory per parsed data chunk in bytes, overrides CHUNK_ROWS
+PREFETCH_DEPTH = 2 # chunks fetched and transformed ahead in the background, 0 disables
+IN_FLIGHT_CHUNKS = 4 # chunks dispatched to the workers before the oldest is collected, 1 waits for each chunk
+FUSE_TASKS = True # one message per chunk for all the mapped tasks, False sends one per task
+EXECUTOR = 'celery' # runs the tasks: 'celery' (needs a broker), 'threads', 'processes' or 'inline'
+EXECUTOR_WORKERS = None # size of the thread or process pool, the number of CPUs if None
+SHARED_MEMORY = True # the 'processes' executor passes the numeric chunk columns in shared memory instead of pickling them
+COMPACT = False # float32 temperatures in the data chunks, logs the memory saved per chunk
+PARSER_ENGINE = 'pandas' # CSV parser backend: 'pandas', 'pyarrow' or 'csv'
+CSV_ENCODING = 'ISO-8859-1' # what requests assumes for text/* responses
+DOWNLOAD_WORKERS = 1 # >1 downloads byte ranges of the file concurrently
+DOWNLOAD_SEGMENT_SIZE = 8 * 1024 * 1024 # bytes per range request
+DOWNLOAD_IN_ORDER = True # False yields segments as soon as they complete
+DOWNLOAD_RETRIES = 5 # attempts to resume the download after a dropped connection
+RETRY_BACKOFF = 1 # seconds before the first retry, doubled on every retry
+RETRY_BACKOFF_MAX = 30 # upper bound of the wait between retries in seconds
+CACHE_DIR = None # directory of the raw source cache, None disables the cache
+CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024 # least recently used files are evicted above this
 OUTPUT_DIR = './output'
 T1_FILE_NAME = 'task1'
 T2_FILE_NAME = 'task2'
 T3_FILE_NAME = 'task3'
+TASKS = [] # names of the registered tasks to be run, all of them if empty
+PROGRESS_FILE_NAME = 'progress' # position in the source at each checkpoint
 FILE_EXTENSION = '.txt'
 SAVE_CKPT_EVERY = 1 # save result checkpoint after every 1 iteration
+RESUME = False # continue from the last checkpoint in OUTPUT_DIR
 LOGGING_LEVEL = 'INFO'
 
 # column names that are required in the CSV file for the tasks
@@ -26,6 +50,9 @@ NUMERIC_COL_NAMES = [
     'Outside Temperature', 'Hi Temperature', 'Low Temperature',
 ]
 
+# times are represented as minutes since midnight
+MINUTES_PER_DAY = 24 * 60
+
 # constants used for Task 1
 T1_COL_NAME = 'Outside Temperature'
 T1_COUNT_OF_TOP_HOTTEST_DAYS = 10
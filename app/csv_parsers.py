@@ -0,0 +1,284 @@
+"""
+Contains the parser backends that convert blocks of raw CSV bytes into
+Pandas DataFrames. Every backend takes a block of complete CSV lines
+(without the header row) as `bytes` or as a `memoryview` of a
+memory-mapped file, the column names read from the header row and an
+optional projection. Only the `pyarrow` backend reads a `memoryview`
+in place; the `pandas` and `csv` backends copy the block into their
+own buffers before it is tokenized.
+
+A projection is a dict of the column names that are to be kept mapped
+to the type they are parsed to (`'float64'` or `'str'`), eg:
+    {'Date': 'str', 'Outside Temperature': 'float64'}
+Columns that are not in the projection are skipped by the parser and
+are never converted to Python objects
+"""
+
+import csv
+import io
+import typing as ty
+
+import pandas as pd
+
+from app import config
+from app import custom_exceptions as ce
+from app import decorators
+
+
+@decorators.log_method
+def parse_header(header: bytes) -> ty.List[str]:
+    """
+    Parses the header row of the CSV and returns the column names
+
+    Args:
+        header (bytes): the first line of the CSV data
+
+    Returns:
+        col_names (list): the column names in the header row
+
+    Raises:
+        - `csv.Error` if the header row is not valid CSV
+    """
+
+    line = header.decode(config.CSV_ENCODING).rstrip('\r\n')
+    col_names = next(csv.reader([line]), [])
+    return col_names
+
+@decorators.log_method
+def get_projected_columns(
+    col_names: ty.List[str], projection: ty.Optional[ty.Dict[str, str]]
+) -> ty.Tuple[ty.List[int], ty.List[str], ty.Dict[int, str]]:
+    """
+    Returns the positions, names and types of the projected columns in
+    the order in which they appear in the CSV header row
+
+    Args:
+        col_names (list): the column names of the CSV data
+        projection (dict | None): projected column names and their types
+
+    Returns:
+        (positions, names, dtypes):
+        - `positions` (list): position of each projected column
+        - `names` (list): name of each projected column
+        - `dtypes` (dict): type of each projected column by position
+    """
+
+    if projection is None:
+        positions = list(range(len(col_names)))
+        return positions, list(col_names), {}
+
+    positions = [i for i, name in enumerate(col_names) if name in projection]
+    names = [col_names[i] for i in positions]
+    dtypes = {i: projection[col_names[i]] for i in positions}
+    return positions, names, dtypes
+
+@decorators.log_method
+def parse_with_csv_module(
+    block: bytes,
+    col_names: ty.List[str],
+    projection: ty.Optional[ty.Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """
+    Parses the CSV block row by row using the `csv` module of the
+    standard library. Without a projection, every value in the returned
+    DataFrame is a string
+
+    This is the slowest backend and is kept for CSV files that the
+    other backends cannot parse
+
+    Args:
+        block (bytes): complete CSV lines that are to be parsed
+        col_names (list): the column names of the CSV data
+        projection (dict | None): projected column names and their types
+
+    Returns:
+        (DataFrame): the parsed block
+
+    Raises:
+        - `csv.Error` if the block is not valid CSV
+        - `ValueError` if the rows do not have one value for each column
+        or a projected value cannot be converted to its type
+    """
+
+    lines = str(block, config.CSV_ENCODING).splitlines()
+    rows = list(csv.reader(lines, strict=True))
+    if projection is None:
+        return pd.DataFrame(columns=col_names, data=rows)
+
+    positions, names, dtypes = get_projected_columns(col_names, projection)
+    for row in rows:
+        if len(row) != len(col_names):
+            raise ValueError(
+                f'{len(col_names)} columns passed, passed data had '
+                f'{len(row)} columns'
+            )
+    dframe = pd.DataFrame(
+        columns=names, data=[[row[i] for i in positions] for row in rows]
+    )
+    for pos, name in zip(positions, names):
+        if dtypes[pos] != 'str':
+            # empty strings are missing values, as in the other backends
+            dframe[name] = dframe[name].replace('', None).astype(dtypes[pos])
+    return dframe
+
+@decorators.log_method
+def parse_with_pandas(
+    block: bytes,
+    col_names: ty.List[str],
+    projection: ty.Optional[ty.Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """
+    Parses the CSV block in one call to the C engine of `pd.read_csv`.
+    The values are tokenized in C. Without a projection the column types
+    are inferred while parsing, i.e. numeric columns are returned as
+    numbers. With a projection, the other columns are skipped by the
+    tokenizer and the projected columns are converted to their types.
+    The C engine reads from a file object, so a `memoryview` block is
+    copied once into a `BytesIO` (a `bytes` block is shared, not copied)
+
+    Args:
+        block (bytes | memoryview): complete CSV lines that are to be
+            parsed
+        col_names (list): the column names of the CSV data
+        projection (dict | None): projected column names and their types
+
+    Returns:
+        (DataFrame): the parsed block
+
+    Raises:
+        - `ValueError` if the block is not valid CSV, the rows do not
+        have one value for each column or a projected value cannot be
+        converted to its type
+    """
+
+    positions, names, dtypes = get_projected_columns(col_names, projection)
+    # names are not passed to read_csv because it silently moves the
+    # extra values to the index (or drops them) when rows are wider
+    # than the header row
+    dframe = pd.read_csv(
+        io.BytesIO(block), header=None, engine='c',
+        encoding=config.CSV_ENCODING,
+        usecols=positions if projection is not None else None,
+        dtype=dtypes or None,
+    )
+    check_column_count(dframe, names)
+    dframe.columns = names
+    return dframe
+
+@decorators.log_method
+def parse_with_pyarrow(
+    block: bytes,
+    col_names: ty.List[str],
+    projection: ty.Optional[ty.Dict[str, str]] = None,
+) -> pd.DataFrame:
+    """
+    Parses the CSV block with the multithreaded CSV reader of `pyarrow`
+    and converts the resulting Arrow table to a DataFrame. The block is
+    wrapped in an Arrow buffer, so a `memoryview` of a memory-mapped
+    file is read in place, without copying it.
+    Without a projection the column types are inferred while parsing.
+    With a projection, only the projected columns are converted
+
+    `pyarrow` is an optional dependency and is imported only when this
+    backend is used
+
+    Args:
+        block (bytes | memoryview): complete CSV lines that are to be
+            parsed
+        col_names (list): the column names of the CSV data
+        projection (dict | None): projected column names and their types
+
+    Returns:
+        (DataFrame): the parsed block
+
+    Raises:
+        - `InvalidConfigError` if `pyarrow` is not installed
+        - `ValueError` if the block is not valid CSV, the rows do not
+        have one value for each column or a projected value cannot be
+        converted to its type
+    """
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError as err:
+        raise ce.InvalidConfigError(
+            'The `pyarrow` parser backend requires the `pyarrow` package '
+            'which is not installed'
+        ) from err
+
+    positions, names, dtypes = get_projected_columns(col_names, projection)
+    arrow_types = {'float64': pa.float64(), 'str': pa.string()}
+    convert_options = pa_csv.ConvertOptions()
+    if projection is not None:
+        # autogenerated column names are `f0`, `f1`, ...
+        convert_options = pa_csv.ConvertOptions(
+            include_columns=[f'f{i}' for i in positions],
+            column_types={f'f{i}': arrow_types[dtypes[i]] for i in positions},
+        )
+
+    try:
+        table = pa_csv.read_csv(
+            pa.BufferReader(block),
+            read_options=pa_csv.ReadOptions(
+                autogenerate_column_names=True,
+                encoding=config.CSV_ENCODING,
+            ),
+            convert_options=convert_options,
+        )
+    except pa.ArrowInvalid as err:
+        raise ValueError(str(err)) from err
+
+    dframe = table.to_pandas()
+    check_column_count(dframe, names)
+    dframe.columns = names
+    return dframe
+
+@decorators.log_method
+def check_column_count(data: pd.DataFrame, col_names: ty.List[str]) -> None:
+    """
+    Checks that the parsed data has one column for each column name
+
+    Args:
+        data (DataFrame): the parsed CSV data
+        col_names (list): the column names of the CSV data
+
+    Raises:
+        - `ValueError` if the number of columns does not match
+    """
+
+    if len(data.columns) != len(col_names):
+        raise ValueError(
+            f'{len(col_names)} columns passed, passed data had '
+            f'{len(data.columns)} columns'
+        )
+
+PARSER_BACKENDS = {
+    'csv': parse_with_csv_module,
+    'pandas': parse_with_pandas,
+    'pyarrow': parse_with_pyarrow,
+}
+
+@decorators.log_method
+def get_parser(name: str) -> ty.Callable[..., pd.DataFrame]:
+    """
+    Returns the parser backend function registered with `name`
+
+    Args:
+        name (str): name of the parser backend
+
+    Returns:
+        (callable): the parser backend function
+
+    Raises:
+        - `InvalidConfigError` if no parser backend is registered with
+        the specified name
+    """
+
+    if name not in PARSER_BACKENDS:
+        raise ce.InvalidConfigError(
+            f'Unknown parser backend `{name}`. '
+            f'Supported backends: {list(PARSER_BACKENDS)}'
+        )
+    return PARSER_BACKENDS[name]
@@ -27,3 +27,10 @@ class UnSupporterdDataTypeError(Exception):
         to number but a value is encountered that is non numeric
     """
     pass
+
+class InvalidConfigError(Exception):
+    """
+    Raised when a configuration value is not supported, eg: the name of
+    a backend that does not exist or a required package that is missing
+    """
+    pass
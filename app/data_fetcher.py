@@ -1,28 +1,127 @@
 """
 This file contains functions that perform operations to fetch data from
-the internet
+the internet or from local files
 """
 
 import csv
+import functools
+import glob
 import logging
+import mmap
+import os
+import time
 import typing as ty
-from collections import deque
+import urllib.parse
+import urllib.request
+from concurrent import futures
 
+import numpy as np
 import pandas as pd
 import requests
 
 from app import config
+from app import csv_parsers
 from app import custom_exceptions as ce
-from app import decorators, validator
+from app import decompression
+from app import decorators, source_cache, validator
 
+# errors after which the download is resumed from the last chunk
+RETRYABLE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+
+# bytes of a memory-mapped file that are searched for line breaks at once
+LOCAL_SCAN_SIZE = 1024 * 1024
+
+@decorators.log_method
+def get_local_path(url: str) -> ty.Optional[str]:
+    """
+    Returns the path of the local file that the URL refers to, i.e. the
+    path of a `file://` URI or the URL itself if it is the path of an
+    existing file
+
+    Args:
+        url (str): a URL, `file://` URI or file path
+
+    Returns:
+        (str | None): the file path, or None if the URL is not local
+    """
+
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == 'file':
+        return urllib.request.url2pathname(parsed.path)
+    if os.path.isfile(url):
+        return url
+    return None
+
+@decorators.log_method
+def is_read_in_order() -> bool:
+    """
+    Returns whether the chunks of a source are read in the order of the
+    source, i.e. the byte ranges are not yielded as soon as they complete
+    (see `config.DOWNLOAD_IN_ORDER`). Only then can a run be resumed
+
+    Returns:
+        (bool): True if the chunks are in the order of the source
+    """
+
+    return config.DOWNLOAD_IN_ORDER or config.DOWNLOAD_WORKERS == 1
+
+@decorators.log_method
+def expand_sources(sources: ty.List[str]) -> ty.List[str]:
+    """
+    Expands the wildcard patterns (`*`, `?` and `[...]`) of local paths
+    and `file://` URIs in a list of sources into the sorted list of the
+    matching files, eg: `data/2006*.csv` -> `data/200601.csv`, ...
+    Remote URLs are kept as they are
+
+    Args:
+        sources (list): URLs, `file://` URIs, file paths or patterns
+
+    Returns:
+        (list): the sources with the patterns expanded
+
+    Raises:
+        - `InvalidConfigError` if a pattern does not match any file
+    """
+
+    expanded = []
+    for source in sources:
+        parsed = urllib.parse.urlparse(source)
+        is_local = parsed.scheme in ('', 'file') or os.path.isabs(source)
+        if not is_local or not glob.has_magic(source):
+            expanded.append(source)
+            continue
+
+        pattern = source
+        if parsed.scheme == 'file':
+            pattern = urllib.request.url2pathname(parsed.path)
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            err = ce.InvalidConfigError(f'No files match `{source}`')
+            logging.error('Invalid source\n%s', str(err))
+            raise err
+        expanded.extend(matches)
+    return expanded
 
 @decorators.log_method
-def get_data_stream(url: str) -> ty.Iterator:
+def get_data_stream(url: str, byte_offset: int = 0) -> ty.Iterator:
     """
-    Returns a GET stream of the specified URL
+    Returns a GET stream of the specified URL. If `byte_offset` is set,
+    the stream is requested from that byte onwards with a `Range`
+    header; the caller has to check for status code 206 since servers
+    may ignore the header and send the whole file
+
+    If `config.CACHE_DIR` is set and the URL is in the source cache, the
+    cached file is revalidated with a conditional GET and, if the server
+    responds 304 (Not Modified), it is read from the disk instead.
+    Complete downloads from the start of the file are added to the cache
 
     Args:
         url (str): The URL to retrieve the data stream from
+        byte_offset (int): index of the first byte to be requested
 
     Returns:
         Iterator: An iterator yielding the data stream
@@ -31,17 +130,752 @@ def get_data_stream(url: str) -> ty.Iterator:
         - `requests.exceptions.RequestException`: If an error occurs while
         making a GET request to the specified URL
     """
-    return requests.get(url, stream=True, timeout=60)
+    headers = {}
+    if byte_offset:
+        # ranges of compressed responses do not match the file offsets
+        headers = {'Range': f'bytes={byte_offset}-',
+                   'Accept-Encoding': 'identity'}
+    if config.CACHE_DIR is None:
+        return requests.get(url, stream=True, timeout=60, headers=headers)
+
+    entry = source_cache.get_cache_entry(url)
+    if entry is not None:
+        headers.update(source_cache.get_conditional_headers(entry))
+    response = requests.get(url, stream=True, timeout=60, headers=headers)
+    if entry is not None and response.status_code == 304:
+        response.close()
+        return source_cache.open_cached_stream(url, entry, byte_offset)
+    if response.status_code == 200 and not byte_offset:
+        return source_cache.CachingStream(response, url)
+    return response
+
+@decorators.log_method
+def get_byte_chunks(url: str, byte_offset: int = 0) -> ty.Iterator[bytes]:
+    """
+    Returns an iterator over the bytes of the specified URL, starting
+    at `byte_offset`.
+
+    If `config.DOWNLOAD_WORKERS` is more than 1 and the server supports
+    `Range` requests, the file is downloaded in segments by a pool of
+    threads (see `iter_segmented_download`). Otherwise, or if the file
+    is in the source cache, it is read as one GET stream.
+    Local files are read from the disk.
+
+    gzip, bz2 and xz compressed files are decompressed while they are
+    read (see `decompression`) and `byte_offset` is an offset in the
+    decompressed data. As such an offset cannot be requested with a
+    `Range` header, a compressed file is always read from its start and
+    it is never downloaded in segments
+
+    Args:
+        url (str): The URL to retrieve the data from, or a local path
+        byte_offset (int): index of the first byte; must be the start
+            of a line when the segmented download is used
+
+    Returns:
+        Iterator: An iterator yielding the bytes of the file in order
+
+    Raises:
+        - `requests.exceptions.RequestException`: If an error occurs while
+        making a request to the specified URL
+        - `OSError` if the local file cannot be read
+    """
+
+    local_path = get_local_path(url)
+    compression = None
+    if byte_offset or (config.DOWNLOAD_WORKERS > 1 and local_path is None):
+        # ranges are offsets in the file as it is stored, so they can
+        # only be requested if the file is not compressed
+        compression = get_compression(url)
+    if compression is not None:
+        logging.info('`%s` is %s-compressed, decompressing it from the '
+            'start', url, compression)
+        if local_path is not None:
+            raw_chunks = iter_file_bytes(local_path)
+        else:
+            raw_chunks = get_data_stream(url).iter_content(
+                chunk_size=config.READ_SIZE
+            )
+        byte_chunks = decompression.iter_decompressed(
+            raw_chunks, compression, config.READ_SIZE
+        )
+        if byte_offset:
+            byte_chunks = skip_bytes(byte_chunks, byte_offset)
+        return byte_chunks
+
+    if local_path is not None:
+        byte_chunks = iter_file_bytes(local_path, byte_offset)
+        if not byte_offset:
+            byte_chunks = decompression.decompress_stream(
+                url, byte_chunks, config.READ_SIZE
+            )
+        return byte_chunks
+
+    # a cached file is revalidated and read in one stream
+    cached = config.CACHE_DIR is not None and \
+        source_cache.get_cache_entry(url) is not None
+    if config.DOWNLOAD_WORKERS > 1 and not cached:
+        total_size = get_range_download_size(url)
+        if total_size is not None:
+            return iter_segmented_download(url, total_size, byte_offset)
+        logging.info('`%s` does not support range requests, '
+            'downloading it as a single stream', url)
+
+    data_stream = get_data_stream(url, byte_offset)
+    if byte_offset and data_stream.status_code == 416:
+        # the offset is the end of the file, i.e. nothing is left to read
+        data_stream.close()
+        return iter([])
+    byte_chunks = data_stream.iter_content(chunk_size=config.READ_SIZE)
+    if not byte_offset:
+        byte_chunks = decompression.decompress_stream(
+            url, byte_chunks, config.READ_SIZE,
+            data_stream.headers.get('Content-Encoding', ''),
+        )
+    elif data_stream.status_code != 206:
+        logging.info('`%s` ignored the range request, skipping the '
+            'first %s bytes of the stream', url, byte_offset)
+        byte_chunks = skip_bytes(byte_chunks, byte_offset)
+    return byte_chunks
+
+@decorators.log_method
+def iter_file_bytes(file_path: str, byte_offset: int = 0) -> ty.Iterator[bytes]:
+    """
+    Reads a local file in chunks of `config.READ_SIZE` bytes
+
+    Args:
+        file_path (str): path of the local file
+        byte_offset (int): index of the first byte to be read
+
+    Yields:
+        bytes: the byte chunks of the file
+
+    Raises:
+        - `OSError` if the file cannot be read
+    """
+
+    with open(file_path, 'rb') as file:
+        file.seek(byte_offset)
+        yield from iter(functools.partial(file.read, config.READ_SIZE), b'')
+
+@decorators.log_method
+def get_compression(url: str) -> ty.Optional[str]:
+    """
+    Reads the first bytes of the file at the URL to detect if it is
+    compressed (see `decompression.detect_compression`)
+
+    Args:
+        url (str): The URL of the file, or the path of a local file
+
+    Returns:
+        (str | None): name of the codec, or None if not compressed
+
+    Raises:
+        - `requests.exceptions.RequestException`: If an error occurs while
+        making a GET request to the specified URL
+        - `OSError` if the local file cannot be read
+    """
+
+    local_path = get_local_path(url)
+    if local_path is not None:
+        with open(local_path, 'rb') as file:
+            head = file.read(decompression.MAX_MAGIC_LENGTH)
+        return decompression.detect_compression(url, head)
+
+    data_stream = get_data_stream(url)
+    try:
+        head, _ = decompression.peek(
+            data_stream.iter_content(chunk_size=config.READ_SIZE),
+            decompression.MAX_MAGIC_LENGTH,
+        )
+        content_encoding = data_stream.headers.get('Content-Encoding', '')
+    finally:
+        data_stream.close()
+    return decompression.detect_compression(url, head, content_encoding)
+
+@decorators.log_method
+def skip_bytes(
+    byte_chunks: ty.Iterable[bytes], count: int
+) -> ty.Iterator[bytes]:
+    """
+    Skips the first `count` bytes of a stream
+
+    Args:
+        byte_chunks (iterable): byte chunks as received from the stream
+        count (int): the number of bytes to be skipped
+
+    Yields:
+        bytes: the byte chunks after the first `count` bytes
+    """
+
+    for chunk in byte_chunks:
+        if count >= len(chunk):
+            count -= len(chunk)
+            continue
+        yield chunk[count:]
+        count = 0
+
+@decorators.log_method
+def get_header_row(url: str) -> bytes:
+    """
+    Reads the first line (i.e. the CSV header row) of the file at the
+    URL, decompressing it if it is compressed, and closes the stream
+
+    Args:
+        url (str): The URL of the file, or the path of a local file
+
+    Returns:
+        (bytes): the header row without the line break
+
+    Raises:
+        - `requests.exceptions.RequestException`: If an error occurs while
+        making a GET request to the specified URL
+        - `OSError` if the local file cannot be read
+    """
+
+    local_path = get_local_path(url)
+    data_stream = None
+    if local_path is not None:
+        byte_chunks = iter_file_bytes(local_path)
+        content_encoding = ''
+    else:
+        data_stream = get_data_stream(url)
+        byte_chunks = data_stream.iter_content(chunk_size=config.READ_SIZE)
+        content_encoding = data_stream.headers.get('Content-Encoding', '')
+
+    header = bytearray()
+    try:
+        for chunk in decompression.decompress_stream(
+            url, byte_chunks, config.READ_SIZE, content_encoding
+        ):
+            header += chunk
+            if b'\n' in chunk:
+                break
+    finally:
+        if data_stream is not None:
+            data_stream.close()
+    return split_header(bytes(header))[0]
+
+@decorators.log_method
+def get_range_download_size(url: str) -> ty.Optional[int]:
+    """
+    Sends a HEAD request to the URL to find out if the file can be
+    downloaded in segments with `Range` requests
+
+    Args:
+        url (str): The URL of the file
+
+    Returns:
+        (int | None): the size of the file in bytes, or None if the
+        server does not advertise support for byte ranges or the size
+        of the file is unknown
+
+    Raises:
+        - `requests.exceptions.RequestException`: If an error occurs while
+        making a HEAD request to the specified URL
+    """
+
+    response = requests.head(
+        url, timeout=60, allow_redirects=True,
+        headers={'Accept-Encoding': 'identity'},
+    )
+    headers = response.headers
+    if (
+        not response.ok
+        or headers.get('Accept-Ranges', '').lower() != 'bytes'
+        or not headers.get('Content-Length', '').isdigit()
+        or headers.get('Content-Encoding', 'identity') != 'identity'
+    ):
+        return None
+    return int(headers['Content-Length'])
+
+@decorators.log_method
+def get_byte_range(url: str, first: int, last: int) -> ty.Optional[bytes]:
+    """
+    Downloads the bytes from `first` to `last` (both inclusive) of the
+    file at the URL with a `Range` request
+
+    Args:
+        url (str): The URL of the file
+        first (int): index of the first byte
+        last (int): index of the last byte
+
+    Returns:
+        (bytes | None): the requested bytes, or None if the server
+        ignored the `Range` header and responded with the whole file
+
+    Raises:
+        - `requests.exceptions.RequestException`: If an error occurs while
+        making a GET request to the specified URL
+    """
+
+    response = requests.get(
+        url, timeout=60, stream=True,
+        headers={'Range': f'bytes={first}-{last}',
+                 'Accept-Encoding': 'identity'},
+    )
+    response.raise_for_status()
+    if response.status_code != 206:
+        response.close()
+        return None
+    return response.content
+
+@decorators.log_method
+def download_segment(
+    url: str, first: int, last: int, total_size: int
+) -> ty.Optional[ty.Tuple[int, int, bytes]]:
+    """
+    Downloads a segment of the file and realigns it to line breaks so
+    that it contains only complete lines. The segment owns every line
+    that starts between `first` and `last` (both inclusive): the partial
+    line at the start belongs to the previous segment and the partial
+    line at the end is completed with bytes from the next segment.
+
+    Since the segments of a file own disjoint sets of complete lines,
+    they can be parsed independently and in any order
+
+    Args:
+        url (str): The URL of the file
+        first (int): index of the first byte of the segment
+        last (int): index of the last byte of the segment
+        total_size (int): size of the file in bytes
+
+    Returns:
+        (start, end, data) | None: the realigned segment where `data` are
+        the bytes from index `start` (inclusive) to `end` (exclusive) of
+        the file. Returns None if the server ignored the `Range` header
+
+    Raises:
+        - `requests.exceptions.RequestException`: If an error occurs while
+        making a GET request to the specified URL
+    """
+
+    # one byte before the segment is needed to know if a line starts
+    # exactly at `first`
+    offset = max(first - 1, 0)
+    buffer = get_byte_range(url, offset, last)
+    if buffer is None:
+        return None
+
+    def find_line_end(index):
+        # index just past the first line break at or after `index`,
+        # extending the buffer with bytes of the next segments if needed
+        nonlocal buffer
+        while True:
+            pos = buffer.find(b'\n', index - offset)
+            if pos != -1:
+                return offset + pos + 1
+            fetched_up_to = offset + len(buffer)
+            if fetched_up_to >= total_size:
+                return total_size
+            extra = get_byte_range(
+                url, fetched_up_to,
+                min(fetched_up_to + config.READ_SIZE, total_size) - 1
+            )
+            if extra is None:
+                return None
+            buffer += extra
+
+    start = find_line_end(first - 1) if first > 0 else 0
+    end = find_line_end(last) if start is not None else None
+    if start is None or end is None:
+        return None
+    start = min(start, end)
+    data = buffer[start - offset:end - offset]
+    if end == total_size and data and not data.endswith(b'\n'):
+        # segments may be emitted in any order, so the last line of the
+        # file must be terminated as well
+        data += b'\n'
+    return start, end, data
 
 @decorators.log_method
-def get_data_chunk(url: str) -> pd.DataFrame:
+def iter_segmented_download(
+    url: str, total_size: int, byte_offset: int = 0
+) -> ty.Iterator[bytes]:
     """
-    Retrieves data chunks from the specified URL. Reads the data
-    chunks from the stream and converts them to the CSV format
-    Converts the CSV chunk to a Pandas DataFrame and yields it
+    Downloads the file from `byte_offset` onwards in segments of
+    `config.DOWNLOAD_SEGMENT_SIZE` bytes using concurrent `Range` requests in a pool of
+    `config.DOWNLOAD_WORKERS` threads. At most two segments per worker
+    are held in memory at a time.
+
+    The segments are realigned to line breaks (see `download_segment`).
+    If `config.DOWNLOAD_IN_ORDER` is set, they are yielded in the order
+    of the file, otherwise the first segment (which contains the CSV
+    header row) is yielded first and the rest as soon as they complete.
+
+    If the server ignores the `Range` header, the remaining data is
+    read from a single GET stream instead
 
     Args:
-        url (str): The URL to retrieve the data from
+        url (str): The URL of the file
+        total_size (int): size of the file in bytes
+        byte_offset (int): index of the first byte; must be the start
+            of a line
+
+    Yields:
+        bytes: realigned segments of the file
+
+    Raises:
+        - `requests.exceptions.RequestException`: If an error occurs while
+        making a request to the specified URL
+    """
+
+    seg_size = config.DOWNLOAD_SEGMENT_SIZE
+    segments = [
+        (first, min(first + seg_size, total_size) - 1)
+        for first in range(byte_offset, total_size, seg_size)
+    ]
+    max_pending = 2 * config.DOWNLOAD_WORKERS
+    # (start, end) of the segments that were yielded
+    emitted = [(0, byte_offset)] if byte_offset else []
+    with futures.ThreadPoolExecutor(config.DOWNLOAD_WORKERS) as pool:
+        pending = {}
+        next_segment = 0
+        try:
+            while pending or next_segment < len(segments):
+                while next_segment < len(segments) and len(pending) < max_pending:
+                    first, last = segments[next_segment]
+                    pending[next_segment] = pool.submit(
+                        download_segment, url, first, last, total_size
+                    )
+                    next_segment += 1
+
+                # the first segment holds the header row, so it always
+                # has to be yielded first
+                if config.DOWNLOAD_IN_ORDER or not emitted:
+                    index = min(pending)
+                else:
+                    futures.wait(pending.values(),
+                        return_when=futures.FIRST_COMPLETED)
+                    index = next(i for i in sorted(pending) if pending[i].done())
+                segment = pending.pop(index).result()
+
+                if segment is None:
+                    logging.info('`%s` ignored a range request, reading '
+                        'the remaining data as a single stream', url)
+                    for future in pending.values():
+                        future.cancel()
+                    pending.clear()
+                    next_segment = len(segments)
+                    yield from iter_bytes_not_in_ranges(url, emitted)
+                    break
+
+                start, end, data = segment
+                emitted.append((start, end))
+                if data:
+                    yield data
+        finally:
+            for future in pending.values():
+                future.cancel()
+
+@decorators.log_method
+def iter_bytes_not_in_ranges(
+    url: str, ranges: ty.List[ty.Tuple[int, int]]
+) -> ty.Iterator[bytes]:
+    """
+    Reads the file as a single GET stream and yields the bytes that are
+    not inside any of the specified ranges
+
+    Args:
+        url (str): The URL of the file
+        ranges (list): (start, end) ranges of the bytes to be skipped,
+            with `start` inclusive and `end` exclusive
+
+    Yields:
+        bytes: the bytes that are outside the ranges, in order
+
+    Raises:
+        - `requests.exceptions.RequestException`: If an error occurs while
+        making a GET request to the specified URL
+    """
+
+    ranges = sorted(ranges)
+    position = 0
+    for chunk in get_data_stream(url).iter_content(chunk_size=config.READ_SIZE):
+        chunk_start = position
+        position += len(chunk)
+        keep_from = chunk_start
+        for start, end in ranges:
+            if end <= keep_from or start >= position:
+                continue
+            if start > keep_from:
+                yield chunk[keep_from - chunk_start:start - chunk_start]
+            keep_from = max(keep_from, min(end, position))
+        if keep_from < position:
+            yield chunk[keep_from - chunk_start:]
+
+@decorators.log_method
+def get_block_size() -> ty.Dict[str, int]:
+    """
+    Returns the size of the first block of CSV lines as set in the
+    config: `config.CHUNK_BYTES` bytes if it is set, otherwise
+    `config.CHUNK_ROWS` lines
+
+    Returns:
+        block_size (dict): `{'lines': n}` or `{'bytes': n}`
+    """
+
+    if config.CHUNK_BYTES:
+        return {'bytes': config.CHUNK_BYTES}
+    return {'lines': config.CHUNK_ROWS}
+
+@decorators.log_method
+def fit_block_size_to_memory(
+    block_size: ty.Dict[str, int], block_bytes: int, dframe: pd.DataFrame
+) -> None:
+    """
+    Sets the number of raw bytes in the next block so that the parsed
+    block uses about `config.CHUNK_BYTES` bytes of memory. The ratio of
+    the memory used by the parsed DataFrame to the size of its raw CSV
+    block is measured on the last block, i.e. it is learned for the
+    columns and the parser backend in use
+
+    Args:
+        block_size (dict): `{'bytes': n}`; updated in place
+        block_bytes (int): size of the last raw block in bytes
+        dframe (DataFrame): the parsed last block
+    """
+
+    memory = int(dframe.memory_usage(deep=True).sum())
+    if block_bytes and memory:
+        block_size['bytes'] = max(1, config.CHUNK_BYTES * block_bytes // memory)
+
+@decorators.log_method
+def find_last_line_of_block(
+    line_ends: np.ndarray,
+    first_line: int,
+    start: int,
+    buffer_size: int,
+    block_size: ty.Dict[str, int],
+) -> ty.Optional[int]:
+    """
+    Finds the last line of the block that starts at `start` in a buffer
+
+    Args:
+        line_ends (ndarray): the end index of each line in the buffer
+        first_line (int): index of the first line of the block
+        start (int): index of the first byte of the block
+        buffer_size (int): number of bytes in the buffer
+        block_size (dict): `{'lines': n}` or `{'bytes': n}`
+
+    Returns:
+        (int | None): index of the last line of the block, or None if
+        the buffer does not contain a complete block
+    """
+
+    if 'lines' in block_size:
+        last_line = first_line + block_size['lines'] - 1
+    else:
+        limit = start + block_size['bytes']
+        if limit > buffer_size:
+            return None
+        last_line = int(np.searchsorted(line_ends, limit, side='right')) - 1
+        # a line that is longer than the block size is a block by itself
+        last_line = max(last_line, first_line)
+    if last_line >= len(line_ends):
+        return None
+    return last_line
+
+@decorators.log_method
+def iter_line_blocks(
+    byte_chunks: ty.Iterable[bytes], block_size: ty.Dict[str, int]
+) -> ty.Iterator[bytes]:
+    """
+    Regroups the byte chunks of a stream into blocks of complete lines.
+    A block contains `block_size['lines']` lines, or as many lines as
+    fit in `block_size['bytes']` bytes (at least one). The block size
+    is read again for each block, so it can be changed by the caller
+    between blocks. The last block contains the remaining lines and may
+    not end with a line break.
+
+    The lines are counted on the raw bytes, so no line is decoded or
+    split in Python. Line breaks inside quoted CSV values are not
+    supported (neither were they by `iter_lines`)
+
+    Args:
+        byte_chunks (iterable): byte chunks as received from the stream
+        block_size (dict): `{'lines': n}` or `{'bytes': n}`
+
+    Yields:
+        bytes: a block of complete lines
+    """
+
+    pending = bytearray()
+    pending_lines = 0
+    for chunk in byte_chunks:
+        if not chunk:
+            continue
+        pending += chunk
+        if 'lines' in block_size:
+            pending_lines += chunk.count(b'\n')
+            if pending_lines < block_size['lines']:
+                continue
+        elif len(pending) < block_size['bytes']:
+            continue
+        # cut all the complete blocks in the buffer with one scan
+        line_ends = get_line_ends(pending)
+        start = first_line = 0
+        while True:
+            last_line = find_last_line_of_block(
+                line_ends, first_line, start, len(pending), block_size
+            )
+            if last_line is None:
+                break
+            end = int(line_ends[last_line])
+            yield bytes(pending[start:end])
+            start = end
+            first_line = last_line + 1
+        del pending[:start]
+        pending_lines = len(line_ends) - first_line
+    if pending.strip():
+        yield bytes(pending)
+
+@decorators.log_method
+def iter_mapped_line_blocks(
+    file_path: str, byte_offset: int, block_size: ty.Dict[str, int]
+) -> ty.Iterator[memoryview]:
+    """
+    Memory-maps a local file and yields blocks of complete lines from
+    `byte_offset` onwards, with the same block sizes as
+    `iter_line_blocks`. The blocks are views of the mapped file, so the
+    bytes are not read into a buffer before they are handed to the
+    parser. Only the `pyarrow` parser reads them without a copy, the
+    others copy each block once (see `csv_parsers`). A block
+    is released when the next one is requested and must not be used
+    after that
+
+    Args:
+        file_path (str): path of the local file
+        byte_offset (int): index of the first byte; must be the start of
+            a line
+        block_size (dict): `{'lines': n}` or `{'bytes': n}`
+
+    Yields:
+        memoryview: a block of complete lines
+
+    Raises:
+        - `OSError` if the file cannot be read
+    """
+
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size <= byte_offset:
+            return
+        # the map stays valid after the file is closed and is unmapped
+        # when it is garbage collected, i.e. after the last block is
+        # released by the parser
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    data = np.frombuffer(mapped, dtype=np.uint8)
+    view = memoryview(mapped)
+
+    start = scanned = byte_offset
+    line_ends = np.empty(0, dtype=np.int64)
+    while start < len(data):
+        end = len(data)
+        if 'lines' in block_size:
+            lines_per_block = block_size['lines']
+            while len(line_ends) < lines_per_block and scanned < len(data):
+                window = data[scanned:scanned + LOCAL_SCAN_SIZE]
+                line_ends = np.concatenate(
+                    (line_ends, np.flatnonzero(window == 10) + scanned + 1)
+                )
+                scanned += len(window)
+            if len(line_ends) >= lines_per_block:
+                end = int(line_ends[lines_per_block - 1])
+                line_ends = line_ends[lines_per_block:]
+        elif start + block_size['bytes'] < len(data):
+            line_break = mapped.rfind(b'\n', start, start + block_size['bytes'])
+            if line_break == -1:
+                line_break = mapped.find(b'\n', start + block_size['bytes'])
+            if line_break != -1:
+                end = line_break + 1
+        if end == len(data) and not bytes(view[start:end]).strip():
+            break
+        block = view[start:end]
+        start = end
+        try:
+            yield block
+        finally:
+            block.release()
+
+@decorators.log_method
+def get_line_ends(buffer: bytearray) -> np.ndarray:
+    """
+    Returns the index just past each line break in the buffer, i.e. the
+    index at which the next line starts
+
+    Args:
+        buffer (bytearray): bytes containing CSV lines
+
+    Returns:
+        (ndarray): the end index of each complete line in the buffer
+    """
+
+    line_breaks = np.flatnonzero(np.frombuffer(buffer, dtype=np.uint8) == 10)
+    return line_breaks + 1
+
+@decorators.log_method
+def split_header(block: bytes) -> ty.Tuple[bytes, bytes]:
+    """
+    Splits the first line (i.e. the CSV header row) from a block
+
+    Args:
+        block (bytes | memoryview): the first block of the CSV data
+
+    Returns:
+        (header, rest): the first line and the remaining lines
+    """
+
+    # a view of a memory-mapped file is copied, this is done only once
+    header, _, rest = bytes(block).partition(b'\n')
+    return header, rest
+
+@decorators.log_method
+def get_data_chunk(
+    url: str,
+    projection: ty.Optional[ty.Dict[str, str]] = None,
+    byte_offset: int = 0,
+    row_count: int = 0,
+) -> pd.DataFrame:
+    """
+    Retrieves data chunks from the specified URL. Reads the raw bytes
+    from the stream (see `get_byte_chunks`), or from the memory-mapped
+    file if the URL is a local path or `file://` URI of an uncompressed
+    file (see `iter_mapped_line_blocks`), groups them into blocks of
+    `config.CHUNK_ROWS` lines and parses each block in bulk with the
+    parser backend that is set in `config.PARSER_ENGINE`. Yields the
+    parsed block as a Pandas DataFrame
+
+    If `config.CHUNK_BYTES` is set, the blocks are cut to a memory
+    budget instead: each block is sized so that the parsed DataFrame
+    uses about `config.CHUNK_BYTES` bytes, based on the memory used by
+    the previous block (see `fit_block_size_to_memory`)
+
+    If a projection is passed, only the projected columns are parsed
+    and they are converted to their types while parsing (see
+    `csv_parsers`), otherwise all the columns are parsed
+
+    The position in the file after each chunk is stored in the `attrs`
+    of the yielded DataFrame:
+        - `byte_offset`: index of the first byte after the chunk
+        - `row_count`: number of data rows read up to the chunk (incl.)
+    If the connection drops, the download is resumed from the end of
+    the last yielded chunk with a `Range` request. Up to
+    `config.DOWNLOAD_RETRIES` attempts are made with exponential
+    backoff before the error is raised.
+    A previous run can be resumed by passing the values from the chunk
+    `attrs` as `byte_offset` and `row_count`; the header row is then
+    read separately from the start of the file.
+
+    Resuming is not possible when segments are processed out of order
+    (`config.DOWNLOAD_IN_ORDER` is False), as the chunks do not end at
+    increasing offsets. The position is not stored in that case
+
+    Args:
+        url (str): The URL, `file://` URI or local path of the data
+        projection (dict | None): projected column names and their types
+        byte_offset (int): offset in the file to start reading data rows
+            from. Must be the `byte_offset` of a previous chunk
+        row_count (int): number of data rows read before `byte_offset`
 
     Yields:
         pd.DataFrame: A Pandas DataFrame containing the data chunk
@@ -49,40 +883,76 @@ def get_data_chunk(url: str) -> pd.DataFrame:
     Raises:
         - `requests.exceptions.RequestException` if data stream cannot be
             fetched from the URL
-        - `DataLoadingError` if the data cannot be locaded as CSV
+        - `OSError` if the local file cannot be read
+        - `InvalidConfigError` if the parser backend is not supported
+        - `DataLoadingError` if the data cannot be locaded as CSV or a
+            projected column cannot be converted to its type
         - `DataValidationError` if CSV data is not correctly formatted
     """
-    try:
-        data_stream = get_data_stream(url)
-    except requests.exceptions.RequestException as err:
-        logging.error('Error in fetching from URL\n%s', str(err), exc_info=True)
-        raise requests.exceptions.RequestException from err
 
-    reader = csv.reader(data_stream.iter_lines(
-        chunk_size=config.CHUNK_SIZE, decode_unicode=True)
-    )
-    rows = deque([]) # popleft() is O(1) in deque; in list pop(0) is O(N)
+    parse_block = csv_parsers.get_parser(config.PARSER_ENGINE)
+    local_path = get_local_path(url)
+    resumable = is_read_in_order()
+
+    block_size = get_block_size()
     col_names = []
+    retries = 0
     try:
-        for row in reader:
-            rows.append(row)
-            if len(rows) == config.CHUNK_SIZE:
-                if not col_names:
-                    # first row of the CSV contains column names, not data
-                    # removing first row so it doesnt get added as data row
-                    col_names = rows[0]
+        # compressed local files are decompressed while they are read
+        mapped = local_path is not None and get_compression(url) is None
+        while True:
+            try:
+                if byte_offset and not col_names:
+                    # re-inject the header row, so the column names line
+                    # up with the values when the data is resumed
+                    col_names = csv_parsers.parse_header(get_header_row(url))
                     validator.check_for_expected_columns(col_names)
-                    rows.popleft()
-                dframe = pd.DataFrame(columns=col_names, data=rows)
-                rows = []
-                yield dframe
-        if rows: # if data is smaller than chunk size
-            if not col_names:
-                col_names = rows[0]
-                validator.check_for_expected_columns(col_names)
-                rows.popleft()
-            dframe = pd.DataFrame(columns=col_names, data=rows)
-            yield dframe
+
+                if mapped:
+                    blocks = iter_mapped_line_blocks(
+                        local_path, byte_offset, block_size
+                    )
+                else:
+                    byte_chunks = get_byte_chunks(url, byte_offset)
+                    blocks = iter_line_blocks(byte_chunks, block_size)
+                for block in blocks:
+                    if not col_names:
+                        # first row of the CSV contains column names, not
+                        # data. removing first row so it doesnt get added
+                        # as data row
+                        header, block = split_header(block)
+                        col_names = csv_parsers.parse_header(header)
+                        validator.check_for_expected_columns(col_names)
+                        byte_offset += len(header) + 1
+                        if not block.strip():
+                            continue
+                    dframe = parse_block(block, col_names, projection)
+                    if 'bytes' in block_size:
+                        fit_block_size_to_memory(block_size, len(block), dframe)
+                    byte_offset += len(block)
+                    row_count += len(dframe)
+                    if resumable:
+                        dframe.attrs['byte_offset'] = byte_offset
+                        dframe.attrs['row_count'] = row_count
+                    retries = 0
+                    yield dframe
+                return
+            except RETRYABLE_ERRORS as err:
+                retries += 1
+                if not resumable or retries > config.DOWNLOAD_RETRIES:
+                    raise
+                wait = min(config.RETRY_BACKOFF * 2 ** (retries - 1),
+                    config.RETRY_BACKOFF_MAX)
+                logging.warning('Connection lost after byte %s (%s). Retry '
+                    '%s of %s in %s seconds', byte_offset, str(err), retries,
+                    config.DOWNLOAD_RETRIES, wait)
+                time.sleep(wait)
+    except requests.exceptions.RequestException as err:
+        logging.error('Error in fetching from URL\n%s', str(err), exc_info=True)
+        raise requests.exceptions.RequestException from err
+    except OSError as err:
+        logging.error('Error in reading file\n%s', str(err), exc_info=True)
+        raise OSError from err
     except (csv.Error, ValueError) as err:
         logging.error('Error in handling CSV\n%s', str(err), exc_info=True)
         raise ce.DataLoadingError from err
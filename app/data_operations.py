@@ -3,28 +3,40 @@ Contains functions that are used for performing operations on data
 including cleaning, formatting, etc
 """
 
+import datetime
+import functools
 import logging
 import typing as ty
 
+import numpy as np
 import pandas as pd
 
 from app import config
 from app import custom_exceptions as ce
 from app import decorators, tasks, validator
 
+# 'HH:MM' string of each minute of the day, indexed by the minute
+_TIME_LABELS = np.array([
+    f'{minute // 60:02d}:{minute % 60:02d}'
+    for minute in range(config.MINUTES_PER_DAY)
+])
 
 @decorators.log_method
 def transform_data(data: pd.DataFrame) -> ty.Dict:
     """
-    Converts 'Date' and 'Time' column to datetime while keeping the
-    original format.
+    Converts 'Date' column to day ordinals and 'Time' column to minutes
+    of the day.
     Converts the column names in config.NUMERIC_COL_NAMES to numeric
 
+    With `config.COMPACT` set, the numeric columns of the chunk are
+    downcast to `float32` and the memory saved on the chunk is logged
+
     Args:
         data (DataFrame): the DataFrame to be cleaned and transformed
 
     Returns:
-        (dict): the cleaned and transformed DataFrame as a dictionary
+        (dict): the cleaned and transformed DataFrame as a columnar
+            chunk, see `to_columnar_chunk`
 
     Raises:
         - `UnSupporterdDataTypeError` if operations are performed on
@@ -32,61 +44,292 @@ def transform_data(data: pd.DataFrame) -> ty.Dict:
         values, eg: converting a date string to a number
     """
 
+    if config.COMPACT:
+        parsed_bytes = int(data.memory_usage(deep=True).sum())
+
     remove_cols_that_are_not_needed(data)
-    convert_time_col_to_datetime(data)
+    convert_date_col_to_ordinal(data)
+    convert_time_col_to_minutes(data)
     convert_column_data_to_numeric(data)
     remove_rows_where_data_is_na(data)
-    return data.to_dict()
+    chunk = to_columnar_chunk(data)
+
+    if config.COMPACT:
+        chunk_bytes = get_chunk_memory(chunk)
+        logging.info('Compact chunk of %s rows uses %s bytes, %s bytes less '
+            'than the parsed chunk', chunk['num_rows'], chunk_bytes,
+            parsed_bytes - chunk_bytes)
+    return chunk
+
+@decorators.log_method
+def to_columnar_chunk(data: pd.DataFrame) -> ty.Dict:
+    """
+    Converts a transformed DataFrame to the columnar chunk that is sent
+    to the tasks. Each column is kept as one NumPy array instead of a
+    dict of Python objects keyed by the index, so the chunk is pickled
+    as a few contiguous buffers:
+        - columns in `config.NUMERIC_COL_NAMES` are `float64` arrays,
+          `float32` with `config.COMPACT` set
+        - 'Date' is an `int32` array of day ordinals
+        - 'Time' is an `int16` array of minutes of the day
+        - the other columns are fixed width string arrays
+
+    Args:
+        data (DataFrame): the transformed DataFrame
+
+    Returns:
+        chunk (dict): the number of rows and the arrays of the columns,
+        eg:
+        {
+            'num_rows': 2,
+            'columns': {
+                'Date': array([732463, 732463], dtype=int32),
+                'Time': array([0, 10], dtype=int16),
+                'Outside Temperature': array([10.2, 10.4]),
+            }
+        }
+    """
+
+    float_dtype = np.float32 if config.COMPACT else np.float64
+    columns = {}
+    for name in data.columns:
+        if name in config.NUMERIC_COL_NAMES:
+            columns[name] = data[name].to_numpy(dtype=float_dtype)
+        elif name == 'Date':
+            columns[name] = data[name].to_numpy(dtype=np.int32)
+        elif name == 'Time':
+            columns[name] = data[name].to_numpy(dtype=np.int16)
+        else:
+            columns[name] = data[name].to_numpy(dtype=str)
+    return {'num_rows': len(data), 'columns': columns}
 
 @decorators.log_method
-def convert_date_col_to_datetime(data: pd.DataFrame) -> None:
+def upcast_to_float64(values: np.ndarray) -> np.ndarray:
     """
-    Converts the values in 'Date' column in the dataframe to a datetime
-    object and keeps the original date formatting (DD/MM/YYYY)
+    Returns the values of a numeric column as `float64`, for the task
+    arithmetic and output to be the same with `config.COMPACT` set. A
+    `float32` value is converted through its shortest decimal form, eg:
+    10.2, which is the value that was parsed from the CSV, as the CSV
+    values have fewer significant digits than `float32` keeps. Casting
+    it directly would give 10.199999809265137
+
+    Formatting a value as a string is slow, so only the distinct values
+    are converted, which are few for readings with one decimal, and
+    mapped back to the rows. It takes about a sixth of the time of
+    converting every value (0.16s instead of 1.2s for 1M temperatures),
+    at the cost of a sort of the values
+
+    Args:
+        values (ndarray): the values of a numeric column
+
+    Returns:
+        (ndarray): the values as `float64`, not copied if they already are
+    """
+
+    if values.dtype == np.float32:
+        uniques, inverse = np.unique(values, return_inverse=True)
+        uniques = uniques.astype(str).astype(np.float64)
+        return uniques[inverse.reshape(values.shape)]
+    return values.astype(np.float64, copy=False)
+
+@decorators.log_method
+def get_time_span(
+    chunk: ty.Dict, span: ty.Optional[ty.Tuple[int, int]] = None
+) -> ty.Optional[ty.Tuple[int, int]]:
+    """
+    Returns the first and the last reading of a columnar chunk, as the
+    minutes since the day ordinal 0, extended to include `span`
+
+    Args:
+        chunk (dict): the columnar chunk, see `to_columnar_chunk`
+        span (tuple | None): the span of the previous chunks
+
+    Returns:
+        span (tuple | None): eg: (1054746720, 1054747430), None if the
+        chunk and `span` have no rows
+    """
+
+    if not chunk['num_rows']:
+        return span
+    minutes = chunk['columns']['Date'].astype(np.int64) * config.MINUTES_PER_DAY \
+        + chunk['columns']['Time']
+    first, last = int(minutes.min()), int(minutes.max())
+    if span is not None:
+        first, last = min(first, span[0]), max(last, span[1])
+    return first, last
+
+@decorators.log_method
+def get_chunk_memory(chunk: ty.Dict) -> int:
+    """
+    Returns the number of bytes used by the arrays of a columnar chunk
+
+    Args:
+        chunk (dict): the columnar chunk, see `to_columnar_chunk`
+
+    Returns:
+        (int): the total size of the column arrays in bytes
+    """
+
+    return sum(values.nbytes for values in chunk['columns'].values())
+
+@decorators.log_method
+def chunk_to_frame(chunk: ty.Dict) -> pd.DataFrame:
+    """
+    Wraps the arrays of a columnar chunk (see `to_columnar_chunk`) in a
+    DataFrame without copying them column by column
+
+    Args:
+        chunk (dict): the columnar chunk
+
+    Returns:
+        (DataFrame): the data of the chunk with a default index
+    """
+
+    return pd.DataFrame(chunk['columns'], copy=False)
+
+@decorators.log_method
+def convert_date_col_to_ordinal(data: pd.DataFrame) -> None:
+    """
+    Converts the values in 'Date' column in the dataframe to day
+    ordinals (see `parse_day_ordinals`). Missing values are kept as NA
+    so that the rows can be removed with the rest of the incomplete rows
 
     Args:
         data (DataFrame): the DataFrame for conversion operation
 
     Raises:
         - `UnSupporterdDataTypeError` if the `Date` column cannot be
-        converted to datetime in `DD/MM/YYYY` format
+        converted to dates in `DD/MM/YYYY` format
     """
 
     try:
-        data['Date'] = pd.to_datetime(data['Date'], format='%d/%m/%Y')
-        data['Date'] = data['Date'].dt.strftime('%d/%m/%Y')
+        data['Date'] = parse_day_ordinals(data['Date'])
     except ValueError as err:
         raise ce.UnSupporterdDataTypeError(
             'An unsupported value encountered in column `Date` that '
-            'cannot be converted to type `datetime`\n'
+            'cannot be converted to a date in `DD/MM/YYYY` format\n'
             f'Traceback:\n{err}'
         )
 
 @decorators.log_method
-def convert_time_col_to_datetime(
+def parse_day_ordinals(values: ty.Iterable[str]) -> pd.Series:
+    """
+    Parses 'DD/MM/YYYY' date strings to day ordinals (see
+    `datetime.date.toordinal`), eg: '01/06/2006' -> 732463.
+    A chunk has the same date on many rows, so each distinct date is
+    parsed once, through the memoized `date_to_ordinal`
+
+    Args:
+        values (iterable): the date strings
+
+    Returns:
+        (Series): the ordinals as nullable `Int32`, NA for missing values
+
+    Raises:
+        - `ValueError` if a value is not in `DD/MM/YYYY` format
+    """
+
+    values = pd.Series(values)
+    table = {date: date_to_ordinal(date) for date in values.dropna().unique()}
+    return values.map(table).astype('Int32')
+
+@functools.lru_cache(maxsize=None)
+def date_to_ordinal(date: str) -> int:
+    """
+    Returns the day ordinal of a 'DD/MM/YYYY' date string, memoized
+
+    Raises:
+        - `ValueError` if `date` is not in `DD/MM/YYYY` format
+    """
+
+    return datetime.datetime.strptime(date, '%d/%m/%Y').toordinal()
+
+@functools.lru_cache(maxsize=None)
+def ordinal_to_date(ordinal: int) -> str:
+    """Returns the 'DD/MM/YYYY' date string of a day ordinal, memoized"""
+
+    return datetime.date.fromordinal(ordinal).strftime('%d/%m/%Y')
+
+@decorators.log_method
+def format_day_ordinals(ordinals: ty.Iterable[int]) -> ty.List[str]:
+    """
+    Formats day ordinals as 'DD/MM/YYYY' strings, eg:
+    732463 -> '01/06/2006'
+
+    Args:
+        ordinals (iterable): the day ordinals
+
+    Returns:
+        (list): the 'DD/MM/YYYY' strings
+    """
+
+    return [ordinal_to_date(int(ordinal)) for ordinal in ordinals]
+
+@decorators.log_method
+def convert_time_col_to_minutes(
         data: pd.DataFrame, format_: str='%H:%M'
 ) -> None:
     """
-    Converts the values in 'Time' column in the dataframe to a datetime
-    object for easy reference of time
+    Converts the values in 'Time' column in the dataframe to minutes of
+    the day (see `parse_minutes_of_day`). Missing values are kept as NA
+    so that the rows can be removed with the rest of the incomplete rows
 
     Args:
         data (DataFrame): the DataFrame for conversion operation
+        format_ (str): the format of the values in 'Time' column
 
     Raises:
         - `UnSupporterdDataTypeError` if the `Time` column cannot be
-        converted to datetime.time object
+        converted to minutes of the day
     """
 
     try:
-        data['Time'] = pd.to_datetime(data['Time'], format=format_).dt.time
+        data['Time'] = parse_minutes_of_day(data['Time'], format_)
     except ValueError as err:
         raise ce.UnSupporterdDataTypeError(
             'An unsupported value encountered in column `Time` that '
-            'cannot be converted to type `datetime.time`\n'
+            'cannot be converted to minutes of the day\n'
             f'Traceback:\n{err}'
         )
 
+@decorators.log_method
+def parse_minutes_of_day(
+        values: ty.Iterable[str], format_: str='%H:%M'
+) -> pd.Series:
+    """
+    Parses time strings to the number of minutes since midnight, eg:
+    '00:10' -> 10, '15:00' -> 900
+
+    Args:
+        values (iterable): the time strings
+        format_ (str): the format of the time strings
+
+    Returns:
+        (Series): the minutes as nullable `Int16`, NA for missing values
+
+    Raises:
+        - `ValueError` if a value is not in the format `format_`
+    """
+
+    parsed = pd.to_datetime(pd.Series(values), format=format_)
+    minutes = parsed.dt.hour * 60 + parsed.dt.minute
+    return minutes.astype('Int16')
+
+@decorators.log_method
+def format_minutes_of_day(minutes: ty.Iterable[int]) -> np.ndarray:
+    """
+    Formats minutes since midnight as 'HH:MM' strings, eg:
+    10 -> '00:10', 900 -> '15:00'
+
+    Args:
+        minutes (iterable): the minutes of the day
+
+    Returns:
+        (ndarray): the 'HH:MM' strings
+    """
+
+    return _TIME_LABELS[np.asarray(minutes, dtype=np.int16)]
+
 @decorators.log_method
 def convert_column_data_to_numeric(data: pd.DataFrame) -> None:
     """
@@ -101,6 +344,9 @@ def convert_column_data_to_numeric(data: pd.DataFrame) -> None:
     """
 
     for name in config.NUMERIC_COL_NAMES:
+        if name not in data.columns:
+            # not read by any of the tasks that are run
+            continue
         try:
             data[name] = pd.to_numeric(data[name])
         except ValueError as err:
@@ -110,19 +356,49 @@ def convert_column_data_to_numeric(data: pd.DataFrame) -> None:
             f'Traceback:\n{err}'
         )
 
+@decorators.log_method
+def get_column_projection(
+    col_names: ty.Optional[ty.List[str]] = None
+) -> ty.Dict[str, str]:
+    """
+    Returns the projection of the columns that are used in the tasks,
+    i.e. the column names in `col_names` (`config.EXPECTED_COL_NAMES`
+    by default) mapped to the type they are parsed to. Columns in
+    `config.NUMERIC_COL_NAMES` are parsed to `float64`, the rest are
+    kept as strings
+
+    Args:
+        col_names (list | None): the columns read by the tasks, see
+            `registry.get_task_columns`
+
+    Returns:
+        projection (dict): projected column names and their types, eg:
+        {'Date': 'str', 'Outside Temperature': 'float64'}
+    """
+
+    if col_names is None:
+        col_names = config.EXPECTED_COL_NAMES
+    projection = {
+        name: 'float64' if name in config.NUMERIC_COL_NAMES else 'str'
+        for name in col_names
+    }
+    return projection
+
 @decorators.log_method
 def remove_cols_that_are_not_needed(data: pd.DataFrame) -> None:
     """
     Removes columns from the dataframe that are not used in any of the
-    operations.
+    operations. Nothing is dropped if the data was parsed with the
+    projection from `get_column_projection()`
 
     Args:
         data (DataFrame): the DataFrame for conversion operation
     """
 
-    for col_name in data.columns.values:
-        if col_name not in config.EXPECTED_COL_NAMES:
-            data.drop(col_name, axis=1, inplace=True)
+    expected = set(config.EXPECTED_COL_NAMES)
+    not_needed = [name for name in data.columns if name not in expected]
+    if not_needed:
+        data.drop(columns=not_needed, inplace=True)
 
 @decorators.log_method
 def remove_rows_where_data_is_na(data: pd.DataFrame) -> None:
@@ -137,15 +413,11 @@ def remove_rows_where_data_is_na(data: pd.DataFrame) -> None:
 
 @decorators.log_method
 def formatted_task_1_results(
-    result: ty.Dict, count: int
+    summary: ty.Dict
 ) -> ty.Tuple[ty.List[ty.Tuple], str, ty.List[ty.Tuple]]:
     """
-    Takes a dictionary as an argument and expects it to have the format
-    of Task 1 output. This is the expected format of `result`:
-        {
-            '01/06/2006': {'temp': 17.2, 'time': '15:00:00'},
-            '01/07/2006': {'temp': 16.0, 'time': '08:50:00'},
-        }
+    Takes a summary of Task 1 results as an argument (see
+    `tasks.new_task_1_summary`) and finalizes the prompts a, b and c
 
     Returns:
         (`month_avg_hottest_time`, `most_common_hottest_time`,
@@ -166,13 +438,13 @@ def formatted_task_1_results(
     """
 
     try:
-        validator.check_task_1_dict_format(result)
+        validator.check_task_1_summary_format(summary)
     except ce.InvalidFormatError as err:
         logging.error('Input not in valid format\n%s', str(err), exc_info=True)
         raise ce.InvalidFormatError from err
 
-    month_avg_hottest_time = tasks.avg_time_of_hottest_daily_temp(result)
-    most_common_hottest_time = tasks.hottest_time_with_hightest_freq(result)
-    top_hottest_times = tasks.top_hottest_times(result, count)
+    month_avg_hottest_time = tasks.avg_time_of_hottest_daily_temp(summary)
+    most_common_hottest_time = tasks.hottest_time_with_hightest_freq(summary)
+    top_hottest_times = tasks.top_hottest_times(summary)
 
     return month_avg_hottest_time, most_common_hottest_time, top_hottest_times
@@ -0,0 +1,193 @@
+"""
+Contains the functions that detect compressed sources and decompress
+their byte streams incrementally with the codecs of the standard
+library (`zlib` for gzip, `bz2` and `lzma` for xz). At most
+`max_length` bytes are decompressed at a time, so the memory used does
+not depend on the size of the file
+"""
+
+import bz2
+import itertools
+import logging
+import lzma
+import os
+import typing as ty
+import urllib.parse
+import zlib
+
+from app import decorators
+
+# the first bytes of a file compressed with each codec
+COMPRESSION_MAGIC = {
+    'gzip': b'\x1f\x8b',
+    'bz2': b'BZh',
+    'xz': b'\xfd7zXZ\x00',
+}
+MAX_MAGIC_LENGTH = max(len(magic) for magic in COMPRESSION_MAGIC.values())
+
+COMPRESSION_EXTENSIONS = {
+    '.gz': 'gzip', '.gzip': 'gzip', '.bz2': 'bz2', '.xz': 'xz',
+}
+
+# `gzip` and `deflate` are decoded by `requests` while streaming, these
+# are the encodings that are passed on as they were sent
+CONTENT_ENCODINGS = {
+    'bzip2': 'bz2', 'x-bzip2': 'bz2', 'xz': 'xz', 'x-xz': 'xz',
+}
+
+DECOMPRESSORS = {
+    # 16 + MAX_WBITS expects a gzip header and trailer
+    'gzip': lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+    'bz2': bz2.BZ2Decompressor,
+    'xz': lzma.LZMADecompressor,
+}
+
+DECOMPRESSION_ERRORS = (zlib.error, lzma.LZMAError, OSError, EOFError)
+
+
+@decorators.log_method
+def detect_compression(
+    url: str, head: bytes, content_encoding: str = ''
+) -> ty.Optional[str]:
+    """
+    Detects the compression of a source. The `Content-Encoding` header
+    and the file extension name the expected codec, which is confirmed
+    by the magic bytes at the start of the data. A `.gz` file that is
+    served with `Content-Encoding: gzip` is decoded by `requests`
+    already, i.e. its data does not start with the magic bytes and is
+    read as it is. Without a hint, the codec is detected from the magic
+    bytes alone
+
+    Args:
+        url (str): The URL or path of the source
+        head (bytes): the first bytes of the data
+        content_encoding (str): the `Content-Encoding` response header
+
+    Returns:
+        (str | None): name of the codec, or None if not compressed
+    """
+
+    extension = os.path.splitext(urllib.parse.urlparse(url).path)[1]
+    hint = CONTENT_ENCODINGS.get(content_encoding.lower()) or \
+        COMPRESSION_EXTENSIONS.get(extension.lower())
+    if hint is not None:
+        if head.startswith(COMPRESSION_MAGIC[hint]):
+            return hint
+        logging.info('`%s` is not %s-compressed (or was decoded while '
+            'downloading), reading it as it is', url, hint)
+        return None
+
+    for name, magic in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+@decorators.log_method
+def peek(
+    byte_chunks: ty.Iterable[bytes], size: int
+) -> ty.Tuple[bytes, ty.Iterator[bytes]]:
+    """
+    Reads at least `size` bytes from the start of a stream (unless it
+    is shorter) without consuming them
+
+    Args:
+        byte_chunks (iterable): byte chunks of the stream
+        size (int): number of bytes to be read
+
+    Returns:
+        (head, byte_chunks): the first bytes and an iterator over the
+        whole stream, including the first bytes
+    """
+
+    byte_chunks = iter(byte_chunks)
+    head = []
+    head_size = 0
+    for chunk in byte_chunks:
+        head.append(chunk)
+        head_size += len(chunk)
+        if head_size >= size:
+            break
+    return b''.join(head), itertools.chain(head, byte_chunks)
+
+@decorators.log_method
+def iter_decompressed(
+    byte_chunks: ty.Iterable[bytes], compression: str, max_length: int
+) -> ty.Iterator[bytes]:
+    """
+    Decompresses a stream incrementally. Files that consist of several
+    concatenated compressed streams (eg: `cat a.gz b.gz`) are supported
+
+    Args:
+        byte_chunks (iterable): compressed byte chunks of the stream
+        compression (str): name of the codec, see `DECOMPRESSORS`
+        max_length (int): the maximum size of each decompressed chunk
+
+    Yields:
+        bytes: decompressed byte chunks
+
+    Raises:
+        - `ValueError` if the data is corrupt or truncated
+    """
+
+    new_decompressor = DECOMPRESSORS[compression]
+    decompressor = new_decompressor()
+    for data in byte_chunks:
+        while True:
+            if decompressor.eof:
+                data = decompressor.unused_data + data
+                if not data:
+                    break
+                decompressor = new_decompressor()
+            try:
+                output = decompressor.decompress(data, max_length)
+            except DECOMPRESSION_ERRORS as err:
+                raise ValueError(
+                    f'Cannot decompress the {compression} data: {err}'
+                ) from err
+            if output:
+                yield output
+            # zlib returns the input that exceeded `max_length`, bz2 and
+            # lzma buffer it and need to be called with no input
+            if decompressor.eof:
+                # the rest of the input (i.e. `unused_data`) belongs to
+                # the next stream
+                data = b''
+                continue
+            data = getattr(decompressor, 'unconsumed_tail', b'')
+            if not data and getattr(decompressor, 'needs_input', True):
+                break
+
+    if hasattr(decompressor, 'flush') and not decompressor.eof:
+        # zlib may keep output back until it is flushed
+        output = decompressor.flush()
+        if output:
+            yield output
+    if not decompressor.eof:
+        raise ValueError(f'The {compression} data is truncated')
+
+@decorators.log_method
+def decompress_stream(
+    url: str, byte_chunks: ty.Iterable[bytes], max_length: int,
+    content_encoding: str = '',
+) -> ty.Iterator[bytes]:
+    """
+    Detects the compression of a stream from its first bytes (see
+    `detect_compression`) and decompresses it if it is compressed
+
+    Args:
+        url (str): The URL or path of the source
+        byte_chunks (iterable): byte chunks of the stream from its start
+        max_length (int): the maximum size of each decompressed chunk
+        content_encoding (str): the `Content-Encoding` response header
+
+    Returns:
+        Iterator: the decompressed byte chunks, or the byte chunks
+        unchanged if the stream is not compressed
+    """
+
+    head, byte_chunks = peek(byte_chunks, MAX_MAGIC_LENGTH)
+    compression = detect_compression(url, head, content_encoding)
+    if compression is None:
+        return byte_chunks
+    logging.info('Decompressing %s stream of `%s`', compression, url)
+    return iter_decompressed(byte_chunks, compression, max_length)
@@ -64,6 +64,7 @@ def exception_handler(func):
         except (
             ce.DataLoadingError, ce.DataValidationError,
             ce.InvalidFormatError, ce.UnSupporterdDataTypeError,
+            ce.InvalidConfigError,
             NotADirectoryError, OSError,
             requests.exceptions.RequestException
         ):
@@ -0,0 +1,342 @@
+"""
+Contains the backends that run the Celery tasks of `tasks.py` for the
+pipeline. Besides Celery, which needs a broker and separately started
+workers, the tasks can run in-process, in a pool of threads or
+processes or inline in the calling thread, so single-host runs do not
+need a broker.
+
+A backend is used through a `submit(task, *args)` function that runs
+the task with the arguments and returns a function that waits for the
+result and returns it.
+
+With the process backend, the numeric and ordinal columns of the data
+chunks are placed in shared memory blocks instead of being pickled, and
+the workers attach them as NumPy views (see `share_chunk` and
+`attach_chunk`).
+
+The process workers are started with the `forkserver` method (`spawn`
+where it is not available) instead of being forked from the driver,
+which already runs the prefetch and source threads. A worker gets the
+settings of `config` from the driver and imports the modules of the
+registered tasks (see `start_worker`), so a task that is added with
+`registry.register_task` must be registered when its module is
+imported, and the module must be importable, i.e. not `__main__`
+"""
+
+import contextlib
+import functools
+import importlib
+import multiprocessing
+import typing as ty
+import weakref
+from concurrent import futures
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app import config
+from app import custom_exceptions as ce
+from app import decorators, registry, tasks
+
+EXECUTORS = ['celery', 'threads', 'processes', 'inline']
+# the array kinds that are placed in shared memory: bool, int, float
+SHARED_KINDS = 'biuf'
+
+# the shared memory blocks attached by a process worker with a weak
+# reference to their arrays, closed once the arrays are no longer used
+_ATTACHED = []
+
+
+@contextlib.contextmanager
+def start_executor(
+    name: ty.Optional[str] = None, workers: ty.Optional[int] = None
+) -> ty.Iterator[ty.Callable[..., ty.Callable[[], ty.Any]]]:
+    """
+    Starts the backend `name` and yields its `submit` function. The pool
+    of the thread and process backends is shut down on exit, after the
+    submitted tasks are done. The Celery app is finalized first, as the
+    tasks of `tasks.py` are lazy proxies until then, and the sources
+    submit them from several threads
+
+    Args:
+        name (str | None): one of `EXECUTORS`, `config.EXECUTOR` if None
+        workers (int | None): size of the pool of the thread and process
+            backends, `config.EXECUTOR_WORKERS` if None
+
+    Yields:
+        submit (callable): runs a task of `tasks.py` with the arguments,
+            eg: `submit(tasks.map_tasks, names, chunk)()` is the result
+
+    Raises:
+        - `InvalidConfigError` if the backend is not supported
+    """
+
+    name = name or config.EXECUTOR
+    workers = workers or config.EXECUTOR_WORKERS
+    # evaluating a task proxy concurrently breaks its request stack
+    tasks.celery_app.finalize(auto=True)
+    if name == 'celery':
+        yield submit_to_celery
+    elif name == 'inline':
+        yield run_inline
+    elif name == 'threads':
+        with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            yield functools.partial(submit_to_pool, pool)
+    elif name == 'processes':
+        start_methods = multiprocessing.get_all_start_methods()
+        mp_context = multiprocessing.get_context(
+            'forkserver' if 'forkserver' in start_methods else 'spawn'
+        )
+        with futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=mp_context,
+            initializer=start_worker,
+            initargs=(get_config_settings(), get_task_modules()),
+        ) as pool:
+            yield functools.partial(submit_to_pool, pool)
+    else:
+        raise ce.InvalidConfigError(
+            f'Unsupported executor `{name}`, expected one of {EXECUTORS}'
+        )
+
+def get_config_settings() -> ty.Dict[str, ty.Any]:
+    """
+    Returns the settings of `config`, i.e. its upper case names, with
+    the values set in the driver, eg: by the command line flags
+
+    Returns:
+        settings (dict): eg: {'CHUNK_ROWS': 1024, ...}
+    """
+
+    return {
+        name: getattr(config, name) for name in dir(config) if name.isupper()
+    }
+
+def get_task_modules() -> ty.List[str]:
+    """
+    Returns the modules that define the functions of the registered
+    tasks, which register the tasks when they are imported
+
+    Returns:
+        modules (list): eg: ['app.registry', 'app.tasks']
+    """
+
+    modules = set()
+    for task in registry.TASKS.values():
+        for func in (task['map'], task['update']):
+            module = getattr(func, '__module__', None)
+            if module is not None and module != '__main__':
+                modules.add(module)
+    return sorted(modules)
+
+def start_worker(settings: ty.Dict[str, ty.Any], modules: ty.List[str]) -> None:
+    """
+    Initializes a process worker: applies the settings of `config` from
+    the driver and imports the modules of the registered tasks
+
+    Args:
+        settings (dict): see `get_config_settings`
+        modules (list): see `get_task_modules`
+    """
+
+    for name, value in settings.items():
+        setattr(config, name, value)
+    for module in modules:
+        importlib.import_module(module)
+
+@decorators.log_method
+def submit_to_celery(task: ty.Any, *args: ty.Any) -> ty.Callable[[], ty.Any]:
+    """
+    Sends the task to the Celery workers through the broker
+
+    Args:
+        task (celery.Task): a task of `tasks.py`
+        args: the arguments of the task
+
+    Returns:
+        (callable): waits for the result of the task and returns it
+    """
+
+    return task.delay(*args).get
+
+@decorators.log_method
+def run_inline(task: ty.Any, *args: ty.Any) -> ty.Callable[[], ty.Any]:
+    """
+    Runs the task in the calling thread, before returning. The task is
+    looked up by its name in the Celery app, as in `run_task`
+
+    Args:
+        task (celery.Task): a task of `tasks.py`
+        args: the arguments of the task
+
+    Returns:
+        (callable): returns the result of the task
+    """
+
+    result = tasks.celery_app.tasks[task.name](*args)
+    return lambda: result
+
+@decorators.log_method
+def submit_to_pool(
+    pool: futures.Executor, task: ty.Any, *args: ty.Any
+) -> ty.Callable[[], ty.Any]:
+    """
+    Submits the task to a thread or process pool. The task is sent by
+    its name (see `run_task`), as the Celery task objects cannot be
+    pickled for the processes. With `config.SHARED_MEMORY` set, the
+    data chunks are sent to the processes in shared memory blocks, which
+    are released when the result is returned
+
+    Args:
+        pool (Executor): the pool of the backend
+        task (celery.Task): a task of `tasks.py`
+        args: the arguments of the task
+
+    Returns:
+        (callable): waits for the result of the task and returns it
+    """
+
+    if not (config.SHARED_MEMORY
+            and isinstance(pool, futures.ProcessPoolExecutor)):
+        return pool.submit(run_task, task.name, *args).result
+
+    blocks = []
+    args = [
+        share_chunk(arg, blocks) if is_chunk(arg) else arg for arg in args
+    ]
+    future = pool.submit(run_task, task.name, *args)
+
+    def get_result() -> ty.Any:
+        try:
+            return future.result()
+        finally:
+            release_blocks(blocks)
+
+    return get_result
+
+def is_chunk(value: ty.Any) -> bool:
+    """
+    Checks if a task argument is a columnar chunk (see
+    `data_operations.to_columnar_chunk`)
+
+    Args:
+        value: an argument of a task
+
+    Returns:
+        (bool): True if `value` is a chunk
+    """
+
+    return isinstance(value, dict) and 'num_rows' in value \
+        and 'columns' in value
+
+@decorators.log_method
+def share_chunk(
+    chunk: ty.Dict, blocks: ty.List[shared_memory.SharedMemory]
+) -> ty.Dict:
+    """
+    Copies the numeric and ordinal columns of a chunk to new shared
+    memory blocks, which are appended to `blocks`. The other columns
+    are kept in the chunk as they are
+
+    Args:
+        chunk (dict): a columnar chunk
+        blocks (list): the blocks of the chunk, to be released with
+            `release_blocks` once the task is done
+
+    Returns:
+        chunk (dict): the chunk with the descriptors of the shared
+        columns under 'shared', eg:
+        {
+            'num_rows': 2,
+            'columns': {},
+            'shared': {
+                'Date': ('psm_1f2e3d4c', '<i4', (2,)),
+                'Time': ('psm_5b6a7988', '<i2', (2,)),
+            }
+        }
+    """
+
+    columns = {}
+    shared = {}
+    for name, values in chunk['columns'].items():
+        if values.dtype.kind not in SHARED_KINDS or not values.nbytes:
+            columns[name] = values
+            continue
+        block = shared_memory.SharedMemory(create=True, size=values.nbytes)
+        blocks.append(block)
+        np.ndarray(values.shape, values.dtype, buffer=block.buf)[...] = values
+        shared[name] = (block.name, values.dtype.str, values.shape)
+    return {**chunk, 'columns': columns, 'shared': shared}
+
+@decorators.log_method
+def attach_chunk(chunk: ty.Dict) -> ty.Dict:
+    """
+    Attaches the shared columns of a chunk from `share_chunk` as NumPy
+    views of their blocks, without copying them. The blocks stay
+    attached until the arrays are no longer used (see
+    `release_attached`)
+
+    Args:
+        chunk (dict): a chunk with the descriptors of its shared columns
+
+    Returns:
+        chunk (dict): the columnar chunk
+    """
+
+    release_attached()
+    columns = dict(chunk['columns'])
+    for name, (block_name, dtype, shape) in chunk['shared'].items():
+        block = shared_memory.SharedMemory(name=block_name)
+        columns[name] = np.ndarray(shape, dtype, buffer=block.buf)
+        # the arrays derived from the view keep it alive through `base`
+        _ATTACHED.append((block, weakref.ref(columns[name])))
+    return {'num_rows': chunk['num_rows'], 'columns': columns}
+
+def release_attached() -> None:
+    """
+    Closes the blocks attached by the worker whose arrays are no longer
+    used. The arrays of a task can outlive it in its result until the
+    result is sent back, so the blocks are closed on the next task.
+    A block must not be closed while an array uses it, as the array
+    would point to unmapped memory
+    """
+
+    for attached in list(_ATTACHED):
+        block, array_ref = attached
+        if array_ref() is None:
+            block.close()
+            _ATTACHED.remove(attached)
+
+def release_blocks(blocks: ty.List[shared_memory.SharedMemory]) -> None:
+    """
+    Closes and frees the shared memory blocks of a chunk, the workers
+    keep the blocks that they still use until they close them
+
+    Args:
+        blocks (list): the blocks from `share_chunk`
+    """
+
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+def run_task(task_name: str, *args: ty.Any) -> ty.Any:
+    """
+    Runs the task that is registered in the Celery app as `task_name`.
+    In a process worker, the tasks and the registry are the ones that
+    are defined when the modules of the tasks are imported (see
+    `start_worker`), and the chunks in shared memory are attached (see
+    `attach_chunk`)
+
+    Args:
+        task_name (str): eg: 'app.tasks.map_tasks'
+        args: the arguments of the task
+
+    Returns:
+        the result of the task
+    """
+
+    args = [
+        attach_chunk(arg) if is_chunk(arg) and 'shared' in arg else arg
+        for arg in args
+    ]
+    return tasks.celery_app.tasks[task_name](*args)
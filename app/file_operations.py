@@ -7,7 +7,7 @@ import typing as ty
 
 from app import config
 from app import data_operations as data_op
-from app import decorators
+from app import decorators, registry, validator
 
 
 @decorators.log_method
@@ -29,35 +29,136 @@ def get_full_path(dir_path: str, file_name: str):
         full_path = f'{dir_path}/{file_name}'
     return full_path
 
+@decorators.log_method
+def get_checkpoint_name(file_name: str, ckpt_num: int, source_num: int = 0) -> str:
+    """
+    Returns the name of a checkpoint file (without the extension).
+    The checkpoints of the first (or only) source are named
+    `{file_name}-ckpt-{ckpt_num}`, the ones of the other sources of a
+    multi-source run are named `{file_name}-{source_num}-ckpt-{ckpt_num}`
+
+    Args:
+        file_name (str): name of the task or progress file
+        ckpt_num (int): Checkpoint count
+        source_num (int): index of the source in the run
+
+    Returns:
+        (str): name of the checkpoint file
+    """
+
+    if source_num:
+        return f'{file_name}-{source_num}-ckpt-{ckpt_num}'
+    return f'{file_name}-ckpt-{ckpt_num}'
+
+@decorators.log_method
+def parse_checkpoint_name(name: str) -> ty.Optional[ty.Tuple[str, int, int]]:
+    """
+    Splits the name of a checkpoint file into its parts (see
+    `get_checkpoint_name`). The file names of the tasks do not contain
+    a '-' (see `validator.check_file_name`), so the source number is
+    the part after the last '-' before '-ckpt-', if it is a number
+
+    Args:
+        name (str): name of the checkpoint file, eg: 'task1-2-ckpt-5.pkl'
+
+    Returns:
+        (file_name, source_num, ckpt_num) | None: eg: ('task1', 2, 5),
+        None if the name is not the name of a checkpoint
+    """
+
+    prefix, sep, ckpt_num = name[:-4].rpartition('-ckpt-')
+    if name[-4:] != '.pkl' or not sep or not ckpt_num.isdigit():
+        return None
+    file_name, sep, source_num = prefix.rpartition('-')
+    if not sep or not source_num.isdigit():
+        file_name, source_num = prefix, '0'
+    return file_name, int(source_num), int(ckpt_num)
+
 @decorators.log_method
 def save_checkpoints(
-    t1_result: ty.Dict,
-    t2_result: ty.List[ty.Tuple],
-    t3_result: ty.List[ty.Tuple],
+    task_ckpts: ty.Dict[str, ty.Dict],
     ckpt_num: int,
+    progress: ty.Optional[ty.Dict] = None,
+    source_num: int = 0,
 ) -> None:
     """
-    Saves the values of task1, task2 and task3 result variables in a
-    pickle file.
+    Saves the checkpoint of each task in a pickle file named after the
+    file name of the task (see `registry.get_file_name`).
+    If `progress` is passed, it is saved in a pickle file as well so
+    that the run can be resumed from this checkpoint
 
     Args:
-        t1_result (dict): Result of task 1 until checkpoint
-        t2_result (list): Result of task 2 until checkpoint
-        t3_result (list): Result of task 3 until checkpoint
+        task_ckpts (dict): the checkpoints by task file name, each with
+            the result of the task since the previous checkpoint and the
+            state that is carried over, see `registry`
         ckpt_num (int): Checkpoint count
+        progress (dict | None): Position in the source at the checkpoint
+        source_num (int): index of the source in the run
+
+    >>> Example value of `task_ckpts`:
+    {'task2': {'result': [(732463, 900)], 'state': []}}
+
+    >>> Example value of `progress`:
+    {'url': 'http://a.b/c.csv', 'byte_offset': 61632, 'row_count': 1023}
 
     Raises:
         - `OSError`: If an error occurs while saving the pkl files
     """
 
-    t1_file_name = config.T1_FILE_NAME + f'-ckpt-{ckpt_num}'
-    save_as_pkl(t1_result, t1_file_name, config.OUTPUT_DIR)
+    for file_name, task_ckpt in task_ckpts.items():
+        ckpt_file_name = get_checkpoint_name(file_name, ckpt_num, source_num)
+        save_as_pkl(task_ckpt, ckpt_file_name, config.OUTPUT_DIR)
 
-    t2_file_name = config.T2_FILE_NAME + f'-ckpt-{ckpt_num}'
-    save_as_pkl(t2_result, t2_file_name, config.OUTPUT_DIR)
+    if progress is not None:
+        # saved last, so it never points past the saved task results
+        progress_file_name = get_checkpoint_name(
+            config.PROGRESS_FILE_NAME, ckpt_num, source_num
+        )
+        save_as_pkl(progress, progress_file_name, config.OUTPUT_DIR)
 
-    t3_file_name = config.T3_FILE_NAME + f'-ckpt-{ckpt_num}'
-    save_as_pkl(t3_result, t3_file_name, config.OUTPUT_DIR)
+@decorators.log_method
+def load_latest_progress(source_num: int = 0) -> ty.Optional[ty.Dict]:
+    """
+    Loads the progress that was saved with the latest checkpoint of a
+    source in `config.OUTPUT_DIR` and adds the checkpoint number to it
+
+    Args:
+        source_num (int): index of the source in the run
+
+    Returns:
+        progress (dict | None): The position in the source at the latest
+        checkpoint, or None if no progress was saved, eg:
+        {'url': 'http://a.b/c.csv', 'byte_offset': 61632,
+         'row_count': 1023, 'ckpt_num': 1}
+
+    Raises:
+        - `OSError` if an error occurs in reading a pkl file
+    """
+
+    ckpt_nums = []
+    for name in os.listdir(config.OUTPUT_DIR):
+        parts = parse_checkpoint_name(name)
+        if parts is None:
+            continue
+        file_name, ckpt_source_num, ckpt_num = parts
+        if (file_name, ckpt_source_num) == (config.PROGRESS_FILE_NAME, source_num):
+            ckpt_nums.append(ckpt_num)
+    if not ckpt_nums:
+        return None
+
+    ckpt_num = max(ckpt_nums)
+    file_name = get_checkpoint_name(config.PROGRESS_FILE_NAME, ckpt_num, source_num)
+    file_path = get_full_path(config.OUTPUT_DIR, file_name + '.pkl')
+    try:
+        with open(file_path, 'rb') as file:
+            progress = pickle.load(file)
+    except OSError as err:
+        logging.error('Error when opening `%s`\n%s', file_path, str(err),
+            exc_info=True)
+        raise OSError from err
+
+    progress['ckpt_num'] = ckpt_num
+    return progress
 
 @decorators.log_method
 def save_as_pkl(
@@ -88,16 +189,16 @@ def save_as_pkl(
         raise OSError from err
 
 @decorators.log_method
-def append_lines_to_file(
-    lines: ty.List, dir_path: str, file_name: str
+def write_lines_to_file(
+    lines: ty.Iterable[str], dir_path: str, file_name: str
 ) -> None:
     """
-    Opens `file_name` at `dir_path` in append mode (`a`) and appends
-    the contents to the end of file. Creates a new file if the file name
-    doesn't exist on the path.
+    Opens `file_name` at `dir_path` with write mode (`w`) and replaces
+    the contents of the file with the lines. The lines are written as
+    they are produced, so they can be generated lazily
 
     Args:
-        lines (list): List of str that are to be appended to the file
+        lines (iterable): str lines that are to be written to the file
         dir_path (str): path of the dir where file is to be saved
         file_name (str): name of the file to be saved
 
@@ -105,15 +206,14 @@ def append_lines_to_file(
         - `OSError` if a problem occurs in reading/writing to file
     """
 
-    file_path = get_full_path(dir_path, file_name) + config.FILE_EXTENSION
+    file_path = get_full_path(dir_path, file_name)
 
     try:
-        with open(file=file_path, mode='a', encoding='utf-8') as file:
+        with open(file=file_path, mode='w', encoding='utf-8') as file:
             for line in lines:
                 file.write(line + '\n')
     except OSError as err:
-        logging.error('Error while appending to `%s`\n%s', file_name,
-            str(err), exc_info=True)
+        logging.error('Error during file write\n%s', str(err), exc_info=True)
         raise OSError from err
 
 @decorators.log_method
@@ -143,128 +243,128 @@ def save_task_1_to_disk(
         - `OSError` if an error occurs in reading or writing file
     """
 
+    lines = format_task_1_as_lines(
+        task_1_a_result, task_1_b_result, task_1_c_result, top_count_value
+    )
+    write_lines_to_file(lines, dir_path, file_name)
+
+@decorators.log_method
+def format_task_1_as_lines(
+    task_1_a_result: ty.List[ty.Tuple],
+    task_1_b_result: str,
+    task_1_c_result: ty.List[ty.Tuple],
+    top_count_value: str,
+) -> ty.List[str]:
+    """
+    Formats the results for part a, b and c of task 1 as the lines of
+    the task 1 output file, each part under its heading
+
+    Args:
+        task_1_a_result: contains result for 1 a
+        task_1_b_result: contains result for 1 b
+        task_1_c_result: contains result for 1 c
+        top_count_value: the number of top entires in result 1 c
+
+    Returns:
+        lines (list): the lines of the output file
+    """
+
     task_1_a_heading = 'Average time of hottest daily temperature (over month)'
     task_1_b_heading = 'Most commonly occurring hottest time of day'
     task_1_c_heading = f'Top {top_count_value} hottest times on distinct days'
 
-    file_path = get_full_path(dir_path, file_name)
+    # heading and output for 1 a
+    lines = [task_1_a_heading]
+    lines.extend(ele[0] + ' ' + ele[1] for ele in task_1_a_result)
 
-    try:
-        with open(file=file_path, mode='w', encoding='utf-8') as file:
-            # heading for 1 a
-            file.write(task_1_a_heading + '\n')
-            # output of 1 a
-            for ele in task_1_a_result:
-                file.write(ele[0] + ' ' + ele[1] + '\n')
-
-            # heading for 1 b
-            file.write('\n' + task_1_b_heading + '\n')
-            # output of 1 b
-            file.write(task_1_b_result + '\n')
-
-            # heading for 1 c
-            file.write('\n' + task_1_c_heading + '\n')
-            # output of 1 c
-            for ele in task_1_c_result:
-                file.write(ele[0] + ' ' + ele[1] + '\n')
-    except OSError as err:
-        logging.error('Error during file write\n%s', str(err), exc_info=True)
-        raise OSError from err
+    # heading and output for 1 b
+    lines.extend(['', task_1_b_heading, task_1_b_result])
+
+    # heading and output for 1 c
+    lines.extend(['', task_1_c_heading])
+    lines.extend(ele[0] + ' ' + ele[1] for ele in task_1_c_result)
+    return lines
 
 @decorators.log_method
-def get_task_checkpoint_file_names() -> ty.Tuple[ty.List, ty.List, ty.List]:
+def get_task_checkpoint_file_names(
+    file_names: ty.Iterable[str]
+) -> ty.Dict[str, ty.List[str]]:
     """
-    Returns a tuple of lists containing task checkpoint file names
+    Returns the checkpoint file names of the tasks, sorted by source
+    number and checkpoint number
+
+    Args:
+        file_names (iterable): the file names of the tasks, see
+            `registry.get_file_name`
 
     Returns:
-        (`task_1_ckpts`, `task_2_ckpts`, `task_3_ckpts`):
-        A tuple contining 3 elements with ckpt file names of each tsk
-        - `task_1_ckpts` (list): contains pkl file names for task 1
-        - `task_2_ckpts` (list): contains pkl file names for task 2
-        - `task_3_ckpts` (list): contains pkl file names for task 3
+        task_ckpts (dict): the pkl file names of the checkpoints by task
+        file name, eg:
+        {'task1': ['task1-ckpt-1.pkl', 'task1-ckpt-2.pkl'], 'task2': []}
     """
 
-    # gather all the files in output dir that have .pkl extension
+    task_ckpts = {file_name: [] for file_name in file_names}
+
+    # gather all the checkpoint files in output dir, other files are
+    # skipped
     pkl_files = []
     for name in os.listdir(config.OUTPUT_DIR):
-        if name[-4:] == '.pkl':
-            pkl_files.append(name)
-
-    # sort them based on task number and checkpoint number
-    pkl_files = sorted(pkl_files,key=lambda name: (
-            name.split('-')[0], int(name.split('-')[2].split('.')[0]))
-    )
+        parts = parse_checkpoint_name(name)
+        if parts is not None:
+            pkl_files.append((parts, name))
 
-    task_1_ckpts = []
-    task_2_ckpts = []
-    task_3_ckpts = []
-    for name in pkl_files:
-        if name.split('-')[0] == config.T1_FILE_NAME:
-            task_1_ckpts.append(name)
-        elif name.split('-')[0] == config.T2_FILE_NAME:
-            task_2_ckpts.append(name)
-        elif name.split('-')[0] == config.T3_FILE_NAME:
-            task_3_ckpts.append(name)
+    # sort them based on task, source number and checkpoint number
+    for (file_name, _, _), name in sorted(pkl_files):
+        if file_name in task_ckpts:
+            task_ckpts[file_name].append(name)
 
-    return task_1_ckpts, task_2_ckpts, task_3_ckpts
+    return task_ckpts
 
 @decorators.log_method
-def gather_task_1_results(t1_ckpts: ty.List[str]) -> ty.Dict:
+def load_pkl(file_name: str, dir_path: str) -> ty.Any:
     """
-    Gathers task 1 result dict from the given checkpoint file names.
+    Loads the contents of the pickle file `file_name` at `dir_path`
 
     Args:
-        t1_ckpts (list): A list of task 1 checkpoint file names
+        file_name (str): name of the file, with the `.pkl` extension
+        dir_path (str): path of the dir where the file is saved
 
     Returns:
-        task_1_output (dict): A dict containing the task 1 results
+        data (Any): the unpickled contents of the file
 
     Raises:
-        - `OSError` if an error occurs in reading a pkl file
+        - `OSError` if an error occurs in reading the pkl file
     """
 
-    task_1_output = {}
-    for name in t1_ckpts:
-        file_path = get_full_path(config.OUTPUT_DIR, name)
-        try:
-            with open(file_path, 'rb') as file:
-                task_1_output.update(pickle.load(file))
-        except OSError as err:
-            logging.error('Error when opening `%s`\n%s', name, str(err),
-                exc_info=True)
-            raise OSError from err
-
-    return task_1_output
+    file_path = get_full_path(dir_path, file_name)
+    try:
+        with open(file_path, 'rb') as file:
+            return pickle.load(file)
+    except OSError as err:
+        logging.error('Error when opening `%s`\n%s', file_name, str(err),
+            exc_info=True)
+        raise OSError from err
 
 @decorators.log_method
-def gather_and_save_task_results(ckpts: ty.List[str], task_num: int) -> None:
+def load_checkpoint(file_name: str, dir_path: str) -> ty.Dict:
     """
-    Gathers and saves the results for task 2 or 3 (depeding on args)
+    Loads the checkpoint of a task `file_name` at `dir_path`
 
     Args:
-        ckpts (list): A list of checkpoint file names
-        task_num (int): An integer representing the task number (2 or 3)
+        file_name (str): name of the file, with the `.pkl` extension
+        dir_path (str): path of the dir where the file is saved
 
     Returns:
-        None
+        checkpoint (dict): {'result': ..., 'state': ...}
 
     Raises:
-        - `OSError` if an error occurs in reading or writing file
+        - `OSError` if an error occurs in reading the pkl file
+        - `InvalidFormatError` if the file is not a checkpoint of a task
     """
 
-    for name in ckpts:
-        file_path = get_full_path(config.OUTPUT_DIR, name)
-        task_output = []
-        try:
-            with open(file_path, 'rb') as file:
-                task_output = pickle.load(file)
-        except OSError as err:
-            logging.error('Error when opening `%s`\n%s', name, str(err), exc_info=True)
-            raise OSError from err
-
-        lines = format_task_result_as_lines(task_output, task_num)
-        file_name = name.split('-ckpt-')[0]
-        append_lines_to_file(lines, config.OUTPUT_DIR, file_name)
+    checkpoint = load_pkl(file_name, dir_path)
+    validator.check_checkpoint_format(checkpoint, file_name)
+    return checkpoint
 
 @decorators.log_method
 def format_task_result_as_lines(
@@ -272,6 +372,8 @@ def format_task_result_as_lines(
 ) -> ty.List[str]:
     """
     Formats the task output as list of strings based on the task number.
+    The dates (day ordinals) are formatted as 'DD/MM/YYYY' and the
+    times (minutes of the day) as 'HH:MM'
 
     Args:
         output (list): The task output to be formatted
@@ -281,39 +383,54 @@ def format_task_result_as_lines(
         lines (list): A list of formatted task output lines
     """
 
+    date_strs = data_op.format_day_ordinals([ele[0] for ele in task_result])
+    time_strs = data_op.format_minutes_of_day(
+        [ele[1] for ele in task_result]
+    ).tolist()
     lines = []
-    for ele in task_result:
+    for ele, date_str, time_str in zip(task_result, date_strs, time_strs):
         if task_num == 2:
-            line = f'{ele[0]} {ele[1]}'
+            line = f'{date_str} {time_str}'
         elif task_num == 3:
-            line = f'{ele[0]} {ele[1]} {ele[2]}'
+            line = f'{date_str} {time_str} {ele[2]}'
         lines.append(line)
     return lines
 
 @decorators.log_method
-def compile_checkpoints_to_generate_output() -> None:
+def compile_checkpoints_to_generate_output(
+    task_names: ty.Optional[ty.List[str]] = None
+) -> None:
     """
-    Compiles the checkpoint files to generate the output of task1,2,3
+    Compiles the checkpoint files to generate the output of the tasks.
+    The results of the checkpoints of each task are merged and finalized
+    by the task (see `registry`) and written to its output file
+
+    Args:
+        task_names (list | None): names of the tasks, the enabled tasks
+            if None (see `registry.get_enabled_task_names`)
 
     Raises:
         - `OSError` if an error occurs in reading or writing file
+        - `InvalidFormatError` if a checkpoint is malformed
     """
 
-    try:
-        t1_ckpts, t2_ckpts, t3_ckpts = get_task_checkpoint_file_names()
+    if task_names is None:
+        task_names = registry.get_enabled_task_names()
+    file_names = {name: registry.get_file_name(name) for name in task_names}
 
-        task_1_output = gather_task_1_results(t1_ckpts)
-        task_1_a, task_1_b, task_1_c = data_op.formatted_task_1_results(
-            task_1_output, config.T1_COUNT_OF_TOP_HOTTEST_DAYS
-        )
-        save_task_1_to_disk(
-            task_1_a, task_1_b, task_1_c,
-            config.T1_COUNT_OF_TOP_HOTTEST_DAYS,
-            config.OUTPUT_DIR, config.T1_FILE_NAME + config.FILE_EXTENSION
-        )
-
-        gather_and_save_task_results(t2_ckpts, 2)
-        gather_and_save_task_results(t3_ckpts, 3)
+    try:
+        task_ckpts = get_task_checkpoint_file_names(file_names.values())
+        for name, file_name in file_names.items():
+            task = registry.get_task(name)
+            # the checkpoints are loaded one at a time as they are merged
+            results = (
+                load_checkpoint(ckpt_name, config.OUTPUT_DIR)['result']
+                for ckpt_name in task_ckpts[file_name]
+            )
+            lines = task['finalize'](task['merge'](results))
+            write_lines_to_file(
+                lines, config.OUTPUT_DIR, file_name + config.FILE_EXTENSION
+            )
 
     except OSError as err:
         logging.error('Error occurred during processing:\n%s', str(err),
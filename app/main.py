@@ -1,18 +1,24 @@
 """The entry point file of the script"""
 
 import argparse
+import collections
+import logging
+import os
 import sys
+import typing as ty
 import unittest
+from concurrent import futures
 
 sys.path.append('.') # to make 'app' folder visible from the base dir
 
 # pylint: disable=wrong-import-position
 from app import config
+from app import custom_exceptions as ce
 from app import data_fetcher as data_f
 from app import data_operations as data_op
-from app import decorators
+from app import decorators, executors
 from app import file_operations as file_op
-from app import tasks, validator
+from app import pipeline, registry, tasks, validator
 
 
 @decorators.exception_handler
@@ -22,20 +28,26 @@ def main() -> None:
     The entry point function of the script.
     Loops over the iterator function `get_data_chunk()` to get the
     remote resource data one chunk at a time (as a pandas DataFrame).
+    Only the columns that are used in any of the tasks (i.e. listed in
+    `config.EXPECTED_COL_NAMES`) are parsed from the CSV, and the
+    numeric ones are parsed directly as numbers.
 
     Data transformation operations are performed on the data chunk like
-    standardising the values in the dataframe, removing rows with
-    partial/incomplete data, dropping columns that are not used in any
-    of the tasks (i.e. not listed in `config.EXPECTED_COL_NAMES`)
-
-    Each transformed data chunk is passed to the three task functions.
-    These functions perform their respective analysis on the data.
-
-    A data structure (dict for task1 and list for task2 and task3) is
-    used to keep track of the output of each task on the data chunks.
-    These dictionary for task1 is passed as a parameter to the
-    `perform_task_1` method so that the method has access to the output
-    of task1 on previous data chunks. This is vital to ensure the
+    standardising the values in the dataframe and removing rows with
+    partial/incomplete data. Up to `config.PREFETCH_DEPTH` chunks are
+    fetched and transformed ahead in a background thread (see
+    `pipeline.prefetch`)
+
+    Each transformed data chunk is passed to the registered tasks that
+    are enabled in `config.TASKS` (see `registry`), and only the columns
+    that they read are parsed. These functions perform their respective
+    analysis on the data. They run on the backend in `config.EXECUTOR`:
+    the Celery workers, or a thread or process pool or the main thread,
+    which need no broker (see `executors`).
+
+    Every task keeps a state that is passed to its `update` function
+    along with each chunk, so that the function has access to the output
+    of the task on previous data chunks. This is vital to ensure the
     correctness of the final result of task1.
 
     Example:
@@ -59,65 +71,413 @@ def main() -> None:
     previous operations in order to ensure the correctness of the result
     until all the chunks are processed.
 
-    For task2 and task3, a list is maintatined to store the results for
-    each of these task results. The result of each data chunk is added
-    to these lists.
+    For task2 and task3, the state is a list of the results of the data
+    chunks. Task 3 also passes the rows of the last day of a chunk on to
+    the next chunk (see `tasks.perform_task_3`), as the day can continue
+    there. At every checkpoint, the results are taken out of the states
+    and saved, along with the states that are carried over.
+
+    The position in the source (byte offset and row count) is saved
+    with every checkpoint. With `config.RESUME` set, the run continues
+    from the latest checkpoint in `config.OUTPUT_DIR` instead of
+    downloading the source from the start.
 
-    Finally, the resutls of the three tasks are written to the disk
+    With `config.SOURCES` set (eg: the monthly files of a year), up to
+    `config.SOURCE_WORKERS` sources
+    are processed concurrently, each with its own task state and
+    checkpoints (see `process_source`). The checkpoints of all the
+    sources are merged into a single output, as one series of readings,
+    so the sources are expected in the order of their readings. A day
+    can be split between two sources, eg: monthly files that end at
+    noon: the first and the last day of each source are kept apart and
+    joined with the same day of the other sources when the checkpoints
+    are merged (see `tasks.merge_task_1_summaries` and
+    `tasks.merge_task_3`). Otherwise the sources must not overlap in
+    time, as the rows of Task 2 and Task 3 are not deduplicated across
+    sources. A warning is logged for the sources whose readings overlap
+    (see `warn_about_overlapping_sources`).
+
+    Finally, the resutls of the tasks are merged and written to the disk
     The execution of the script is terminated if an error occurs
     """
 
     validator.validate_dir_path(config.OUTPUT_DIR)
+    sources = data_f.expand_sources(config.SOURCES or [config.URL])
+    task_names = registry.get_enabled_task_names()
+
+    # only the columns used in the tasks are parsed from the CSV
+    projection = data_op.get_column_projection(
+        registry.get_task_columns(task_names)
+    )
+
+    # the backend that runs the tasks, shared by all the sources
+    with executors.start_executor() as submit:
+        if len(sources) == 1:
+            process_source(sources[0], 0, projection, task_names, submit)
+        else:
+            workers = min(config.SOURCE_WORKERS, len(sources))
+            logging.info('Processing %s sources with %s workers',
+                len(sources), workers)
+            with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = [
+                    executor.submit(
+                        process_source, url, source_num, projection,
+                        task_names, submit,
+                    )
+                    for source_num, url in enumerate(sources)
+                ]
+                done, _ = futures.wait(
+                    pending, return_when=futures.FIRST_EXCEPTION
+                )
+                for future in done:
+                    if future.exception() is not None:
+                        # the sources that have not started are not processed
+                        for other in pending:
+                            other.cancel()
+                        raise future.exception()
+            warn_about_overlapping_sources(
+                sources, [future.result() for future in pending]
+            )
+
+    file_op.compile_checkpoints_to_generate_output(task_names)
+
+
+@decorators.log_method
+def process_source(
+    url: str,
+    source_num: int,
+    projection: ty.Optional[ty.Dict],
+    task_names: ty.List[str],
+    submit: ty.Callable[..., ty.Callable[[], ty.Any]],
+) -> ty.Optional[ty.Tuple[int, int]]:
+    """
+    Runs the tasks on the data chunks of one source and saves their
+    results as checkpoints of the source (see `main`). The tasks with a
+    `map` function are mapped on the workers for up to
+    `config.IN_FLIGHT_CHUNKS` chunks at a time, all of them in one
+    message per chunk unless `config.FUSE_TASKS` is unset (see
+    `tasks.map_tasks`), and their partial
+    results are combined in the order of the chunks (see
+    `collect_chunk`). The state of the other tasks is passed to their
+    `update` function on a worker with every chunk (see `registry`)
+
+    Args:
+        url (str): The URL, `file://` URI or path of the source
+        source_num (int): index of the source in the run, used in the
+            names of its checkpoints
+        projection (dict | None): the columns to be parsed from the CSV,
+            see `data_operations.get_column_projection`
+        task_names (list): names of the registered tasks to be run
+        submit (callable): runs a task on the executor backend, see
+            `executors.start_executor`
+
+    Returns:
+        span (tuple | None): the first and the last reading of the
+        processed chunks, see `data_operations.get_time_span`
+
+    Raises:
+        - `InvalidConfigError` if the checkpoints to resume from belong
+            to another source
+        - `OSError` if an error occurs in reading/writing a pkl file
+    """
+
+    # the days of a source that is downloaded out of order can continue
+    # in any later chunk
+    in_order = data_f.is_read_in_order()
+    # for tracking the state of the tasks on data chunks
+    states = {
+        name: registry.get_task(name)['init'](in_order) for name in task_names
+    }
+
+    # position in the source after the last processed chunk
+    progress = {'url': url, 'byte_offset': 0, 'row_count': 0}
+    start_num = 0
+    if config.RESUME:
+        progress, start_num, states = load_resume_state(
+            url, source_num, states
+        )
+
+    num = start_num
+    data_chunks = data_f.get_data_chunk(
+        url, projection, progress['byte_offset'], progress['row_count']
+    )
+    # the next chunks are fetched and transformed in the background
+    # while the tasks of the current chunk are running
+    prepared_chunks = pipeline.prefetch(
+        pipeline.iter_transformed_chunks(url, data_chunks),
+        config.PREFETCH_DEPTH,
+    )
+    # the tasks with a `map` function are dispatched for up to
+    # `config.IN_FLIGHT_CHUNKS` chunks before the oldest is collected.
+    # The chunks are collected by their sequence number, whatever order
+    # the workers finish them in, as `combine` expects the partial
+    # results in the order the chunks were read
+    mapped_names = [
+        name for name in task_names if registry.get_task(name)['map'] is not None
+    ]
+    in_flight = collections.deque()
+    span = None
+    for num, (data_chunk, progress) in enumerate(
+        prepared_chunks, start=start_num
+    ):
+        span = data_op.get_time_span(data_chunk, span)
+        # one message for all the mapped tasks, or one for each task
+        if config.FUSE_TASKS:
+            groups = [mapped_names] if mapped_names else []
+        else:
+            groups = [[name] for name in mapped_names]
+        partials = [
+            submit(tasks.map_tasks, names, data_chunk) for names in groups
+        ]
+        # the chunk is only kept for the tasks that are updated in order
+        if len(mapped_names) == len(task_names):
+            data_chunk = None
+        in_flight.append((num, progress, data_chunk, partials))
+        if len(in_flight) >= max(config.IN_FLIGHT_CHUNKS, 1):
+            collect_chunk(states, *in_flight.popleft(), source_num, submit)
+
+    while in_flight:
+        collect_chunk(states, *in_flight.popleft(), source_num, submit)
+    save_task_checkpoints(states, num+1, progress, source_num, True)
+    return span
+
+
+@decorators.log_method
+def warn_about_overlapping_sources(
+    sources: ty.List[str], spans: ty.List[ty.Optional[ty.Tuple[int, int]]]
+) -> None:
+    """
+    Logs a warning for each pair of sources whose readings overlap in
+    time, as their rows would be counted twice in the merged output
+    (see `main`). Sources that continue each other do not overlap, even
+    if they split a day, eg: monthly files that end at noon, as the
+    first and the last day of a source are merged with the other sources
+
+    Args:
+        sources (list): the URLs of the sources
+        spans (list): the first and the last reading of each source,
+            None for a source without rows
+    """
+
+    spanned = sorted(
+        (span, url) for span, url in zip(spans, sources) if span is not None
+    )
+    for (prev_span, prev_url), (span, url) in zip(spanned, spanned[1:]):
+        if span[0] <= prev_span[1]:
+            logging.warning('The readings of `%s` and `%s` overlap, the '
+                'overlapping rows are counted twice in the output',
+                prev_url, url)
+
+
+@decorators.log_method
+def collect_chunk(
+    states: ty.Dict[str, ty.Any],
+    num: int,
+    progress: ty.Optional[ty.Dict],
+    data_chunk: ty.Optional[ty.Dict],
+    partials: ty.List[ty.Any],
+    source_num: int,
+    submit: ty.Callable[..., ty.Callable[[], ty.Any]],
+) -> None:
+    """
+    Combines the partial results of a chunk with the states of the tasks
+    (see `registry`) and updates the states of the tasks without a `map`
+    function with the chunk, then saves a checkpoint if it is due. The
+    chunks must be collected in the order of `num`, i.e. the order they
+    were read, even if a later chunk is done first, so the states
+    replaced in `states` and the checkpoints are the same as with one
+    chunk in flight. Whether that is the order of the source is up to
+    the `in_order` flag of the states (see `registry`)
+
+    Args:
+        states (dict): the states of the tasks by name
+        num (int): number of the chunk
+        progress (dict | None): Position in the source after the chunk
+        data_chunk (dict | None): the chunk, needed if a task has no
+            `map` function
+        partials (list): the pending results of `tasks.map_tasks` on the
+            chunk, functions that return the partial results by task
+            name
+        source_num (int): index of the source in the run
+        submit (callable): runs a task on the executor backend
+
+    Raises:
+        - `OSError` if an error occurs in writing a pkl file
+    """
+
+    pending = {
+        name: submit(tasks.update_task, name, states[name], data_chunk)
+        for name in states if registry.get_task(name)['map'] is None
+    }
+    for result in partials:
+        for name, partial in result().items():
+            states[name] = registry.get_task(name)['combine'](
+                states[name], partial
+            )
+    for name, result in pending.items():
+        states[name] = result()
+
+    if num > 0 and num % config.SAVE_CKPT_EVERY == 0:
+        # save the results so far as checkpoints, along with the
+        # states that are carried over to the next chunk
+        save_task_checkpoints(states, num, progress, source_num, False)
+
 
-    # for tracking the result of tasks on data chunks
-    task_1_res = {}
-    task_2_res = []
-    task_3_res = []
+@decorators.log_method
+def save_task_checkpoints(
+    states: ty.Dict[str, ty.Any],
+    ckpt_num: int,
+    progress: ty.Optional[ty.Dict],
+    source_num: int,
+    final: bool,
+) -> None:
+    """
+    Flushes the states of the tasks (see `registry`) and saves their
+    results and the states that are carried over as a checkpoint. The
+    flushed states replace the states in `states`
+
+    Args:
+        states (dict): the states of the tasks by name
+        ckpt_num (int): Checkpoint count
+        progress (dict | None): Position in the source at the checkpoint
+        source_num (int): index of the source in the run
+        final (bool): whether the source has no more chunks
+
+    Raises:
+        - `OSError` if an error occurs in writing a pkl file
+    """
+
+    task_ckpts = {}
+    for name, state in states.items():
+        result, states[name] = registry.get_task(name)['flush'](state, final)
+        task_ckpts[registry.get_file_name(name)] = {
+            'result': result, 'state': states[name]
+        }
+    file_op.save_checkpoints(task_ckpts, ckpt_num, progress, source_num)
 
-    num = 0
-    for num, data_chunk in enumerate(data_f.get_data_chunk(config.URL)):
-        data_chunk = data_op.transform_data(data_chunk)
 
-        chunk_result_t1 = tasks.perform_task_1.delay(data_chunk, task_1_res)
-        chunk_result_t2 = tasks.perform_task_2.delay(data_chunk)
-        chunk_result_t3 = tasks.perform_task_3.delay(data_chunk)
+@decorators.log_method
+def load_resume_state(
+    url: str, source_num: int, states: ty.Dict[str, ty.Any]
+) -> ty.Tuple[ty.Dict, int, ty.Dict[str, ty.Any]]:
+    """
+    Loads the state that is needed to resume a previous run of a source
+    from its latest checkpoint in `config.OUTPUT_DIR`
+
+    Args:
+        url (str): The URL, `file://` URI or path of the source
+        source_num (int): index of the source in the run
+        states (dict): the initial states of the tasks by name, kept for
+            the tasks that have no checkpoint
+
+    Returns:
+        (`progress`, `start_num`, `states`):
+        - `progress` (dict): position in the source at the checkpoint
+        - `start_num` (int): number of the next chunk to be processed
+        - `states` (dict): the states of the tasks at the checkpoint, eg:
+            the open days that may continue in the next chunk
+
+    Raises:
+        - `InvalidConfigError` if the checkpoint belongs to another URL
+        - `OSError` if an error occurs in reading a pkl file
+        - `InvalidFormatError` if a checkpoint of a task is malformed
+    """
 
-        task_1_res = chunk_result_t1.get()
-        task_2_res.extend(chunk_result_t2.get())
-        task_3_res.extend(chunk_result_t3.get())
+    progress = file_op.load_latest_progress(source_num)
+    if progress is None:
+        logging.info('No checkpoint to resume `%s` from, starting from the '
+            'beginning', url)
+        return {'url': url, 'byte_offset': 0, 'row_count': 0}, 0, states
 
-        if num > 0 and num % config.SAVE_CKPT_EVERY == 0:
-            # save the results so far as checkpoints
-            # for task1, retain the last key-value pair, as this can be
-            # useful for the next chunk
-            last_key = list(task_1_res.keys())[-1]
-            last_val = task_1_res[last_key]
-            file_op.save_checkpoints(task_1_res, task_2_res, task_3_res, num)
-            task_1_res = {last_key: last_val}
-            task_2_res = []
-            task_3_res = []
+    if progress['url'] != url:
+        err = ce.InvalidConfigError(
+            f'The checkpoints in `{config.OUTPUT_DIR}` were saved for '
+            f'`{progress["url"]}`, not for `{url}`'
+        )
+        logging.error('Cannot resume\n%s', str(err))
+        raise err
 
-    if task_1_res or task_2_res or task_3_res:
-        file_op.save_checkpoints(task_1_res, task_2_res, task_3_res, num+1)
-        task_1_res = task_2_res = task_3_res = None
+    ckpt_num = progress.pop('ckpt_num')
+    logging.info('Resuming `%s` from checkpoint %s after %s rows (byte %s)',
+        url, ckpt_num, progress['row_count'], progress['byte_offset'])
 
-    file_op.compile_checkpoints_to_generate_output()
+    states = dict(states)
+    for name in states:
+        ckpt_name = file_op.get_checkpoint_name(
+            registry.get_file_name(name), ckpt_num, source_num
+        ) + '.pkl'
+        if os.path.exists(file_op.get_full_path(config.OUTPUT_DIR, ckpt_name)):
+            states[name] = file_op.load_checkpoint(
+                ckpt_name, config.OUTPUT_DIR
+            )['state']
+    return progress, ckpt_num + 1, states
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('--url', help='URL to be used in the script')
+    parser.add_argument('--url', '--source', dest='url', nargs='+',
+        help='URLs, file:// URIs, local paths or glob patterns of the CSV '
+        'files, in time order')
     parser.add_argument('--output_dir', help='Path of output directory')
-    parser.add_argument('--t1_file_name', help='Name of T1 output file')
-    parser.add_argument('--t2_file_name', help='Name of T2 output file')
-    parser.add_argument('--t3_file_name', help='Name of T3 output file')
-    parser.add_argument('--chunk_size', help='Chunk size for download')
-    parser.add_argument('--ckpt_freq', help='Frequency of saving checkpoint')
+    parser.add_argument('--t1_file_name',
+        help='Name of T1 output file, without a `-`')
+    parser.add_argument('--t2_file_name',
+        help='Name of T2 output file, without a `-`')
+    parser.add_argument('--t3_file_name',
+        help='Name of T3 output file, without a `-`')
+    parser.add_argument('--tasks', nargs='+',
+        help='Names of the registered tasks to be run, eg: task1 task3')
+    parser.add_argument('--chunk_size', '--chunk_rows', dest='chunk_rows',
+        type=int, help='Number of rows in each data chunk')
+    parser.add_argument('--chunk_bytes', type=int,
+        help='Approximate memory used by each data chunk in bytes, '
+        'overrides --chunk_size')
+    parser.add_argument('--read_size', type=int,
+        help='Number of bytes read from the network or disk at a time')
+    parser.add_argument('--prefetch_depth', type=int,
+        help='Number of chunks prepared ahead in the background, 0 disables')
+    parser.add_argument('--compact', action='store_true',
+        help='Downcast the temperatures in the data chunks to float32 and '
+        'log the memory saved')
+    parser.add_argument('--in_flight', type=int,
+        help='Number of chunks dispatched to the workers before the results '
+        'of the oldest are collected')
+    parser.add_argument('--per_task_dispatch', action='store_true',
+        help='Send each chunk to the workers once per task instead of '
+        'once for all the tasks')
+    parser.add_argument('--executor',
+        choices=executors.EXECUTORS,
+        help='Backend that runs the tasks, all but celery run without a broker')
+    parser.add_argument('--executor_workers', type=int,
+        help='Number of threads or processes of the executor pool')
+    parser.add_argument('--pickle_chunks', action='store_true',
+        help='Pickle the data chunks for the processes executor instead of '
+        'passing their columns in shared memory')
+    parser.add_argument('--source_workers', type=int,
+        help='Number of sources processed concurrently')
+    parser.add_argument('--ckpt_freq', type=int,
+        help='Frequency of saving checkpoint')
+    parser.add_argument('--parser', choices=['pandas', 'pyarrow', 'csv'],
+        help='Backend used to parse the CSV data')
+    parser.add_argument('--download_workers', type=int,
+        help='Number of threads downloading byte ranges of the file')
+    parser.add_argument('--out_of_order', action='store_true',
+        help='Process downloaded segments in the order they complete')
+    parser.add_argument('--resume', action='store_true',
+        help='Continue from the last checkpoint in the output directory')
+    parser.add_argument('--cache_dir',
+        help='Directory of the on-disk cache of downloaded sources')
+    parser.add_argument('--cache_max_bytes', type=int,
+        help='Size limit of the source cache in bytes')
     parser.add_argument('--log_level', help='Logging level')
     parser.add_argument('--run_tests', action='store_true',
         help='Runs unit tests on default settings, ignores any other flag')
 
     args = parser.parse_args()
+    # a '-' separates the parts of the names of the checkpoint files
+    for flag in ['t1_file_name', 't2_file_name', 't3_file_name']:
+        if '-' in (getattr(args, flag) or ''):
+            parser.error(f'--{flag} must not contain a `-`')
 
     if args.run_tests:
         loader = unittest.TestLoader()
@@ -126,7 +486,7 @@ if __name__ == '__main__':
         runner.run(suite)
     else:
         if args.url:
-            config.URL = args.url
+            config.SOURCES = args.url
         if args.output_dir:
             config.OUTPUT_DIR = args.output_dir
         if args.t1_file_name:
@@ -135,10 +495,44 @@ if __name__ == '__main__':
             config.T2_FILE_NAME = args.t2_file_name
         if args.t3_file_name:
             config.T3_FILE_NAME = args.t3_file_name
-        if args.chunk_size:
-            config.CHUNK_SIZE = args.chunk_size
+        if args.tasks:
+            config.TASKS = args.tasks
+        if args.chunk_rows:
+            config.CHUNK_ROWS = args.chunk_rows
+        if args.chunk_bytes:
+            config.CHUNK_BYTES = args.chunk_bytes
+        if args.read_size:
+            config.READ_SIZE = args.read_size
+        if args.prefetch_depth is not None:
+            config.PREFETCH_DEPTH = args.prefetch_depth
+        if args.compact:
+            config.COMPACT = True
+        if args.in_flight:
+            config.IN_FLIGHT_CHUNKS = args.in_flight
+        if args.per_task_dispatch:
+            config.FUSE_TASKS = False
+        if args.executor:
+            config.EXECUTOR = args.executor
+        if args.executor_workers:
+            config.EXECUTOR_WORKERS = args.executor_workers
+        if args.pickle_chunks:
+            config.SHARED_MEMORY = False
+        if args.source_workers:
+            config.SOURCE_WORKERS = args.source_workers
         if args.ckpt_freq:
             config.SAVE_CKPT_EVERY = args.ckpt_freq
+        if args.parser:
+            config.PARSER_ENGINE = args.parser
+        if args.download_workers:
+            config.DOWNLOAD_WORKERS = args.download_workers
+        if args.out_of_order:
+            config.DOWNLOAD_IN_ORDER = False
+        if args.resume:
+            config.RESUME = True
+        if args.cache_dir:
+            config.CACHE_DIR = args.cache_dir
+        if args.cache_max_bytes:
+            config.CACHE_MAX_BYTES = args.cache_max_bytes
         if args.log_level:
             config.LOGGING_LEVEL = args.log_level
         main()
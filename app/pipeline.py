@@ -0,0 +1,110 @@
+"""
+Contains the stages of the pipeline that prepares the data chunks for
+the tasks. The chunks are fetched and transformed in a background
+thread while the tasks of the previous chunks are running, so the
+network I/O overlaps with the computation
+"""
+
+import queue
+import threading
+import typing as ty
+
+import pandas as pd
+
+from app import data_operations as data_op
+from app import decorators
+
+# the kinds of entries in the prefetch queue
+_ITEM, _END, _ERROR = range(3)
+
+# seconds between the checks of a blocked producer for a stopped consumer
+_POLL_INTERVAL = 0.1
+
+
+@decorators.log_method
+def iter_transformed_chunks(
+    url: str, data_chunks: ty.Iterable[pd.DataFrame]
+) -> ty.Iterator[ty.Tuple[ty.Dict, ty.Optional[ty.Dict]]]:
+    """
+    Transforms the data chunks (see `data_operations.transform_data`)
+    and reads the position in the source after each chunk from its
+    `attrs`, as the transformed chunk does not keep them
+
+    Args:
+        url (str): The URL of the source
+        data_chunks (iterable): the chunks yielded by `get_data_chunk`
+
+    Yields:
+        (chunk, progress):
+        - `chunk` (dict): the transformed data chunk
+        - `progress` (dict | None): the position in the source after the
+            chunk, or None if the chunks are not read in order and the
+            run cannot be resumed
+    """
+
+    for data_chunk in data_chunks:
+        progress = None
+        if 'byte_offset' in data_chunk.attrs:
+            progress = {
+                'url': url,
+                'byte_offset': data_chunk.attrs['byte_offset'],
+                'row_count': data_chunk.attrs['row_count'],
+            }
+        yield data_op.transform_data(data_chunk), progress
+
+@decorators.log_method
+def prefetch(items: ty.Iterable, depth: int) -> ty.Iterator:
+    """
+    Iterates over `items` in a background thread and yields them in
+    order. At most `depth` items are kept ready in a bounded queue; the
+    thread blocks when the queue is full, so the memory used stays
+    bounded when the consumer is slower than the producer.
+    An exception that is raised by `items` is raised by this iterator.
+    If the consumer stops early, the thread stops after its current item
+
+    Args:
+        items (iterable): the items to be produced in the background
+        depth (int): the maximum number of items ready in the queue; 0
+            iterates over `items` in the calling thread
+
+    Yields:
+        the items of `items`
+    """
+
+    if depth <= 0:
+        yield from items
+        return
+
+    ready = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(entry):
+        while not stopped.is_set():
+            try:
+                ready.put(entry, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((_ITEM, item)):
+                    return
+            put((_END, None))
+        except BaseException as err: # pylint: disable=broad-except
+            put((_ERROR, err))
+
+    producer = threading.Thread(target=produce, name='prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            kind, value = ready.get()
+            if kind == _END:
+                break
+            if kind == _ERROR:
+                raise value
+            yield value
+    finally:
+        stopped.set()
@@ -0,0 +1,62 @@
+"""
+Contains the filters of the tasks compiled to vectorized predicates.
+A filter is compiled once into a function that evaluates all of its
+conditions on the column arrays of a data chunk, so the cost per chunk
+does not grow with a Python loop over the conditions and their rows
+"""
+
+import functools
+import typing as ty
+
+import numpy as np
+
+from app import decorators
+
+
+@functools.lru_cache(maxsize=None)
+@decorators.log_method
+def compile_range_filter(
+    date_range: ty.Tuple[int, int],
+    col_value_ranges: ty.Tuple[ty.Tuple[str, float, float], ...],
+) -> ty.Callable[[ty.Dict[str, np.ndarray]], np.ndarray]:
+    """
+    Compiles a filter that selects the rows whose 'Date' is in
+    `date_range` and where the value of at least one column is in one
+    of its ranges in `col_value_ranges` (all bounds inclusive).
+    The ranges of the same column are evaluated together, as one
+    comparison of the column with the arrays of their bounds.
+    Compiled filters are cached, so the arguments must be hashable
+
+    Args:
+        date_range (tuple): the first and the last day ordinal
+        col_value_ranges (tuple): (column name, range start value, range
+            end value) tuples, eg: (('Hi Temperature', 21.3, 23.3),)
+
+    Returns:
+        (callable): takes the column arrays of a chunk (see
+            `data_operations.to_columnar_chunk`) and returns the boolean
+            mask of the selected rows
+    """
+
+    bounds = {}
+    for col_name, range_start, range_end in col_value_ranges:
+        bounds.setdefault(col_name, []).append((range_start, range_end))
+    compiled = [
+        (col_name, np.array(ranges, dtype=np.float64).T)
+        for col_name, ranges in bounds.items()
+    ]
+    first_day, last_day = date_range
+
+    def evaluate(columns: ty.Dict[str, np.ndarray]) -> np.ndarray:
+        dates = columns['Date']
+        in_value_range = np.zeros(len(dates), dtype=bool)
+        for col_name, (starts, ends) in compiled:
+            values = columns[col_name][:, np.newaxis]
+            # bounds in the precision of the column, so that a float32
+            # column still includes values equal to the bounds
+            starts = starts.astype(values.dtype, copy=False)
+            ends = ends.astype(values.dtype, copy=False)
+            in_value_range |= ((starts <= values) & (values <= ends)).any(axis=1)
+        return (first_day <= dates) & (dates <= last_day) & in_value_range
+
+    return evaluate
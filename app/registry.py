@@ -0,0 +1,213 @@
+"""
+Contains the registry of the tasks that are run on the data chunks.
+A task declares the columns it needs and the functions of its
+lifecycle, so the pipeline can run any set of registered tasks in one
+pass over the data and checkpoint, resume and compile each of them the
+same way:
+    - `init(in_order)`: returns the empty state of the task for a
+      source; `in_order` is False if the chunks of the source are not
+      read in the order of the source
+    - `update(state, chunk)`: returns the state updated with a columnar
+      chunk (see `data_operations.to_columnar_chunk`), runs on a worker
+    - or, instead of `update`, `map(chunk)` and `combine(state,
+      partial)`: the partial result of a chunk is computed on a worker
+      without the state, so several chunks can be in flight at a time,
+      and the partial results are combined with the state in the order
+      of the chunks
+    - `flush(state, final)`: returns `(result, state)`, the result of
+      the chunks so far that is saved in a checkpoint and the state that
+      is carried over to the next chunk; with `final` set, at the end of
+      the source, the state has nothing left to carry over
+    - `merge(results)`: combines the results of all the checkpoints of
+      all the sources, in the order of the sources and the checkpoints
+    - `finalize(result)`: returns the lines of the output file from the
+      merged result
+
+The states and results must be picklable, as they are sent to the
+workers and saved in the checkpoints
+"""
+
+import typing as ty
+
+from app import config
+from app import custom_exceptions as ce
+from app import decorators, validator
+
+# the registered tasks by name, in the order of registration
+TASKS = {}
+
+
+@decorators.log_method
+def register_task(
+    name: str,
+    columns: ty.Iterable[str],
+    init: ty.Callable[[bool], ty.Any],
+    flush: ty.Callable[[ty.Any, bool], ty.Tuple[ty.Any, ty.Any]],
+    merge: ty.Callable[[ty.Iterable], ty.Any],
+    finalize: ty.Callable[[ty.Any], ty.Iterable[str]],
+    update: ty.Optional[ty.Callable[[ty.Any, ty.Dict], ty.Any]] = None,
+    map_chunk: ty.Optional[ty.Callable[[ty.Dict], ty.Any]] = None,
+    combine: ty.Optional[ty.Callable[[ty.Any, ty.Any], ty.Any]] = None,
+    file_name: ty.Optional[ty.Union[str, ty.Callable[[], str]]] = None,
+) -> None:
+    """
+    Registers a task under `name`, replacing a task that was registered
+    under the same name. See the module docstring for the functions of
+    the lifecycle of a task. Either `update` or both `map_chunk` and
+    `combine` are required; with the latter, `update` is the combination
+    of the two
+
+    Args:
+        name (str): name of the task, eg: 'task1'
+        columns (iterable): names of the columns from
+            `config.EXPECTED_COL_NAMES` that the task reads, only these
+            columns are parsed and validated in the source. A task that
+            reads another column adds it to `config.EXPECTED_COL_NAMES`
+            before it is registered
+        init (callable): returns the empty state of the task
+        flush (callable): splits the state into the result to be saved
+            in a checkpoint and the state that is carried over
+        merge (callable): combines the results of the checkpoints
+        finalize (callable): formats the merged result as output lines
+        update (callable | None): updates the state with a chunk
+        map_chunk (callable | None): returns the partial result of a
+            chunk
+        combine (callable | None): updates the state with the partial
+            result of the next chunk
+        file_name (str | callable | None): name of the checkpoint and
+            output files of the task, or a function that returns it when
+            the files are written; defaults to `name`. It must not
+            contain a '-'
+
+    Raises:
+        - `InvalidConfigError` if neither `update` nor `map_chunk` and
+        `combine` are passed, if a column is not in
+        `config.EXPECTED_COL_NAMES`, or if `file_name` contains a '-'
+
+    >>> Example:
+    register_task(
+        'row_count', ['Date'],
+        init=lambda in_order: 0,
+        flush=lambda state, final: (state, 0),
+        merge=sum,
+        finalize=lambda result: [str(result)],
+        map_chunk=lambda chunk: chunk['num_rows'],
+        combine=lambda state, partial: state + partial,
+    )
+    """
+
+    unknown = [name for name in columns if name not in config.EXPECTED_COL_NAMES]
+    if unknown:
+        raise ce.InvalidConfigError(
+            f'Task `{name}` reads columns {unknown} that are not in '
+            f'`config.EXPECTED_COL_NAMES`: {config.EXPECTED_COL_NAMES}'
+        )
+
+    if file_name is None:
+        file_name = name
+    if not callable(file_name):
+        validator.check_file_name(file_name)
+
+    if map_chunk is not None and combine is not None:
+        if update is None:
+            def update(state, chunk):
+                return combine(state, map_chunk(chunk))
+    elif update is None:
+        raise ce.InvalidConfigError(
+            f'Task `{name}` needs either `update` or `map_chunk` and `combine`'
+        )
+    else:
+        map_chunk = combine = None
+
+    TASKS[name] = {
+        'columns': tuple(columns),
+        'init': init,
+        'update': update,
+        'map': map_chunk,
+        'combine': combine,
+        'flush': flush,
+        'merge': merge,
+        'finalize': finalize,
+        'file_name': file_name,
+    }
+
+@decorators.log_method
+def get_task(name: str) -> ty.Dict:
+    """
+    Returns the registered task `name`
+
+    Args:
+        name (str): name of the task
+
+    Returns:
+        task (dict): the columns and the lifecycle functions of the task
+
+    Raises:
+        - `InvalidConfigError` if no task is registered under `name`
+    """
+
+    if name not in TASKS:
+        raise ce.InvalidConfigError(
+            f'Unknown task `{name}`, the registered tasks are: {list(TASKS)}'
+        )
+    return TASKS[name]
+
+@decorators.log_method
+def get_enabled_task_names() -> ty.List[str]:
+    """
+    Returns the names of the tasks to be run, i.e. `config.TASKS`, or
+    all the registered tasks if it is empty
+
+    Returns:
+        names (list): names of the enabled tasks
+
+    Raises:
+        - `InvalidConfigError` if a name in `config.TASKS` is not
+        registered
+    """
+
+    names = list(config.TASKS or TASKS)
+    for name in names:
+        get_task(name)
+    return names
+
+@decorators.log_method
+def get_file_name(name: str) -> str:
+    """
+    Returns the name of the checkpoint and output files of a task
+
+    Args:
+        name (str): name of the task
+
+    Returns:
+        file_name (str): eg: 'task1'
+
+    Raises:
+        - `InvalidConfigError` if the file name contains a '-'
+    """
+
+    file_name = get_task(name)['file_name']
+    if callable(file_name):
+        file_name = file_name()
+        validator.check_file_name(file_name)
+    return file_name
+
+@decorators.log_method
+def get_task_columns(names: ty.Iterable[str]) -> ty.List[str]:
+    """
+    Returns the columns that are read by any of the tasks, in the order
+    of `config.EXPECTED_COL_NAMES`. 'Date' and 'Time' are always kept,
+    as the chunks are cleaned and checkpointed by them
+
+    Args:
+        names (iterable): names of the tasks
+
+    Returns:
+        col_names (list): the column names, eg:
+        ['Date', 'Time', 'Outside Temperature']
+    """
+
+    needed = {'Date', 'Time'}
+    for name in names:
+        needed.update(get_task(name)['columns'])
+    return [name for name in config.EXPECTED_COL_NAMES if name in needed]
@@ -0,0 +1,318 @@
+"""
+Contains the on-disk cache of the raw bytes of downloaded sources.
+
+The files are stored content-addressed, i.e. under the SHA-256 digest of
+their bytes, in `config.CACHE_DIR`. An index maps each URL to the digest
+of its file and the `ETag`/`Last-Modified` headers that were received
+with it, so the file can be revalidated with a conditional GET.
+The least recently used files are evicted when the size of the cache
+exceeds `config.CACHE_MAX_BYTES`
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import tempfile
+import threading
+import time
+import typing as ty
+
+import requests
+
+from app import config
+from app import decorators
+from app import file_operations as file_op
+
+INDEX_FILE_NAME = 'index.pkl'
+
+# the index is read and rewritten by every download, so sources that
+# are downloaded by concurrent threads must not update it at once
+_index_lock = threading.Lock()
+
+
+class CachedStream:
+    """
+    A stream over a cached file that is read through a memory map.
+    Provides the parts of the `requests.Response` interface that are
+    used for reading data streams
+    """
+
+    def __init__(self, file_path: str, byte_offset: int = 0):
+        self.file_path = file_path
+        self.byte_offset = byte_offset
+        # responds like a server that supports range requests
+        self.status_code = 206 if byte_offset else 200
+        self.headers = {}
+
+    def iter_content(self, chunk_size: int = 1, **kwargs) -> ty.Iterator[bytes]:
+        """Yields the bytes of the file from `byte_offset` onwards"""
+        # pylint: disable=unused-argument
+        with open(self.file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mem:
+                for start in range(self.byte_offset, len(mem), chunk_size):
+                    yield mem[start:start + chunk_size]
+
+    def close(self) -> None:
+        """The file is closed when the iteration ends"""
+
+
+class CachingStream:
+    """
+    Wraps a `requests.Response` and stores the bytes that are read from
+    it in the cache. The file is added to the cache only if the whole
+    response was read
+    """
+
+    def __init__(self, response: requests.Response, url: str):
+        self.response = response
+        self.url = url
+        self.status_code = response.status_code
+        self.headers = response.headers
+
+    def iter_content(self, chunk_size: int = 1, **kwargs) -> ty.Iterator[bytes]:
+        """Yields the bytes of the response and writes them to the cache"""
+        # pylint: disable=unused-argument
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+        file_desc, temp_path = tempfile.mkstemp(
+            dir=config.CACHE_DIR, suffix='.part'
+        )
+        digest = hashlib.sha256()
+        size = 0
+        complete = False
+        try:
+            with os.fdopen(file_desc, 'wb') as file:
+                for chunk in self.response.iter_content(chunk_size=chunk_size):
+                    file.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+            complete = True
+        finally:
+            if complete:
+                store_file(self.url, temp_path, digest.hexdigest(), size,
+                    self.response.headers)
+            else:
+                os.remove(temp_path)
+
+    def close(self) -> None:
+        """Closes the wrapped response"""
+        self.response.close()
+
+
+@decorators.log_method
+def load_index() -> ty.Dict[str, ty.Dict]:
+    """
+    Loads the cache index from `config.CACHE_DIR`
+
+    Returns:
+        index (dict): the cache entry of each URL, eg:
+        {
+            'http://a.b/c.csv': {
+                'digest': '9f86d0...', 'size': 4096, 'etag': '"5e-1"',
+                'last_modified': 'Mon, 03 Jul 2006 00:00:00 GMT',
+                'last_used': 1697500000.0,
+            },
+        }
+    """
+
+    index_path = file_op.get_full_path(config.CACHE_DIR, INDEX_FILE_NAME)
+    try:
+        with open(index_path, 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, pickle.UnpicklingError, EOFError) as err:
+        # the cache is rebuilt on the next downloads
+        logging.warning('Ignoring unreadable cache index `%s`\n%s',
+            index_path, str(err))
+        return {}
+
+@decorators.log_method
+def save_index(index: ty.Dict[str, ty.Dict]) -> None:
+    """
+    Saves the cache index to `config.CACHE_DIR`. The index is written to
+    a temporary file first, so a crash never leaves a partial index
+
+    Args:
+        index (dict): the cache entry of each URL
+
+    Raises:
+        - `OSError` if an error occurs in writing the file
+    """
+
+    index_path = file_op.get_full_path(config.CACHE_DIR, INDEX_FILE_NAME)
+    temp_path = index_path + '.part'
+    try:
+        with open(temp_path, 'wb') as file:
+            pickle.dump(index, file)
+        os.replace(temp_path, index_path)
+    except OSError as err:
+        logging.error('Error during saving `%s`\n%s', index_path, str(err))
+        raise OSError from err
+
+@decorators.log_method
+def get_cache_entry(url: str) -> ty.Optional[ty.Dict]:
+    """
+    Returns the cache entry of the URL if its file is in the cache
+
+    Args:
+        url (str): The URL of the source
+
+    Returns:
+        (dict | None): the cache entry, or None if the URL is not cached
+    """
+
+    with _index_lock:
+        entry = load_index().get(url)
+    if entry is None or not os.path.isfile(get_blob_path(entry['digest'])):
+        return None
+    return entry
+
+@decorators.log_method
+def get_blob_path(digest: str) -> str:
+    """
+    Returns the path of the cached file with the specified digest
+
+    Args:
+        digest (str): SHA-256 digest of the file
+
+    Returns:
+        (str): path of the file in the cache directory
+    """
+
+    return file_op.get_full_path(config.CACHE_DIR, digest)
+
+@decorators.log_method
+def get_conditional_headers(entry: ty.Dict) -> ty.Dict[str, str]:
+    """
+    Returns the headers for revalidating a cache entry with the server
+
+    Args:
+        entry (dict): the cache entry
+
+    Returns:
+        headers (dict): `If-None-Match` and/or `If-Modified-Since`
+    """
+
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+@decorators.log_method
+def open_cached_stream(url: str, entry: ty.Dict, byte_offset: int) -> CachedStream:
+    """
+    Marks the cache entry as used and returns a stream over its file
+
+    Args:
+        url (str): The URL of the source
+        entry (dict): the cache entry of the URL
+        byte_offset (int): index of the first byte to be read
+
+    Returns:
+        (CachedStream): a stream over the cached file
+    """
+
+    with _index_lock:
+        index = load_index()
+        if url in index:
+            index[url]['last_used'] = time.time()
+            save_index(index)
+    logging.info('Reading `%s` from the cache', url)
+    return CachedStream(get_blob_path(entry['digest']), byte_offset)
+
+@decorators.log_method
+def store_file(
+    url: str,
+    temp_path: str,
+    digest: str,
+    size: int,
+    headers: ty.Mapping[str, str],
+) -> None:
+    """
+    Moves a completely downloaded file into the cache, points the entry
+    of the URL to it and evicts the least recently used files if the
+    cache is larger than `config.CACHE_MAX_BYTES`
+
+    Args:
+        url (str): The URL of the source
+        temp_path (str): path of the downloaded file
+        digest (str): SHA-256 digest of the file
+        size (int): size of the file in bytes
+        headers (mapping): the response headers of the download
+
+    Raises:
+        - `OSError` if an error occurs in writing the files
+    """
+
+    blob_path = get_blob_path(digest)
+    with _index_lock:
+        if os.path.isfile(blob_path):
+            # the same bytes are cached already (under any URL)
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, blob_path)
+
+        index = load_index()
+        old_entry = index.get(url)
+        index[url] = {
+            'digest': digest,
+            'size': size,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'last_used': time.time(),
+        }
+        if old_entry is not None and old_entry['digest'] != digest:
+            remove_unreferenced_blob(index, old_entry['digest'])
+        evict_least_recently_used(index, config.CACHE_MAX_BYTES)
+        save_index(index)
+
+@decorators.log_method
+def evict_least_recently_used(index: ty.Dict[str, ty.Dict], max_bytes: int) -> None:
+    """
+    Removes the least recently used entries from the index, and their
+    files from the cache directory, until the size of the cached files
+    is at most `max_bytes`
+
+    Args:
+        index (dict): the cache entry of each URL; updated in place
+        max_bytes (int): the maximum size of the cache in bytes
+    """
+
+    blob_sizes = {entry['digest']: entry['size'] for entry in index.values()}
+    total_size = sum(blob_sizes.values())
+    by_last_use = sorted(index, key=lambda url: index[url]['last_used'])
+    for url in by_last_use:
+        if total_size <= max_bytes:
+            break
+        entry = index.pop(url)
+        if remove_unreferenced_blob(index, entry['digest']):
+            total_size -= entry['size']
+            logging.info('Evicted `%s` from the cache', url)
+
+@decorators.log_method
+def remove_unreferenced_blob(index: ty.Dict[str, ty.Dict], digest: str) -> bool:
+    """
+    Deletes the cached file with the digest if no entry refers to it
+
+    Args:
+        index (dict): the cache entry of each URL
+        digest (str): SHA-256 digest of the file
+
+    Returns:
+        (bool): True if the file was deleted
+    """
+
+    if any(entry['digest'] == digest for entry in index.values()):
+        return False
+    try:
+        os.remove(get_blob_path(digest))
+    except FileNotFoundError:
+        pass
+    return True
@@ -0,0 +1,105 @@
+"""This file contains unit tests for functions in `csv_parsers.py`"""
+
+import csv
+import sys
+import unittest
+
+sys.path.append('.')
+
+# pylint: disable=wrong-import-position
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from app import csv_parsers
+from app import custom_exceptions as ce
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+class TestCSVParsers(unittest.TestCase):
+
+    def test_parse_header(self):
+        output = csv_parsers.parse_header(b'Date,Time,"Hi, Temp"\r')
+        self.assertEqual(output, ['Date', 'Time', 'Hi, Temp'])
+
+    def test_parse_with_csv_module(self):
+        block = b'31/05/2006,09:00,9.3\n31/05/2006,09:10,9.4\n'
+        expected = pd.DataFrame(
+            columns=['Date', 'Time', 'Temp'],
+            data=[['31/05/2006', '09:00', '9.3'],
+                  ['31/05/2006', '09:10', '9.4']]
+        )
+        output = csv_parsers.parse_with_csv_module(
+            block, ['Date', 'Time', 'Temp']
+        )
+        assert_frame_equal(output, expected)
+
+    def test_parse_with_csv_module_error_raised(self):
+        block = b'31/05/2006,"09:00,9.3\n'
+        with self.assertRaises(csv.Error):
+            csv_parsers.parse_with_csv_module(block, ['Date', 'Time', 'Temp'])
+
+    def test_parse_with_pandas(self):
+        block = b'31/05/2006,09:00,9.3\n31/05/2006,09:10,\n'
+        expected = pd.DataFrame(
+            columns=['Date', 'Time', 'Temp'],
+            data=[['31/05/2006', '09:00', 9.3],
+                  ['31/05/2006', '09:10', None]]
+        )
+        output = csv_parsers.parse_with_pandas(
+            block, ['Date', 'Time', 'Temp']
+        )
+        assert_frame_equal(output, expected)
+
+    def test_parse_with_pandas_column_mismatch(self):
+        block = b'31/05/2006,09:00,9.3,1\n31/05/2006,09:10,9.4,1\n'
+        with self.assertRaises(ValueError):
+            csv_parsers.parse_with_pandas(block, ['Date', 'Time', 'Temp'])
+
+    def test_get_parser(self):
+        output = csv_parsers.get_parser('pandas')
+        self.assertEqual(output, csv_parsers.parse_with_pandas)
+
+    def test_get_parser_error_raised(self):
+        with self.assertRaises(ce.InvalidConfigError):
+            csv_parsers.get_parser('NotAParser')
+
+    def test_get_projected_columns(self):
+        col_names = ['Date', 'Time', 'Wind', 'Temp']
+        projection = {'Temp': 'float64', 'Date': 'str'}
+        expected = ([0, 3], ['Date', 'Temp'], {0: 'str', 3: 'float64'})
+        output = csv_parsers.get_projected_columns(col_names, projection)
+        self.assertEqual(output, expected)
+
+    def test_parse_with_pandas_projection(self):
+        block = b'31/05/2006,09:00,NNW,9.3\n31/05/2006,09:10,N,\n'
+        projection = {'Date': 'str', 'Temp': 'float64'}
+        expected = pd.DataFrame(
+            columns=['Date', 'Temp'],
+            data=[['31/05/2006', 9.3], ['31/05/2006', None]]
+        )
+        output = csv_parsers.parse_with_pandas(
+            block, ['Date', 'Time', 'Wind', 'Temp'], projection
+        )
+        assert_frame_equal(output, expected)
+
+    def test_parse_with_pandas_projection_error_raised(self):
+        block = b'31/05/2006,09:00,NNW,NotANumber\n'
+        projection = {'Date': 'str', 'Temp': 'float64'}
+        with self.assertRaises(ValueError):
+            csv_parsers.parse_with_pandas(
+                block, ['Date', 'Time', 'Wind', 'Temp'], projection
+            )
+
+    def test_parse_with_csv_module_projection(self):
+        block = b'31/05/2006,09:00,NNW,9.3\n31/05/2006,09:10,N,\n'
+        projection = {'Date': 'str', 'Temp': 'float64'}
+        expected = pd.DataFrame(
+            columns=['Date', 'Temp'],
+            data=[['31/05/2006', 9.3], ['31/05/2006', None]]
+        )
+        output = csv_parsers.parse_with_csv_module(
+            block, ['Date', 'Time', 'Wind', 'Temp'], projection
+        )
+        assert_frame_equal(output, expected)
@@ -1,6 +1,11 @@
 """This file contains unit tests for functions in `data_fetcher.py`"""
 
+import gzip
+import http.server
+import lzma
+import os
 import sys
+import threading
 import unittest
 from unittest.mock import patch
 
@@ -88,12 +93,415 @@ class TestDataChunk(unittest.TestCase):
         with self.assertRaises(ce.DataValidationError):
             list(data_fetcher.get_data_chunk('url'))
 
+    @patch('app.config.PARSER_ENGINE', 'csv')
+    @patch('app.validator.check_for_expected_columns')
+    @patch('app.data_fetcher.get_data_stream')
+    def test_successful_data_chunk_csv_parser(
+        self, mock_get_data_stream, mock_check_for_expected_columns
+    ):
+        mock_get_data_stream.return_value = MockValidDataStream()
+        mock_check_for_expected_columns.return_value = None
+        expected = pd.DataFrame(
+            columns=['c1', 'c2', 'c3', 'c4'],
+            data=[['d1', 'd2', 'd3', 'd4'], ['d1', 'd2', 'd3', 'd4']]
+        )
+        result = list(data_fetcher.get_data_chunk('url'))
+        self.assertEqual(len(result), 1)
+        self.assertTrue(result[0].equals(expected))
+
+    @patch('app.config.PARSER_ENGINE', 'csv')
+    @patch('app.validator.check_for_expected_columns')
+    @patch('app.data_fetcher.get_data_stream')
+    def test_value_error_csv_parser(
+        self, mock_get_data_stream, mock_check_for_expected_columns
+    ):
+        mock_get_data_stream.return_value = MockInValidDataStream()
+        mock_check_for_expected_columns.return_value = None
+        with self.assertRaises(ce.DataLoadingError):
+            list(data_fetcher.get_data_chunk('url'))
+
+    @patch('app.config.PARSER_ENGINE', 'NotAParser')
+    def test_unknown_parser(self):
+        with self.assertRaises(ce.InvalidConfigError):
+            list(data_fetcher.get_data_chunk('url'))
+
+    @patch('app.config.CHUNK_ROWS', 2)
+    @patch('app.validator.check_for_expected_columns')
+    @patch('app.data_fetcher.get_data_stream')
+    def test_multiple_data_chunks(
+        self, mock_get_data_stream, mock_check_for_expected_columns
+    ):
+        mock_get_data_stream.return_value = MockValidDataStream()
+        mock_check_for_expected_columns.return_value = None
+        result = list(data_fetcher.get_data_chunk('url'))
+        # first chunk has the header row and one data row
+        self.assertEqual([len(chunk) for chunk in result], [1, 1])
+        self.assertEqual(list(result[1].columns), ['c1', 'c2', 'c3', 'c4'])
+
+
+class TestLineBlocks(unittest.TestCase):
+
+    def test_iter_line_blocks(self):
+        byte_chunks = [b'a,1\nb,', b'2\nc,3\nd,4\ne', b',5']
+        expected = [b'a,1\nb,2\n', b'c,3\nd,4\n', b'e,5']
+        output = list(data_fetcher.iter_line_blocks(byte_chunks, {'lines': 2}))
+        self.assertEqual(output, expected)
+
+    def test_iter_line_blocks_trailing_line_break(self):
+        byte_chunks = [b'a,1\nb,2\nc,3\n']
+        expected = [b'a,1\nb,2\nc,3\n']
+        output = list(data_fetcher.iter_line_blocks(byte_chunks, {'lines': 5}))
+        self.assertEqual(output, expected)
+
+    def test_iter_line_blocks_by_bytes(self):
+        byte_chunks = [b'a,1\nb,', b'2\nc,3\nd,4\ne', b',5', b'\nlong,line\nf']
+        expected = [b'a,1\nb,2\n', b'c,3\nd,4\n', b'e,5\n', b'long,line\n', b'f']
+        output = list(data_fetcher.iter_line_blocks(byte_chunks, {'bytes': 9}))
+        self.assertEqual(output, expected)
+
+    def test_block_size_changed_between_blocks(self):
+        byte_chunks = [b'a\nb\nc\nd\ne\nf\ng\n']
+        block_size = {'lines': 1}
+        output = []
+        for block in data_fetcher.iter_line_blocks(byte_chunks, block_size):
+            output.append(block)
+            block_size['lines'] += 1
+        self.assertEqual(output, [b'a\n', b'b\nc\n', b'd\ne\nf\n', b'g\n'])
+
+    @patch('app.config.CHUNK_BYTES', None)
+    @patch('app.config.CHUNK_ROWS', 100)
+    def test_get_block_size(self):
+        self.assertEqual(data_fetcher.get_block_size(), {'lines': 100})
+        with patch('app.config.CHUNK_BYTES', 4096):
+            self.assertEqual(data_fetcher.get_block_size(), {'bytes': 4096})
+
+    @patch('app.config.CHUNK_BYTES', 8000)
+    def test_fit_block_size_to_memory(self):
+        dframe = pd.DataFrame({'a': [1.0] * 100})
+        block_size = {'bytes': 8000}
+        # 100 rows parsed from 400 bytes use 800 bytes (+ the index)
+        data_fetcher.fit_block_size_to_memory(block_size, 400, dframe)
+        memory = dframe.memory_usage(deep=True).sum()
+        self.assertEqual(block_size['bytes'], 8000 * 400 // memory)
+
+    def test_split_header(self):
+        header, rest = data_fetcher.split_header(b'c1,c2\nd1,d2\n')
+        self.assertEqual(header, b'c1,c2')
+        self.assertEqual(rest, b'd1,d2\n')
+
+class LocalServerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.content = b''.join(
+            f'31/05/2006,{i:04d},{i % 30}.5\n'.encode() for i in range(50)
+        )
+        self.content = b'Date,Time,Temp\n' + self.content + b'01/06/2006,0'
+
+    def serve(self, handler_class):
+        handler_class.content = self.content
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+        threading.Thread(
+            target=server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_address[1]}/data.csv'
+
+
+class TestSegmentedDownload(LocalServerTestCase):
+
+    @patch('app.config.DOWNLOAD_SEGMENT_SIZE', 40)
+    @patch('app.config.DOWNLOAD_WORKERS', 3)
+    def test_segments_in_order(self):
+        url = self.serve(RangeRequestHandler)
+        segments = list(data_fetcher.get_byte_chunks(url))
+        self.assertGreater(len(segments), 1)
+        for segment in segments:
+            self.assertTrue(segment.endswith(b'\n'))
+        self.assertEqual(b''.join(segments), self.content + b'\n')
+
+    @patch('app.config.DOWNLOAD_IN_ORDER', False)
+    @patch('app.config.DOWNLOAD_SEGMENT_SIZE', 40)
+    @patch('app.config.DOWNLOAD_WORKERS', 3)
+    def test_segments_out_of_order(self):
+        url = self.serve(RangeRequestHandler)
+        segments = list(data_fetcher.get_byte_chunks(url))
+        self.assertTrue(segments[0].startswith(b'Date,Time,Temp\n'))
+        lines = b''.join(segments).splitlines()
+        self.assertEqual(sorted(lines), sorted(self.content.splitlines()))
+
+    @patch('app.config.DOWNLOAD_SEGMENT_SIZE', 40)
+    @patch('app.config.DOWNLOAD_WORKERS', 3)
+    def test_range_header_ignored(self):
+        url = self.serve(IgnoreRangeRequestHandler)
+        output = b''.join(data_fetcher.get_byte_chunks(url))
+        self.assertEqual(output, self.content)
+
+    @patch('app.config.DOWNLOAD_WORKERS', 3)
+    def test_range_requests_not_supported(self):
+        url = self.serve(NoRangeRequestHandler)
+        self.assertIsNone(data_fetcher.get_range_download_size(url))
+        output = b''.join(data_fetcher.get_byte_chunks(url))
+        self.assertEqual(output, self.content)
+
+    @patch('app.config.DOWNLOAD_SEGMENT_SIZE', 40)
+    @patch('app.config.DOWNLOAD_WORKERS', 3)
+    @patch('app.validator.check_for_expected_columns')
+    def test_data_chunk_from_segments(self, mock_check_for_expected_columns):
+        mock_check_for_expected_columns.return_value = None
+        url = self.serve(RangeRequestHandler)
+        output = pd.concat(data_fetcher.get_data_chunk(url))
+        self.assertEqual(len(output), 51)
+        self.assertEqual(list(output['Time'][:3]), [0, 1, 2])
+
+    def test_iter_bytes_not_in_ranges(self):
+        url = self.serve(NoRangeRequestHandler)
+        output = b''.join(
+            data_fetcher.iter_bytes_not_in_ranges(url, [(20, 40), (0, 10)])
+        )
+        self.assertEqual(output, self.content[10:20] + self.content[40:])
+
+class TestResumeDownload(LocalServerTestCase):
+
+    @patch('app.config.RETRY_BACKOFF', 0)
+    @patch('app.config.CHUNK_ROWS', 10)
+    @patch('app.validator.check_for_expected_columns')
+    def test_resume_after_dropped_connection(
+        self, mock_check_for_expected_columns
+    ):
+        mock_check_for_expected_columns.return_value = None
+        DropConnectionRequestHandler.dropped = False
+        url = self.serve(DropConnectionRequestHandler)
+        chunks = list(data_fetcher.get_data_chunk(url))
+        self.assertTrue(DropConnectionRequestHandler.dropped)
+        output = pd.concat(chunks)
+        self.assertEqual(len(output), 51)
+        self.assertEqual(list(output['Time']), list(range(50)) + [0])
+        self.assertEqual(chunks[-1].attrs['row_count'], 51)
+        self.assertEqual(chunks[-1].attrs['byte_offset'], len(self.content))
+
+    @patch('app.config.CHUNK_ROWS', 10)
+    @patch('app.validator.check_for_expected_columns')
+    def test_resume_from_byte_offset(self, mock_check_for_expected_columns):
+        mock_check_for_expected_columns.return_value = None
+        url = self.serve(RangeRequestHandler)
+        chunks = list(data_fetcher.get_data_chunk(url))
+        offset = chunks[1].attrs['byte_offset']
+        row_count = chunks[1].attrs['row_count']
+        resumed = list(data_fetcher.get_data_chunk(url, None, offset, row_count))
+        self.assertEqual(len(resumed), len(chunks) - 2)
+        self.assertEqual(list(resumed[0].columns), ['Date', 'Time', 'Temp'])
+        self.assertTrue(resumed[0].equals(chunks[2]))
+        self.assertEqual(resumed[-1].attrs, chunks[-1].attrs)
+
+    @patch('app.validator.check_for_expected_columns')
+    def test_resume_from_end_of_file(self, mock_check_for_expected_columns):
+        mock_check_for_expected_columns.return_value = None
+        url = self.serve(RangeRequestHandler)
+        resumed = list(
+            data_fetcher.get_data_chunk(url, None, len(self.content), 51)
+        )
+        self.assertEqual(resumed, [])
+
+    @patch('app.config.CHUNK_ROWS', 10)
+    @patch('app.validator.check_for_expected_columns')
+    def test_resume_range_header_ignored(
+        self, mock_check_for_expected_columns
+    ):
+        mock_check_for_expected_columns.return_value = None
+        url = self.serve(IgnoreRangeRequestHandler)
+        chunks = list(data_fetcher.get_data_chunk(url))
+        offset = chunks[0].attrs['byte_offset']
+        row_count = chunks[0].attrs['row_count']
+        resumed = list(data_fetcher.get_data_chunk(url, None, offset, row_count))
+        self.assertTrue(resumed[0].equals(chunks[1]))
+
+    def test_skip_bytes(self):
+        output = list(data_fetcher.skip_bytes([b'abc', b'def', b'gh'], 4))
+        self.assertEqual(output, [b'ef', b'gh'])
+
+    def test_get_header_row(self):
+        url = self.serve(RangeRequestHandler)
+        self.assertEqual(data_fetcher.get_header_row(url), b'Date,Time,Temp')
+
+class TestLocalSource(LocalServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.path = './app/tests/test_output/data.csv'
+        with open(self.path, 'wb') as file:
+            file.write(self.content)
+        self.addCleanup(os.remove, self.path)
+
+    def test_get_local_path(self):
+        self.assertEqual(data_fetcher.get_local_path(self.path), self.path)
+        self.assertEqual(
+            data_fetcher.get_local_path('file:///tmp/data%20file.csv'),
+            '/tmp/data file.csv'
+        )
+        self.assertIsNone(data_fetcher.get_local_path('http://a.b/c.csv'))
+        self.assertIsNone(data_fetcher.get_local_path('ThisIsNotAFile'))
+
+    def test_expand_sources(self):
+        paths = ['./app/tests/test_output/data-2.csv',
+                 './app/tests/test_output/data-1.csv']
+        for path in paths:
+            with open(path, 'wb') as file:
+                file.write(self.content)
+            self.addCleanup(os.remove, path)
+        sources = data_fetcher.expand_sources([
+            './app/tests/test_output/data-*.csv', 'http://a.b/c?.csv',
+        ])
+        self.assertEqual(sources, sorted(paths) + ['http://a.b/c?.csv'])
+        file_uri = 'file://' + os.path.abspath('./app/tests/test_output')
+        self.assertEqual(
+            data_fetcher.expand_sources([file_uri + '/data-[2].csv']),
+            [os.path.abspath(paths[0])]
+        )
+        with self.assertRaises(ce.InvalidConfigError):
+            data_fetcher.expand_sources(['./app/tests/test_output/*.nothing'])
+
+    @patch('app.config.CHUNK_ROWS', 10)
+    @patch('app.validator.check_for_expected_columns')
+    def test_same_chunks_as_download(self, mock_check_for_expected_columns):
+        mock_check_for_expected_columns.return_value = None
+        url = self.serve(NoRangeRequestHandler)
+        downloaded = list(data_fetcher.get_data_chunk(url))
+        file_uri = 'file://' + os.path.abspath(self.path)
+        for source in (self.path, file_uri):
+            chunks = list(data_fetcher.get_data_chunk(source))
+            self.assertEqual(len(chunks), len(downloaded))
+            for chunk, expected in zip(chunks, downloaded):
+                self.assertTrue(chunk.equals(expected))
+                self.assertEqual(chunk.attrs, expected.attrs)
+
+    @patch('app.config.PARSER_ENGINE', 'csv')
+    @patch('app.config.CHUNK_ROWS', 10)
+    @patch('app.validator.check_for_expected_columns')
+    def test_resume_local_file(self, mock_check_for_expected_columns):
+        mock_check_for_expected_columns.return_value = None
+        chunks = list(data_fetcher.get_data_chunk(self.path))
+        offset = chunks[2].attrs['byte_offset']
+        row_count = chunks[2].attrs['row_count']
+        resumed = list(
+            data_fetcher.get_data_chunk(self.path, None, offset, row_count)
+        )
+        self.assertEqual(len(resumed), len(chunks) - 3)
+        self.assertTrue(resumed[0].equals(chunks[3]))
+
+    @patch('app.data_fetcher.LOCAL_SCAN_SIZE', 16)
+    def test_iter_mapped_line_blocks(self):
+        with open(self.path, 'ab') as file:
+            file.write(b'\n \n')
+        blocks = [
+            bytes(block) for block in
+            data_fetcher.iter_mapped_line_blocks(self.path, 15, {'lines': 20})
+        ]
+        lines = self.content[15:].splitlines(keepends=True)
+        self.assertEqual(blocks[0], b''.join(lines[:20]))
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual(b''.join(blocks), self.content[15:] + b'\n \n')
+
+    def test_iter_mapped_line_blocks_by_bytes(self):
+        block_size = {'bytes': 100}
+        blocks = [
+            bytes(block) for block in
+            data_fetcher.iter_mapped_line_blocks(self.path, 0, block_size)
+        ]
+        self.assertEqual(b''.join(blocks), self.content)
+        self.assertTrue(all(len(block) <= 100 for block in blocks))
+        self.assertTrue(all(block.endswith(b'\n') for block in blocks[:-1]))
+        expected = list(data_fetcher.iter_line_blocks([self.content], block_size))
+        self.assertEqual(blocks, expected)
+
+    @patch('app.config.CHUNK_BYTES', 4000)
+    @patch('app.validator.check_for_expected_columns')
+    def test_chunks_cut_to_memory_budget(self, mock_check_for_expected_columns):
+        mock_check_for_expected_columns.return_value = None
+        with open(self.path, 'wb') as file:
+            file.write(b'Date,Time,Temp\n' + b''.join(
+                f'31/05/2006,{i:04d},{i % 30}.5\n'.encode() for i in range(1000)
+            ))
+        chunks = list(data_fetcher.get_data_chunk(self.path))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 1000)
+        # the first block is cut at 4000 raw bytes, the next ones are
+        # sized by the memory used by the previous block
+        for chunk in chunks[1:-1]:
+            memory = chunk.memory_usage(deep=True).sum()
+            self.assertLess(abs(memory - 4000), 400)
+
+    def test_empty_local_file(self):
+        open(self.path, 'wb').close()
+        self.assertEqual(
+            list(data_fetcher.iter_mapped_line_blocks(self.path, 0, {'lines': 10})),
+            []
+        )
+
+    def test_missing_local_file(self):
+        with self.assertRaises(OSError):
+            list(data_fetcher.get_data_chunk('file:///no/such/file.csv'))
+
+class TestCompressedSource(LocalServerTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for patcher in (
+            patch('app.config.CHUNK_ROWS', 10),
+            patch('app.validator.check_for_expected_columns'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.expected = self.get_chunks(self.serve(NoRangeRequestHandler))
+        self.content = gzip.compress(self.content)
+
+    def get_chunks(self, url, *args):
+        return list(data_fetcher.get_data_chunk(url, None, *args))
+
+    def assert_same_chunks(self, chunks, expected):
+        self.assertEqual(len(chunks), len(expected))
+        for chunk, expected_chunk in zip(chunks, expected):
+            self.assertTrue(chunk.equals(expected_chunk))
+            self.assertEqual(chunk.attrs, expected_chunk.attrs)
+
+    def test_compressed_download(self):
+        url = self.serve(NoRangeRequestHandler)
+        self.assert_same_chunks(self.get_chunks(url), self.expected)
+
+    def test_gzip_content_encoding(self):
+        url = self.serve(GzipEncodingRequestHandler)
+        self.assert_same_chunks(self.get_chunks(url + '.gz'), self.expected)
+
+    @patch('app.config.DOWNLOAD_SEGMENT_SIZE', 40)
+    @patch('app.config.DOWNLOAD_WORKERS', 3)
+    def test_compressed_file_is_not_segmented(self):
+        url = self.serve(RangeRequestHandler)
+        self.assert_same_chunks(self.get_chunks(url), self.expected)
+
+    def test_resume_compressed_download(self):
+        url = self.serve(RangeRequestHandler)
+        offset = self.expected[2].attrs['byte_offset']
+        row_count = self.expected[2].attrs['row_count']
+        resumed = self.get_chunks(url, offset, row_count)
+        self.assert_same_chunks(resumed, self.expected[3:])
+
+    def test_compressed_local_file(self):
+        path = './app/tests/test_output/data.csv.xz'
+        with open(path, 'wb') as file:
+            file.write(lzma.compress(gzip.decompress(self.content)))
+        self.addCleanup(os.remove, path)
+        self.assert_same_chunks(self.get_chunks(path), self.expected)
+        offset = self.expected[0].attrs['byte_offset']
+        resumed = self.get_chunks(path, offset, 9)
+        self.assert_same_chunks(resumed, self.expected[1:])
+
 # pylint: disable=unused-argument
 # pylint: disable=too-few-public-methods
 
 class MockValidDataStream:
     def __init__(self):
         self.iter_lines = self.mock_iter_lines
+        self.iter_content = self.mock_iter_content
+        self.headers = {}
 
     def mock_iter_lines(self, **kwargs):
         # mocked response of iter_lines()
@@ -103,9 +511,15 @@ class MockValidDataStream:
             'd1,d2,d3,d4',
         ]
 
+    def mock_iter_content(self, **kwargs):
+        # mocked response of iter_content(); lines split across chunks
+        return [b'c1,c2,c3,c4\nd1,d2', b',d3,d4\nd1,d2,d3,d4\n']
+
 class MockInValidDataStream:
     def __init__(self):
         self.iter_lines = self.mock_iter_lines
+        self.iter_content = self.mock_iter_content
+        self.headers = {}
 
     def mock_iter_lines(self, **kwargs):
         # mocked response of iter_lines()
@@ -115,9 +529,15 @@ class MockInValidDataStream:
             'd1,d2,d3,d4',
         ]
 
+    def mock_iter_content(self, **kwargs):
+        # mocked response of iter_content()
+        return [b'c1,c2\nd1,d2,d3,d4\nd1,d2,d3,d4\n']
+
 class MockInValidCSVDataStream:
     def __init__(self):
         self.iter_lines = self.mock_iter_lines
+        self.iter_content = self.mock_iter_content
+        self.headers = {}
 
     def mock_iter_lines(self, **kwargs):
         # mocked response of iter_lines()
@@ -126,3 +546,71 @@ class MockInValidCSVDataStream:
             ['d1,d2,d3,d4'],
             ['d1,d2,d3,d4'],
         ]
+
+    def mock_iter_content(self, **kwargs):
+        # mocked response of iter_content(); quoted value never closed
+        return [b'c1,c2,c3,c4\n"d1,d2,d3,d4\nd1,d2,d3,d4\n']
+
+# pylint: disable=invalid-name
+
+class NoRangeRequestHandler(http.server.BaseHTTPRequestHandler):
+    content = b''
+    accept_ranges = False
+
+    def log_message(self, *args):
+        pass
+
+    def send_content_headers(self, status, length):
+        self.send_response(status)
+        if self.accept_ranges:
+            self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+
+    def do_HEAD(self):
+        self.send_content_headers(200, len(self.content))
+
+    def do_GET(self):
+        self.send_content_headers(200, len(self.content))
+        self.wfile.write(self.content)
+
+class IgnoreRangeRequestHandler(NoRangeRequestHandler):
+    accept_ranges = True
+
+class RangeRequestHandler(NoRangeRequestHandler):
+    accept_ranges = True
+
+    def do_GET(self):
+        if 'Range' not in self.headers:
+            super().do_GET()
+            return
+        first, last = self.headers['Range'].split('=')[1].split('-')
+        if int(first) >= len(self.content):
+            self.send_content_headers(416, 0)
+            return
+        last = int(last) if last else len(self.content) - 1
+        data = self.content[int(first):last + 1]
+        self.send_content_headers(206, len(data))
+        self.wfile.write(data)
+
+class DropConnectionRequestHandler(RangeRequestHandler):
+    dropped = False
+
+    def do_GET(self):
+        if 'Range' in self.headers or DropConnectionRequestHandler.dropped:
+            super().do_GET()
+            return
+        # send half of the file and drop the connection
+        DropConnectionRequestHandler.dropped = True
+        self.send_content_headers(200, len(self.content))
+        self.wfile.write(self.content[:len(self.content) // 2])
+        self.wfile.flush()
+        self.close_connection = True
+
+class GzipEncodingRequestHandler(NoRangeRequestHandler):
+
+    def send_content_headers(self, status, length):
+        self.send_response(status)
+        self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
@@ -1,17 +1,19 @@
 """This file contains unit tests for functions in `validator.py`"""
-import datetime
 import sys
 import unittest
+from unittest.mock import patch
 
 sys.path.append('.')
 
 # pylint: disable=wrong-import-position
 
+import numpy as np
 import pandas as pd
 from pandas.testing import assert_frame_equal
 
 from app import custom_exceptions as ce
 from app import data_operations as data_op
+from app import tasks
 
 # pylint: disable=missing-class-docstring
 # pylint: disable=missing-function-docstring
@@ -37,8 +39,10 @@ class TestValidator(unittest.TestCase):
         expected_df = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature',
                      'Low Temperature'],
-            data=[['31/05/2006',datetime.time(9,0),9.3,9.7,9.1],]
+            data=[[732462,540,9.3,9.7,9.1],]
         )
+        expected_df['Date'] = expected_df['Date'].astype('Int32')
+        expected_df['Time'] = expected_df['Time'].astype('Int16')
         data_op.transform_data(pandas_df)
         assert_frame_equal(pandas_df, expected_df)
 
@@ -61,27 +65,28 @@ class TestValidator(unittest.TestCase):
         with self.assertRaises(ce.UnSupporterdDataTypeError):
             data_op.transform_data(pandas_df)
 
-    def test_convert_date_col_to_datetime_no_error_raised(self):
+    def test_convert_date_col_to_ordinal_no_error_raised(self):
         input_with_str_vals = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature',
                      'Low Temperature'],
             data=[
                 ['31/05/2006','09:00','9.3','9.7','9.1'],
-                ['31/05/2006','09:00','9.3','9.7','9.1'],
+                [None,'09:00','9.3','9.7','9.1'],
             ]
         )
         expected_df = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature',
                      'Low Temperature'],
             data=[
-                ['31/05/2006','09:00','9.3','9.7','9.1'],
-                ['31/05/2006','09:00','9.3','9.7','9.1'],
+                [732462,'09:00','9.3','9.7','9.1'],
+                [None,'09:00','9.3','9.7','9.1'],
             ]
         )
-        data_op.convert_date_col_to_datetime(input_with_str_vals)
+        expected_df['Date'] = expected_df['Date'].astype('Int32')
+        data_op.convert_date_col_to_ordinal(input_with_str_vals)
         assert_frame_equal(input_with_str_vals, expected_df)
 
-    def test_convert_date_col_to_datetime_error_raised(self):
+    def test_convert_date_col_to_ordinal_error_raised(self):
         input_with_wrong_dates = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature',
                      'Low Temperature'],
@@ -91,29 +96,40 @@ class TestValidator(unittest.TestCase):
             ]
         )
         with self.assertRaises(ce.UnSupporterdDataTypeError):
-            data_op.convert_date_col_to_datetime(input_with_wrong_dates)
+            data_op.convert_date_col_to_ordinal(input_with_wrong_dates)
+
+    def test_parse_day_ordinals(self):
+        output = data_op.parse_day_ordinals(
+            ['31/05/2006', '01/06/2006', '31/05/2006']
+        )
+        self.assertEqual(output.tolist(), [732462, 732463, 732462])
 
-    def test_convert_time_col_to_datetime_no_error_raised(self):
+    def test_format_day_ordinals(self):
+        output = data_op.format_day_ordinals([732462, 732493])
+        self.assertEqual(output, ['31/05/2006', '01/07/2006'])
+
+    def test_convert_time_col_to_minutes_no_error_raised(self):
         input_with_str_vals = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature',
                      'Low Temperature'],
             data=[
                 ['31/05/2006','09:00','9.3','9.7','9.1'],
-                ['31/05/2006','09:00','9.3','9.7','9.1'],
+                ['31/05/2006',None,'9.3','9.7','9.1'],
             ]
         )
         expected_df = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature',
                      'Low Temperature'],
             data=[
-                ['31/05/2006',datetime.time(9,0),'9.3','9.7','9.1'],
-                ['31/05/2006',datetime.time(9,0),'9.3','9.7','9.1'],
+                ['31/05/2006',540,'9.3','9.7','9.1'],
+                ['31/05/2006',None,'9.3','9.7','9.1'],
             ]
         )
-        data_op.convert_time_col_to_datetime(input_with_str_vals)
+        expected_df['Time'] = expected_df['Time'].astype('Int16')
+        data_op.convert_time_col_to_minutes(input_with_str_vals)
         assert_frame_equal(input_with_str_vals, expected_df)
 
-    def test_convert_time_col_to_datetime_error_raised(self):
+    def test_convert_time_col_to_minutes_error_raised(self):
         input_with_wrong_time = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature',
                      'Low Temperature'],
@@ -123,7 +139,17 @@ class TestValidator(unittest.TestCase):
             ]
         )
         with self.assertRaises(ce.UnSupporterdDataTypeError):
-            data_op.convert_time_col_to_datetime(input_with_wrong_time)
+            data_op.convert_time_col_to_minutes(input_with_wrong_time)
+
+    def test_parse_minutes_of_day(self):
+        output = data_op.parse_minutes_of_day(['00:00', '00:10', '23:50'])
+        self.assertEqual(output.tolist(), [0, 10, 1430])
+        output = data_op.parse_minutes_of_day(['15:00:00'], format_='%H:%M:%S')
+        self.assertEqual(output.tolist(), [900])
+
+    def test_format_minutes_of_day(self):
+        output = data_op.format_minutes_of_day([0, 10, 900, 1439])
+        self.assertEqual(output.tolist(), ['00:00', '00:10', '15:00', '23:59'])
 
     def test_convert_column_data_to_numeric_no_error_raised(self):
         input_with_str_vals = pd.DataFrame(
@@ -157,6 +183,88 @@ class TestValidator(unittest.TestCase):
         with self.assertRaises(ce.UnSupporterdDataTypeError):
             data_op.convert_column_data_to_numeric(input_with_str_vals)
 
+    def test_to_columnar_chunk(self):
+        transformed_df = pd.DataFrame(
+            columns=['Date','Time','Outside Temperature','Hi Temperature',
+                     'Low Temperature'],
+            data=[[732462,540,9.3,9.7,9.1],
+                  [732462,550,9.4,9.8,9.2],],
+            index=[0, 2],
+        )
+        chunk = data_op.to_columnar_chunk(transformed_df)
+        self.assertEqual(chunk['num_rows'], 2)
+        self.assertEqual(chunk['columns']['Time'].tolist(), [540, 550])
+        self.assertEqual(chunk['columns']['Time'].dtype, 'int16')
+        self.assertEqual(chunk['columns']['Date'].dtype, 'int32')
+        self.assertEqual(chunk['columns']['Hi Temperature'].dtype, 'float64')
+
+    def test_get_time_span(self):
+        chunk = data_op.transform_data(pd.DataFrame(
+            columns=['Date', 'Time', 'Outside Temperature'],
+            data=[['01/06/2006', '23:50', '9.3'], ['02/06/2006', '00:10', '9.4']],
+        ))
+        span = data_op.get_time_span(chunk)
+        self.assertEqual(span, (732463 * 1440 + 1430, 732464 * 1440 + 10))
+        self.assertEqual(data_op.get_time_span(chunk, (0, 1)), (0, span[1]))
+        empty = {'num_rows': 0, 'columns': {}}
+        self.assertIsNone(data_op.get_time_span(empty))
+        self.assertEqual(data_op.get_time_span(empty, span), span)
+
+    def test_upcast_to_float64(self):
+        values = np.array([10.2, 7.84927601051043, -0.1])
+        output = data_op.upcast_to_float64(values.astype(np.float32))
+        self.assertEqual(output.dtype, 'float64')
+        self.assertEqual(output[:1].tolist(), [10.2])
+        self.assertEqual(output[2], -0.1)
+        self.assertIs(data_op.upcast_to_float64(values), values)
+
+    def test_upcast_to_float64_repeated_values(self):
+        values = np.array([10.2, -0.1, 10.2, 7.5, -0.1], dtype=np.float32)
+        output = data_op.upcast_to_float64(values)
+        self.assertEqual(output.tolist(), [10.2, -0.1, 10.2, 7.5, -0.1])
+        empty = data_op.upcast_to_float64(np.array([], dtype=np.float32))
+        self.assertEqual((empty.dtype, empty.shape), (np.float64, (0,)))
+
+    @patch('app.config.COMPACT', True)
+    def test_transform_data_compact(self):
+        pandas_df = pd.DataFrame(
+            columns=['Date','Time','Outside Temperature','Hi Temperature',
+                     'Low Temperature', 'Wind Direction'],
+            data=[['31/05/2006','09:00','9.3','9.7','9.1','NNW'],
+                  ['31/05/2006','09:10','9.4','9.8','9.2','NNW'],]
+        )
+        with self.assertLogs(level='INFO') as logs:
+            chunk = data_op.transform_data(pandas_df)
+        self.assertEqual(chunk['columns']['Hi Temperature'].dtype, 'float32')
+        self.assertEqual(data_op.get_chunk_memory(chunk), 2 * (4 + 2 + 3 * 4))
+        self.assertTrue(
+            any('Compact chunk of 2 rows uses 36 bytes' in line
+                for line in logs.output)
+        )
+
+    def test_chunk_to_frame(self):
+        transformed_df = pd.DataFrame(
+            columns=['Date','Time','Outside Temperature','Hi Temperature',
+                     'Low Temperature'],
+            data=[[732462,540,9.3,9.7,9.1],],
+        )
+        expected_df = pd.DataFrame(
+            columns=['Date','Time','Outside Temperature','Hi Temperature',
+                     'Low Temperature'],
+            data=[[732462,540,9.3,9.7,9.1],],
+        )
+        expected_df['Date'] = expected_df['Date'].astype('int32')
+        expected_df['Time'] = expected_df['Time'].astype('int16')
+        output = data_op.chunk_to_frame(data_op.to_columnar_chunk(transformed_df))
+        assert_frame_equal(output, expected_df)
+
+    def test_get_column_projection(self):
+        expected = {
+            'Date': 'str', 'Time': 'str', 'Outside Temperature': 'float64',
+            'Hi Temperature': 'float64', 'Low Temperature': 'float64',
+        }
+        self.assertEqual(data_op.get_column_projection(), expected)
+
     def test_remove_cols_that_are_not_needed_has_unwanted_cols(self):
         input_with_unwanted_cols = pd.DataFrame(
             columns=['Date', 'Time', 'Temp Humidity Index   ',
@@ -256,18 +364,22 @@ class TestValidator(unittest.TestCase):
 
     def test_formatted_task_1_results_no_error_raised(self):
         input_data = {
-            '31/05/2006': {'time': '14:40:00', 'temp': 15.5},
-            '01/06/2006': {'time': '15:00:00', 'temp': 17.2},
-            '02/06/2006': {'time': '13:20:00', 'temp': 17.7},
-            '03/06/2006': {'time': '14:50:00', 'temp': 19.6},
+            732462: {'time': 880, 'temp': 15.5}, # 31/05/2006
+            732463: {'time': 900, 'temp': 17.2}, # 01/06/2006
+            732464: {'time': 800, 'temp': 17.7}, # 02/06/2006
+            732465: {'time': 890, 'temp': 19.6}, # 03/06/2006
         }
         expected = (
-            [('05/2006', '14:40'), ('06/2006', '14:30')],
+            [('05/2006', '14:40'), ('06/2006', '14:23')],
             '14:40',
             [('19.6', '03/06/2006'), ('17.7', '02/06/2006'),
                 ('17.2', '01/06/2006'), ('15.5', '31/05/2006')],
         )
-        result = data_op.formatted_task_1_results(
-            input_data, 10
-        )
+        summary = tasks.new_task_1_summary(10)
+        tasks.update_task_1_summary(summary, input_data)
+        result = data_op.formatted_task_1_results(summary)
         self.assertEqual(result, expected)
+
+    def test_formatted_task_1_results_error_raised(self):
+        with self.assertRaises(ce.InvalidFormatError):
+            data_op.formatted_task_1_results({'top_days': []})
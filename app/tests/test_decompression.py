@@ -0,0 +1,112 @@
+"""This file contains unit tests for functions in `decompression.py`"""
+
+import bz2
+import gzip
+import lzma
+import sys
+import unittest
+
+sys.path.append('.')
+
+# pylint: disable=wrong-import-position
+
+from app import decompression
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+COMPRESS = {
+    'gzip': gzip.compress,
+    'bz2': bz2.compress,
+    'xz': lzma.compress,
+}
+
+def split_into_chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+class TestDetectCompression(unittest.TestCase):
+
+    def test_detect_from_magic_bytes(self):
+        for name, compress in COMPRESS.items():
+            head = compress(b'Date,Time\n')[:decompression.MAX_MAGIC_LENGTH]
+            self.assertEqual(
+                decompression.detect_compression('http://a.b/c', head), name
+            )
+        self.assertIsNone(
+            decompression.detect_compression('http://a.b/c', b'Date,T')
+        )
+
+    def test_extension_confirmed_by_magic_bytes(self):
+        head = gzip.compress(b'Date,Time\n')
+        self.assertEqual(
+            decompression.detect_compression('http://a.b/c.csv.gz', head),
+            'gzip'
+        )
+        # decoded by requests because of `Content-Encoding: gzip`
+        self.assertIsNone(
+            decompression.detect_compression('http://a.b/c.csv.gz', b'Date,T')
+        )
+        # a bz2 file with a wrong extension is not decompressed as gzip
+        self.assertIsNone(decompression.detect_compression(
+            '/data/c.csv.gz', bz2.compress(b'Date,Time\n')
+        ))
+
+    def test_content_encoding(self):
+        head = lzma.compress(b'Date,Time\n')
+        self.assertEqual(
+            decompression.detect_compression('http://a.b/c.csv', head, 'xz'),
+            'xz'
+        )
+
+
+class TestIterDecompressed(unittest.TestCase):
+
+    def setUp(self):
+        self.data = b''.join(
+            f'31/05/2006,{i:04d},{i % 30}.5\n'.encode() for i in range(2000)
+        )
+
+    def test_decompress_in_bounded_chunks(self):
+        for name, compress in COMPRESS.items():
+            chunks = split_into_chunks(compress(self.data), 100)
+            output = list(decompression.iter_decompressed(chunks, name, 512))
+            self.assertEqual(b''.join(output), self.data)
+            self.assertTrue(all(len(chunk) <= 512 for chunk in output))
+
+    def test_concatenated_streams(self):
+        for name, compress in COMPRESS.items():
+            compressed = compress(self.data[:1000]) + compress(self.data[1000:])
+            output = decompression.iter_decompressed(
+                split_into_chunks(compressed, 64), name, 256
+            )
+            self.assertEqual(b''.join(output), self.data)
+
+    def test_truncated_stream(self):
+        for name, compress in COMPRESS.items():
+            compressed = compress(self.data)
+            with self.assertRaises(ValueError):
+                list(decompression.iter_decompressed(
+                    [compressed[:len(compressed) // 2]], name, 1024
+                ))
+
+    def test_corrupt_stream(self):
+        for name, compress in COMPRESS.items():
+            compressed = bytearray(compress(self.data))
+            compressed[len(compressed) // 2:] = b'x' * (len(compressed) // 2)
+            with self.assertRaises(ValueError):
+                list(decompression.iter_decompressed(
+                    [bytes(compressed)], name, 1024
+                ))
+
+    def test_decompress_stream(self):
+        chunks = split_into_chunks(gzip.compress(self.data), 3)
+        output = decompression.decompress_stream('http://a.b/c', chunks, 1024)
+        self.assertEqual(b''.join(output), self.data)
+        chunks = split_into_chunks(self.data, 3)
+        output = decompression.decompress_stream('http://a.b/c', chunks, 1024)
+        self.assertEqual(b''.join(output), self.data)
+
+    def test_peek(self):
+        head, chunks = decompression.peek([b'ab', b'cd', b'ef'], 3)
+        self.assertEqual(head, b'abcd')
+        self.assertEqual(list(chunks), [b'ab', b'cd', b'ef'])
@@ -0,0 +1,138 @@
+"""This file contains unit tests for functions in `executors.py`"""
+
+import sys
+import threading
+import unittest
+from concurrent import futures
+from unittest.mock import MagicMock, patch
+
+sys.path.append('.')
+
+# pylint: disable=wrong-import-position
+
+import numpy as np
+import pandas as pd
+
+from app import custom_exceptions as ce
+from app import data_operations as data_op
+from app import executors, tasks
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+# pylint: disable=protected-access
+
+class TestStartExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk = data_op.transform_data(pd.DataFrame(
+            columns=['Date', 'Time', 'Outside Temperature'],
+            data=[
+                ['01/06/2006', '00:00', '10.2'],
+                ['01/06/2006', '00:10', '11.0'],
+                ['02/06/2006', '00:00', '9.5'],
+            ],
+        ))
+        self.expected = tasks.map_tasks(['task1'], self.chunk)
+
+    def test_backends_return_the_result_of_the_task(self):
+        for name in ['inline', 'threads', 'processes']:
+            with executors.start_executor(name, 2) as submit:
+                result = submit(tasks.map_tasks, ['task1'], self.chunk)
+                self.assertEqual(result(), self.expected, name)
+
+    def test_inline_backend_with_several_sources(self):
+        # the source threads submit the tasks at the same time
+        barrier = threading.Barrier(4)
+
+        def process_source(submit):
+            barrier.wait()
+            return submit(tasks.map_tasks, ['task1'], self.chunk)()
+
+        with patch.object(tasks.celery_app, 'finalize',
+                wraps=tasks.celery_app.finalize) as finalize:
+            with executors.start_executor('inline') as submit:
+                finalize.assert_called_once_with(auto=True)
+                with futures.ThreadPoolExecutor(max_workers=4) as pool:
+                    results = list(pool.map(process_source, [submit] * 4))
+        self.assertEqual(results, [self.expected] * 4)
+
+    def test_default_backend_from_config(self):
+        with patch('app.config.EXECUTOR', 'inline'):
+            with executors.start_executor() as submit:
+                self.assertIs(submit, executors.run_inline)
+
+    def test_celery_backend_sends_the_task(self):
+        task = MagicMock()
+        with executors.start_executor('celery') as submit:
+            result = submit(task, 'task1', None)
+        task.delay.assert_called_once_with('task1', None)
+        self.assertIs(result(), task.delay.return_value.get.return_value)
+
+    def test_unsupported_backend(self):
+        with self.assertRaises(ce.InvalidConfigError):
+            with executors.start_executor('mpi'):
+                pass
+
+    def test_errors_of_the_task_are_raised_on_get(self):
+        with executors.start_executor('threads', 1) as submit:
+            result = submit(tasks.update_task, 'task4', None, self.chunk)
+            with self.assertRaises(ce.InvalidConfigError):
+                result()
+
+    def test_processes_backend_with_pickled_chunks(self):
+        with patch('app.config.SHARED_MEMORY', False):
+            with executors.start_executor('processes', 1) as submit:
+                result = submit(tasks.map_tasks, ['task1'], self.chunk)
+                self.assertEqual(result(), self.expected)
+
+    def test_process_workers_get_the_config_of_the_driver(self):
+        with patch('app.config.T3_AVERAGE_TEMP', 30):
+            expected = tasks.map_task_3(self.chunk)['result']
+            with executors.start_executor('processes', 1) as submit:
+                result = submit(tasks.map_tasks, ['task3'], self.chunk)
+                self.assertEqual(result()['task3']['result'], expected)
+
+    def test_get_task_modules(self):
+        self.assertIn('app.tasks', executors.get_task_modules())
+        self.assertNotIn('__main__', executors.get_task_modules())
+
+
+class TestSharedChunks(unittest.TestCase):
+
+    def setUp(self):
+        self.chunk = data_op.transform_data(pd.DataFrame(
+            columns=['Date', 'Time', 'Outside Temperature'],
+            data=[['01/06/2006', '00:00', '10.2'], ['01/06/2006', '00:10', '11.0']],
+        ))
+        self.chunk['columns']['Station'] = np.array(['a', 'b'])
+
+    def test_share_and_attach_chunk(self):
+        blocks = []
+        shared = executors.share_chunk(self.chunk, blocks)
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual(list(shared['columns']), ['Station'])
+        self.assertEqual(
+            shared['shared']['Date'][1:], ('<i4', (2,))
+        )
+
+        attached = executors.attach_chunk(shared)
+        self.assertEqual(attached['num_rows'], 2)
+        for name, values in self.chunk['columns'].items():
+            np.testing.assert_array_equal(attached['columns'][name], values)
+            self.assertEqual(attached['columns'][name].dtype, values.dtype)
+
+        # the blocks in use by the arrays are kept attached
+        executors.release_attached()
+        self.assertEqual(len(executors._ATTACHED), 3)
+        del attached
+        executors.release_attached()
+        self.assertEqual(executors._ATTACHED, [])
+        executors.release_blocks(blocks)
+
+    def test_empty_columns_are_not_shared(self):
+        chunk = {'num_rows': 0, 'columns': {'Date': np.array([], dtype=np.int32)}}
+        blocks = []
+        shared = executors.share_chunk(chunk, blocks)
+        self.assertEqual(blocks, [])
+        self.assertEqual(shared['shared'], {})
+        self.assertEqual(executors.attach_chunk(shared)['num_rows'], 0)
@@ -1,6 +1,7 @@
 """This file contains unit tests for functions in `file_operations.py`"""
 import os
 import sys
+import tempfile
 import unittest
 from unittest.mock import patch
 
@@ -9,30 +10,47 @@ sys.path.append('.')
 # pylint: disable=wrong-import-position
 
 from app import config
+from app import custom_exceptions as ce
 from app import file_operations as file_op
+from app import tasks
 
 # pylint: disable=missing-class-docstring
 # pylint: disable=missing-function-docstring
 
+def get_t1_ckpt(days, open_days=None, edge_days=None):
+    summary = tasks.new_task_1_summary(config.T1_COUNT_OF_TOP_HOTTEST_DAYS)
+    tasks.update_task_1_summary(summary, days)
+    summary['edge_days'] = edge_days or {}
+    state = tasks.init_task_1(True)
+    state['days'] = open_days or {}
+    return {'result': summary, 'state': state}
+
 class TestValidator(unittest.TestCase):
 
     def setUp(self):
-        test_dir = './app/tests/test_output'
+        # the checkpoints of each test are kept apart from other runs
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.test_dir = temp_dir.name
+        output_dir = patch('app.config.OUTPUT_DIR', self.test_dir)
+        output_dir.start()
+        self.addCleanup(output_dir.stop)
+        test_dir = self.test_dir
         file_1 = config.T1_FILE_NAME + '-ckpt-1'
         file_2 = config.T2_FILE_NAME + '-ckpt-1'
         file_3 = config.T3_FILE_NAME + '-ckpt-1'
-        t1_data = {
-            '01/06/2006': {'temp': 17.2, 'time': '15:00:00'},
-            '01/07/2006': {'temp': 16.0, 'time': '08:50:00'},
-        }
-        t2_data = [
-            ('01/06/2006', '15:00'),
-            ('01/07/2006', '08:50'),
-        ]
-        t3_data = [
-            ('01/06/2006', '15:00', 10.2),
-            ('01/07/2006', '08:50', 15.8),
-        ]
+        t1_data = get_t1_ckpt({
+            732463: {'temp': 17.2, 'time': 900}, # 01/06/2006
+            732493: {'temp': 16.0, 'time': 530}, # 01/07/2006
+        })
+        t2_data = {'result': [
+            (732463, 900), # 01/06/2006
+            (732493, 530), # 01/07/2006
+        ], 'state': []}
+        t3_data = {'result': {'rows': [
+            (732463, 900, 10.2), # 01/06/2006
+            (732493, 530, 15.8), # 01/07/2006
+        ], 'edge_days': {}}, 'state': tasks.init_task_3(True)}
         file_op.save_as_pkl(t1_data, file_1, test_dir)
         file_op.save_as_pkl(t2_data, file_2, test_dir)
         file_op.save_as_pkl(t3_data, file_3, test_dir)
@@ -51,23 +69,26 @@ class TestValidator(unittest.TestCase):
         expected = 'a/b/c/d.txt'
         self.assertEqual(output, expected)
 
-    @patch('app.config.OUTPUT_DIR', './app/tests/test_output')
     def test_save_checkpoints_no_error_raised(self):
-        t1_res = {
-            '01/06/2006': {'temp': 17.2, 'time': '15:00:00'},
-            '01/07/2006': {'temp': 16.0, 'time': '08:50:00'},
-        }
-        t2_res = [
-            ('01/06/2006', '15:00'),
-            ('01/07/2006', '08:50'),
-        ]
-        t3_res = [
-            ('01/06/2006', '15:00', 10.2),
-            ('01/07/2006', '08:50', 15.8),
-        ]
+        t1_res = get_t1_ckpt({
+            732463: {'temp': 17.2, 'time': 900}, # 01/06/2006
+            732493: {'temp': 16.0, 'time': 530}, # 01/07/2006
+        })
+        t2_res = {'result': [
+            (732463, 900), # 01/06/2006
+            (732493, 530), # 01/07/2006
+        ], 'state': []}
+        t3_res = {'result': {'rows': [
+            (732463, 900, 10.2), # 01/06/2006
+            (732493, 530, 15.8), # 01/07/2006
+        ], 'edge_days': {}}, 'state': tasks.init_task_3(True)}
         ckpt_num = 1
-        file_op.save_checkpoints(t1_res, t2_res, t3_res, ckpt_num)
-        test_dir_path = './app/tests/test_output'
+        file_op.save_checkpoints({
+            config.T1_FILE_NAME: t1_res,
+            config.T2_FILE_NAME: t2_res,
+            config.T3_FILE_NAME: t3_res,
+        }, ckpt_num)
+        test_dir_path = self.test_dir
         t1_file_name = f'{config.T1_FILE_NAME}-ckpt-{ckpt_num}.pkl'
         t2_file_name = f'{config.T2_FILE_NAME}-ckpt-{ckpt_num}.pkl'
         t3_file_name = f'{config.T3_FILE_NAME}-ckpt-{ckpt_num}.pkl'
@@ -78,23 +99,80 @@ class TestValidator(unittest.TestCase):
         self.assertTrue(t2_ckpt_exists, True)
         self.assertTrue(t3_ckpt_exists, True)
 
+    def test_load_latest_progress(self):
+        t1_res = get_t1_ckpt({}, {732463: {'temp': 17.2, 'time': 900}})
+        for ckpt_num in [2, 10, 9]:
+            progress = {'url': 'a', 'byte_offset': ckpt_num, 'row_count': 1}
+            file_op.save_checkpoints(
+                {config.T1_FILE_NAME: t1_res}, ckpt_num, progress
+            )
+        expected = {'url': 'a', 'byte_offset': 10, 'row_count': 1,
+                    'ckpt_num': 10}
+        self.assertEqual(file_op.load_latest_progress(), expected)
+
+    def test_load_latest_progress_of_source(self):
+        t1_res = get_t1_ckpt({}, {732463: {'temp': 17.2, 'time': 900}})
+        for source_num, ckpt_num in [(7, 3), (8, 12), (7, 4)]:
+            progress = {'url': str(source_num), 'byte_offset': ckpt_num,
+                        'row_count': 1}
+            file_op.save_checkpoints(
+                {config.T1_FILE_NAME: t1_res}, ckpt_num, progress, source_num
+            )
+        expected = {'url': '7', 'byte_offset': 4, 'row_count': 1,
+                    'ckpt_num': 4}
+        self.assertEqual(file_op.load_latest_progress(7), expected)
+        self.assertIsNone(file_op.load_latest_progress(9))
+
+    def test_checkpoint_names(self):
+        self.assertEqual(file_op.get_checkpoint_name('task1', 5), 'task1-ckpt-5')
+        self.assertEqual(
+            file_op.get_checkpoint_name('task1', 5, 2), 'task1-2-ckpt-5'
+        )
+        self.assertEqual(
+            file_op.parse_checkpoint_name('task1-ckpt-5.pkl'), ('task1', 0, 5)
+        )
+        self.assertEqual(
+            file_op.parse_checkpoint_name('task1-2-ckpt-5.pkl'), ('task1', 2, 5)
+        )
+        # the names of other files do not raise
+        self.assertEqual(
+            file_op.parse_checkpoint_name('my-task1-0-ckpt-3.pkl'),
+            ('my-task1', 0, 3),
+        )
+        self.assertEqual(
+            file_op.parse_checkpoint_name('task1-old-ckpt-2.pkl'),
+            ('task1-old', 0, 2),
+        )
+        for name in ['task1-ckpt-old.pkl', 'task1-ckpt-5.txt', 'task1.pkl']:
+            self.assertIsNone(file_op.parse_checkpoint_name(name))
+
+    def test_other_files_are_skipped(self):
+        for name in ['task1-old-ckpt-2.pkl', 'task1-ckpt-old.pkl', 'notes.txt']:
+            with open(os.path.join(self.test_dir, name), 'w', encoding='utf-8'):
+                pass
+        self.assertEqual(
+            file_op.get_task_checkpoint_file_names(['task1'])['task1'],
+            ['task1-ckpt-1.pkl'],
+        )
+        self.assertIsNone(file_op.load_latest_progress())
+
     def test_save_as_pkl_no_error_raised(self):
-        test_dir = './app/tests/test_output'
+        test_dir = self.test_dir
         file_1 = config.T1_FILE_NAME + '-ckpt-1000'
         file_2 = config.T2_FILE_NAME + '-ckpt-1000'
         file_3 = config.T3_FILE_NAME + '-ckpt-1000'
-        t1_data = {
-            '01/06/2006': {'temp': 17.2, 'time': '15:00:00'},
-            '01/07/2006': {'temp': 16.0, 'time': '08:50:00'},
-        }
-        t2_data = [
-            ('01/06/2006', '15:00'),
-            ('01/07/2006', '08:50'),
-        ]
-        t3_data = [
-            ('01/06/2006', '15:00', 10.2),
-            ('01/07/2006', '08:50', 15.8),
-        ]
+        t1_data = get_t1_ckpt({
+            732463: {'temp': 17.2, 'time': 900}, # 01/06/2006
+            732493: {'temp': 16.0, 'time': 530}, # 01/07/2006
+        })
+        t2_data = {'result': [
+            (732463, 900), # 01/06/2006
+            (732493, 530), # 01/07/2006
+        ], 'state': []}
+        t3_data = {'result': {'rows': [
+            (732463, 900, 10.2), # 01/06/2006
+            (732493, 530, 15.8), # 01/07/2006
+        ], 'edge_days': {}}, 'state': tasks.init_task_3(True)}
         file_op.save_as_pkl(t1_data, file_1, test_dir)
         file_op.save_as_pkl(t2_data, file_2, test_dir)
         file_op.save_as_pkl(t3_data, file_3, test_dir)
@@ -106,7 +184,7 @@ class TestValidator(unittest.TestCase):
         task_1_a = [('05/2006', '14:40'), ('06/2006', '12:33')]
         task_1_b = '14:50'
         task_1_c = [('23.2', '06/06/2006'), ('22.4', '11/06/2006')]
-        dir_path = './app/tests/test_output'
+        dir_path = self.test_dir
         file_name = 't1_test.txt'
         file_op.save_task_1_to_disk(
             task_1_a, task_1_b, task_1_c,
@@ -115,46 +193,77 @@ class TestValidator(unittest.TestCase):
         )
         self.assertTrue(os.path.exists(dir_path+'/'+file_name))
 
-    @patch('app.config.OUTPUT_DIR', './app/tests/test_output')
+    def test_format_task_1_as_lines(self):
+        task_1_a = [('05/2006', '14:40'), ('06/2006', '12:33')]
+        task_1_b = '14:50'
+        task_1_c = [('23.2', '06/06/2006')]
+        expected = [
+            'Average time of hottest daily temperature (over month)',
+            '05/2006 14:40', '06/2006 12:33', '',
+            'Most commonly occurring hottest time of day', '14:50', '',
+            'Top 1 hottest times on distinct days', '23.2 06/06/2006',
+        ]
+        output = file_op.format_task_1_as_lines(task_1_a, task_1_b, task_1_c, 1)
+        self.assertEqual(output, expected)
+
     def test_get_task_checkpoint_file_names(self):
-        # pylint: disable=invalid-name
-        t1, t2, t3 = file_op.get_task_checkpoint_file_names()
-        # all t1 files should have config.T1_FILE_NAME name
-        for name in t1:
-            if config.T1_FILE_NAME not in name:
-                self.assertEqual(True, False)
-        for name in t2:
-            if config.T2_FILE_NAME not in name:
-                self.assertEqual(True, False)
-        for name in t3:
-            if config.T3_FILE_NAME not in name:
-                self.assertEqual(True, False)
-        self.assertEqual(True, True)
-
-    @patch('app.config.OUTPUT_DIR', './app/tests/test_output')
-    def test_gather_task_1_results(self):
+        file_names = [config.T1_FILE_NAME, config.T2_FILE_NAME, 'unknown']
+        output = file_op.get_task_checkpoint_file_names(file_names)
+        self.assertEqual(list(output), file_names)
+        for file_name, names in output.items():
+            for name in names:
+                self.assertEqual(file_op.parse_checkpoint_name(name)[0], file_name)
+        self.assertIn(config.T1_FILE_NAME + '-ckpt-1.pkl', output[config.T1_FILE_NAME])
+        self.assertEqual(output['unknown'], [])
+
+    def test_load_pkl(self):
         t1_file_name = config.T1_FILE_NAME+'-ckpt-1.pkl'
-        output = file_op.gather_task_1_results([t1_file_name])
-        self.assertEqual(isinstance(output, dict), True)
-
-    @patch('app.config.OUTPUT_DIR', './app/tests/test_output')
-    def test_gather_and_save_task_results_task2(self):
-        t2_file_name = config.T1_FILE_NAME+'-ckpt-1.pkl'
-        file_op.gather_and_save_task_results([t2_file_name], 2)
-        dir_path = './app/tests/test_output'
-        self.assertTrue(os.path.exists(dir_path+'/'+t2_file_name))
+        output = file_op.load_pkl(t1_file_name, config.OUTPUT_DIR)
+        self.assertEqual(set(output.keys()), {'result', 'state'})
 
-    @patch('app.config.OUTPUT_DIR', './app/tests/test_output')
-    def test_gather_and_save_task_results_task3(self):
-        t3_file_name = config.T1_FILE_NAME+'-ckpt-1.pkl'
-        file_op.gather_and_save_task_results([t3_file_name], 3)
-        dir_path = './app/tests/test_output'
-        self.assertTrue(os.path.exists(dir_path+'/'+t3_file_name))
+    def test_compile_merges_task_1_checkpoints(self):
+        with tempfile.TemporaryDirectory() as dir_path, \
+                patch('app.config.OUTPUT_DIR', dir_path):
+            file_op.save_as_pkl(get_t1_ckpt(
+                {732464: {'temp': 12.0, 'time': 660}}, # 02/06/2006
+                {732465: {'temp': 11.0, 'time': 600}},
+                {
+                    732463: {'temp': 17.2, 'time': 900}, # 01/06/2006
+                    732465: {'temp': 11.0, 'time': 600}, # 03/06/2006
+                },
+            ), 'task1-5-ckpt-1', dir_path)
+            file_op.save_as_pkl(get_t1_ckpt({}, None, {
+                732465: {'temp': 10.5, 'time': 780}, # 03/06/2006
+            }), 'task1-6-ckpt-1', dir_path)
+            file_op.compile_checkpoints_to_generate_output(['task1'])
+            with open(dir_path + '/task1.txt', encoding='utf-8') as file:
+                lines = file.read().splitlines()
+        # the day that is split between the sources is counted once,
+        # and the open day of the first checkpoint is not counted
+        self.assertEqual(lines[1], '06/2006 12:00')
+        self.assertEqual(lines[7:], [
+            '17.2 01/06/2006', '12.0 02/06/2006', '11.0 03/06/2006'
+        ])
+
+    def test_compile_writes_rows_of_all_checkpoints(self):
+        with tempfile.TemporaryDirectory() as dir_path, \
+                patch('app.config.OUTPUT_DIR', dir_path):
+            for source_num, rows in [(1, [(732464, 0)]), (0, [(732463, 900)])]:
+                file_op.save_checkpoints(
+                    {'task2': {'result': rows, 'state': []}}, 1,
+                    source_num=source_num
+                )
+            file_op.compile_checkpoints_to_generate_output(['task2'])
+            # compiling again replaces the output
+            file_op.compile_checkpoints_to_generate_output(['task2'])
+            with open(dir_path + '/task2.txt', encoding='utf-8') as file:
+                lines = file.read().splitlines()
+        self.assertEqual(lines, ['01/06/2006 15:00', '02/06/2006 00:00'])
 
     def test_format_task_result_as_lines_task_2(self):
         t2_res = [
-            ('01/06/2006', '15:00'),
-            ('01/07/2006', '08:50'),
+            (732463, 900), # 01/06/2006
+            (732493, 530), # 01/07/2006
         ]
         expected = ['01/06/2006 15:00','01/07/2006 08:50']
         output = file_op.format_task_result_as_lines(t2_res, 2)
@@ -162,20 +271,34 @@ class TestValidator(unittest.TestCase):
 
     def test_format_task_result_as_lines_task_3(self):
         t3_res = [
-            ('01/06/2006', '15:00', 10.2),
-            ('01/07/2006', '08:50', 15.8),
+            (732463, 900, 10.2), # 01/06/2006
+            (732493, 530, 15.8), # 01/07/2006
         ]
         expected = ['01/06/2006 15:00 10.2', '01/07/2006 08:50 15.8']
         output = file_op.format_task_result_as_lines(t3_res, 3)
         self.assertEqual(output, expected)
 
-    @patch('app.config.OUTPUT_DIR', './app/tests/test_output')
     def test_compile_checkpoints_to_generate_output(self):
         file_op.compile_checkpoints_to_generate_output()
-        dir_path = './app/tests/test_output'
+        dir_path = self.test_dir
         t1_file_name = config.T1_FILE_NAME + config.FILE_EXTENSION
-        t2_file_name = config.T1_FILE_NAME + config.FILE_EXTENSION
-        t3_file_name = config.T1_FILE_NAME + config.FILE_EXTENSION
+        t2_file_name = config.T2_FILE_NAME + config.FILE_EXTENSION
+        t3_file_name = config.T3_FILE_NAME + config.FILE_EXTENSION
         self.assertTrue(os.path.exists(dir_path+'/'+t1_file_name))
         self.assertTrue(os.path.exists(dir_path+'/'+t2_file_name))
         self.assertTrue(os.path.exists(dir_path+'/'+t3_file_name))
+
+    def test_compile_rejects_malformed_checkpoints(self):
+        # a checkpoint of an older version, with only the result
+        file_op.save_as_pkl([(732463, 900)], config.T2_FILE_NAME + '-ckpt-2',
+            self.test_dir)
+        with self.assertRaises(ce.InvalidFormatError):
+            file_op.compile_checkpoints_to_generate_output(['task2'])
+        with self.assertRaises(ce.InvalidFormatError):
+            file_op.load_checkpoint(config.T2_FILE_NAME + '-ckpt-2.pkl',
+                self.test_dir)
+        self.assertEqual(
+            file_op.load_checkpoint(config.T2_FILE_NAME + '-ckpt-1.pkl',
+                self.test_dir)['state'],
+            [],
+        )
@@ -0,0 +1,87 @@
+"""This file contains unit tests for functions in `main.py`"""
+
+import sys
+import time
+import unittest
+from concurrent import futures
+from unittest.mock import patch
+
+sys.path.append('.')
+
+# pylint: disable=wrong-import-position
+
+import pandas as pd
+
+from app import data_operations as data_op
+from app import executors, main, registry, tasks
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+def map_after(delay, names, chunk):
+    time.sleep(delay)
+    return tasks.map_tasks(names, chunk)
+
+class TestCollectChunk(unittest.TestCase):
+
+    def setUp(self):
+        rows = [
+            ['31/05/2006', '23:50', '9.0'], ['01/06/2006', '00:00', '10.0'],
+            ['01/06/2006', '00:10', '12.0'], ['02/06/2006', '00:00', '11.0'],
+            ['02/06/2006', '00:10', '13.0'], ['03/06/2006', '00:00', '14.0'],
+        ]
+        self.chunks = [
+            data_op.transform_data(pd.DataFrame(
+                columns=['Date', 'Time', 'Outside Temperature'],
+                data=rows[start:start+2],
+            ))
+            for start in range(0, len(rows), 2)
+        ]
+        self.names = ['task1', 'task3']
+
+    def get_states(self):
+        return {name: registry.get_task(name)['init'](True) for name in self.names}
+
+    @patch('app.config.SAVE_CKPT_EVERY', 1000)
+    def test_partials_are_combined_in_the_order_of_the_chunks(self):
+        expected = self.get_states()
+        for name in self.names:
+            for chunk in self.chunks:
+                expected[name] = registry.get_task(name)['update'](
+                    expected[name], chunk
+                )
+
+        states = self.get_states()
+        with futures.ThreadPoolExecutor(len(self.chunks)) as pool:
+            # the later chunks are done first
+            in_flight = [
+                (num, None, None, [pool.submit(
+                    map_after, 0.05 * (len(self.chunks) - num), self.names, chunk
+                ).result])
+                for num, chunk in enumerate(self.chunks)
+            ]
+            for entry in in_flight:
+                main.collect_chunk(states, *entry, 0, executors.run_inline)
+
+        for name in self.names:
+            self.assertEqual(
+                registry.get_task(name)['flush'](states[name], True)[0],
+                registry.get_task(name)['flush'](expected[name], True)[0],
+            )
+
+
+class TestWarnAboutOverlappingSources(unittest.TestCase):
+
+    def test_overlapping_sources(self):
+        with self.assertLogs(level='WARNING') as logs:
+            main.warn_about_overlapping_sources(
+                ['b', 'a', 'c', 'd'], [(10, 20), (0, 9), (15, 30), None]
+            )
+        warnings = [line for line in logs.output if 'overlap' in line]
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('`b` and `c`', warnings[0])
+
+    def test_consecutive_sources(self):
+        with patch('logging.warning') as warning:
+            main.warn_about_overlapping_sources(['a', 'b'], [(0, 9), (10, 20)])
+        warning.assert_not_called()
@@ -0,0 +1,91 @@
+"""This file contains unit tests for functions in `pipeline.py`"""
+
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append('.')
+
+# pylint: disable=wrong-import-position
+
+import pandas as pd
+
+from app import pipeline
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+class TestPrefetch(unittest.TestCase):
+
+    def test_items_in_order(self):
+        for depth in (0, 1, 3):
+            output = list(pipeline.prefetch(iter(range(20)), depth))
+            self.assertEqual(output, list(range(20)))
+
+    def test_items_produced_in_background(self):
+        threads = []
+        def produce():
+            for i in range(3):
+                threads.append(threading.current_thread())
+                yield i
+        list(pipeline.prefetch(produce(), 2))
+        self.assertTrue(all(
+            thread is not threading.current_thread() for thread in threads
+        ))
+
+    def test_queue_is_bounded(self):
+        produced = []
+        def produce():
+            for i in range(10):
+                produced.append(i)
+                yield i
+        items = pipeline.prefetch(produce(), 2)
+        next(items)
+        time.sleep(0.2)
+        # 2 items in the queue and 1 waiting to be put
+        self.assertEqual(len(produced), 4)
+        items.close()
+
+    def test_error_is_raised_in_consumer(self):
+        def produce():
+            yield 1
+            raise ValueError('bad chunk')
+        items = pipeline.prefetch(produce(), 2)
+        self.assertEqual(next(items), 1)
+        with self.assertRaises(ValueError):
+            next(items)
+
+    def test_producer_stops_with_consumer(self):
+        produced = []
+        def produce():
+            for i in range(100):
+                produced.append(i)
+                yield i
+        for item in pipeline.prefetch(produce(), 1):
+            if item == 2:
+                break
+        time.sleep(0.3)
+        self.assertLess(len(produced), 10)
+
+
+class TestTransformedChunks(unittest.TestCase):
+
+    def test_progress_from_attrs(self):
+        chunk = pd.DataFrame({
+            'Date': ['01/06/2006'], 'Time': ['00:00'],
+            'Outside Temperature': [10.0], 'Hi Temperature': [11.0],
+            'Low Temperature': [9.0],
+        })
+        chunk.attrs = {'byte_offset': 100, 'row_count': 1}
+        unordered = chunk.copy()
+        unordered.attrs = {}
+        output = list(pipeline.iter_transformed_chunks('url', [chunk, unordered]))
+        self.assertEqual(
+            output[0][1], {'url': 'url', 'byte_offset': 100, 'row_count': 1}
+        )
+        self.assertIsNone(output[1][1])
+        self.assertEqual(output[0][0]['num_rows'], 1)
+        self.assertEqual(
+            output[0][0]['columns']['Outside Temperature'].tolist(), [10.0]
+        )
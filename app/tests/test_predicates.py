@@ -0,0 +1,52 @@
+"""This file contains unit tests for functions in `predicates.py`"""
+
+import sys
+import unittest
+
+sys.path.append('.')
+
+# pylint: disable=wrong-import-position
+
+import numpy as np
+
+from app import predicates
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+class TestCompileRangeFilter(unittest.TestCase):
+
+    def test_selects_rows_in_date_and_value_ranges(self):
+        columns = {
+            'Date': np.array([1, 2, 2, 3, 4], dtype=np.int32),
+            'A': np.array([5.0, 5.0, 9.0, 1.0, 5.0]),
+            'B': np.array([0.0, 0.0, 0.0, 7.0, 0.0]),
+        }
+        task_filter = predicates.compile_range_filter(
+            (2, 3), (('A', 4.0, 6.0), ('A', 8.0, 9.0), ('B', 7.0, 7.5))
+        )
+        output = task_filter(columns)
+        self.assertEqual(output.tolist(), [False, True, True, True, False])
+
+    def test_row_in_several_ranges_is_selected_once(self):
+        columns = {
+            'Date': np.array([1], dtype=np.int32),
+            'A': np.array([5.0]), 'B': np.array([5.0]),
+        }
+        task_filter = predicates.compile_range_filter(
+            (1, 1), (('A', 4.0, 6.0), ('B', 5.0, 5.0))
+        )
+        self.assertEqual(task_filter(columns).tolist(), [True])
+
+    def test_float32_values_equal_to_bounds_are_included(self):
+        columns = {
+            'Date': np.array([1, 1], dtype=np.int32),
+            'A': np.array([21.3, 23.3], dtype=np.float32),
+        }
+        task_filter = predicates.compile_range_filter((1, 1), (('A', 21.3, 23.3),))
+        self.assertEqual(task_filter(columns).tolist(), [True, True])
+
+    def test_compiled_filter_is_cached(self):
+        first = predicates.compile_range_filter((1, 2), (('A', 1.0, 2.0),))
+        second = predicates.compile_range_filter((1, 2), (('A', 1.0, 2.0),))
+        self.assertIs(first, second)
@@ -0,0 +1,133 @@
+"""This file contains unit tests for functions in `registry.py`"""
+
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append('.')
+
+# pylint: disable=wrong-import-position
+
+import pandas as pd
+
+from app import config
+from app import custom_exceptions as ce
+from app import data_operations as data_op
+from app import registry, tasks
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        registry.register_task(
+            'row_count', ['Date'],
+            init=lambda in_order: 0,
+            flush=lambda state, final: (state, 0),
+            merge=sum,
+            finalize=lambda result: [str(result)],
+            map_chunk=lambda chunk: chunk['num_rows'],
+            combine=lambda state, partial: state + partial,
+        )
+
+    def tearDown(self):
+        del registry.TASKS['row_count']
+
+    def test_built_in_tasks_are_registered(self):
+        for name in ['task1', 'task2', 'task3']:
+            self.assertIn(name, registry.TASKS)
+        self.assertEqual(registry.get_file_name('task1'), config.T1_FILE_NAME)
+
+    def test_file_name_is_read_when_used(self):
+        with patch('app.config.T2_FILE_NAME', 'rows'):
+            self.assertEqual(registry.get_file_name('task2'), 'rows')
+        self.assertEqual(registry.get_file_name('row_count'), 'row_count')
+
+    def test_get_task_unknown_name(self):
+        with self.assertRaises(ce.InvalidConfigError):
+            registry.get_task('task4')
+
+    def test_get_enabled_task_names(self):
+        with patch('app.config.TASKS', []):
+            self.assertIn('row_count', registry.get_enabled_task_names())
+        with patch('app.config.TASKS', ['task3', 'task1']):
+            self.assertEqual(registry.get_enabled_task_names(), ['task3', 'task1'])
+        with patch('app.config.TASKS', ['task4']):
+            with self.assertRaises(ce.InvalidConfigError):
+                registry.get_enabled_task_names()
+
+    def test_get_task_columns(self):
+        self.assertEqual(registry.get_task_columns(['row_count']), ['Date', 'Time'])
+        self.assertEqual(
+            registry.get_task_columns(['task3', 'task1']),
+            ['Date', 'Time', 'Outside Temperature'],
+        )
+        self.assertEqual(
+            registry.get_task_columns(['task2']),
+            ['Date', 'Time', 'Hi Temperature', 'Low Temperature'],
+        )
+
+    def test_update_from_map_and_combine(self):
+        task = registry.get_task('row_count')
+        self.assertEqual(task['update'](2, {'num_rows': 3}), 5)
+        self.assertEqual(
+            tasks.map_tasks(['row_count'], {'num_rows': 3}), {'row_count': 3}
+        )
+        self.assertIsNotNone(registry.get_task('task2')['map'])
+        self.assertIsNotNone(registry.get_task('task1')['map'])
+
+    def test_register_task_without_update(self):
+        with self.assertRaises(ce.InvalidConfigError):
+            registry.register_task(
+                'no_update', ['Date'], init=list, flush=tuple, merge=list,
+                finalize=list, map_chunk=len,
+            )
+
+    def test_file_name_with_a_dash(self):
+        with self.assertRaises(ce.InvalidConfigError):
+            registry.register_task(
+                'rows', ['Date'], init=list, flush=tuple, merge=list,
+                finalize=list, update=list, file_name='my-rows',
+            )
+        self.assertNotIn('rows', registry.TASKS)
+        with patch('app.config.T2_FILE_NAME', 'my-task2'):
+            with self.assertRaises(ce.InvalidConfigError):
+                registry.get_file_name('task2')
+
+    def test_register_task_with_unknown_column(self):
+        with self.assertRaises(ce.InvalidConfigError):
+            registry.register_task(
+                'wind', ['Date', 'Wind Speed'], init=list, flush=tuple,
+                merge=list, finalize=list, update=list,
+            )
+        self.assertNotIn('wind', registry.TASKS)
+        with patch('app.config.EXPECTED_COL_NAMES',
+                config.EXPECTED_COL_NAMES + ['Wind Speed']):
+            registry.register_task(
+                'wind', ['Date', 'Wind Speed'], init=list, flush=tuple,
+                merge=list, finalize=list, update=list,
+            )
+            self.assertEqual(
+                registry.get_task_columns(['wind']),
+                ['Date', 'Time', 'Wind Speed'],
+            )
+        del registry.TASKS['wind']
+
+    def test_map_tasks_runs_every_task_on_the_chunk(self):
+        chunk = data_op.transform_data(pd.DataFrame(
+            columns=['Date', 'Time', 'Outside Temperature'],
+            data=[['01/06/2006', '00:00', '10.2'], ['01/06/2006', '00:10', '11.0']],
+        ))
+        output = tasks.map_tasks(['row_count', 'task1'], chunk)
+        self.assertEqual(output, {
+            'row_count': 2,
+            'task1': tasks.map_task_1(chunk),
+        })
+
+    def test_update_task_runs_registered_task(self):
+        chunk = data_op.transform_data(pd.DataFrame(
+            columns=['Date', 'Time', 'Outside Temperature'],
+            data=[['01/06/2006', '00:00', '10.2']],
+        ))
+        self.assertEqual(tasks.update_task('row_count', 2, chunk), 3)
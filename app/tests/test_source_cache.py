@@ -0,0 +1,146 @@
+"""This file contains unit tests for functions in `source_cache.py`"""
+
+import http.server
+import os
+import shutil
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+sys.path.append('.')
+
+# pylint: disable=wrong-import-position
+
+from app import data_fetcher
+from app import source_cache
+
+# pylint: disable=missing-class-docstring
+# pylint: disable=missing-function-docstring
+
+CACHE_DIR = './app/tests/test_output/cache'
+
+@patch('app.config.CACHE_DIR', CACHE_DIR)
+class TestSourceCache(unittest.TestCase):
+
+    def setUp(self):
+        ETagRequestHandler.content = b'Date,Time\n01/06/2006,00:00\n'
+        ETagRequestHandler.etag = '"v1"'
+        ETagRequestHandler.full_responses = 0
+        server = http.server.ThreadingHTTPServer(
+            ('127.0.0.1', 0), ETagRequestHandler
+        )
+        threading.Thread(
+            target=server.serve_forever, args=(0.05,), daemon=True
+        ).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f'http://127.0.0.1:{server.server_address[1]}/data.csv'
+        self.addCleanup(shutil.rmtree, CACHE_DIR, True)
+
+    def read(self, url, byte_offset=0):
+        stream = data_fetcher.get_data_stream(url, byte_offset)
+        data = b''.join(stream.iter_content(chunk_size=8))
+        stream.close()
+        return data
+
+    def test_download_is_cached(self):
+        self.assertEqual(self.read(self.url), ETagRequestHandler.content)
+        entry = source_cache.get_cache_entry(self.url)
+        self.assertEqual(entry['etag'], '"v1"')
+        self.assertEqual(entry['size'], len(ETagRequestHandler.content))
+        self.assertTrue(os.path.isfile(source_cache.get_blob_path(entry['digest'])))
+
+    def test_not_modified_is_read_from_cache(self):
+        self.read(self.url)
+        self.assertEqual(self.read(self.url), ETagRequestHandler.content)
+        self.assertEqual(self.read(self.url, 10), ETagRequestHandler.content[10:])
+        self.assertEqual(ETagRequestHandler.full_responses, 1)
+
+    def test_modified_file_is_downloaded_again(self):
+        self.read(self.url)
+        old_digest = source_cache.get_cache_entry(self.url)['digest']
+        ETagRequestHandler.content += b'01/06/2006,00:10\n'
+        ETagRequestHandler.etag = '"v2"'
+        self.assertEqual(self.read(self.url), ETagRequestHandler.content)
+        self.assertEqual(ETagRequestHandler.full_responses, 2)
+        entry = source_cache.get_cache_entry(self.url)
+        self.assertEqual(entry['etag'], '"v2"')
+        # the outdated file is removed from the cache
+        self.assertFalse(os.path.isfile(source_cache.get_blob_path(old_digest)))
+
+    def test_incomplete_download_is_not_cached(self):
+        stream = data_fetcher.get_data_stream(self.url)
+        chunks = stream.iter_content(chunk_size=8)
+        next(chunks)
+        chunks.close()
+        stream.close()
+        self.assertIsNone(source_cache.get_cache_entry(self.url))
+        self.assertEqual(os.listdir(CACHE_DIR), [])
+
+    def test_same_content_is_stored_once(self):
+        self.read(self.url)
+        self.read(self.url + '?copy')
+        digests = {
+            source_cache.get_cache_entry(self.url)['digest'],
+            source_cache.get_cache_entry(self.url + '?copy')['digest'],
+        }
+        self.assertEqual(len(digests), 1)
+        self.assertEqual(sorted(os.listdir(CACHE_DIR)),
+            sorted([digests.pop(), source_cache.INDEX_FILE_NAME]))
+
+    def test_least_recently_used_is_evicted(self):
+        size = len(ETagRequestHandler.content)
+        self.read(self.url + '?a')
+        ETagRequestHandler.content += b'\n'
+        self.read(self.url + '?b')
+        # revalidating `a` makes `b` the least recently used
+        ETagRequestHandler.content = ETagRequestHandler.content[:-1]
+        self.read(self.url + '?a')
+        with patch('app.config.CACHE_MAX_BYTES', 2 * size + 2):
+            ETagRequestHandler.content += b'\n\n'
+            ETagRequestHandler.etag = '"v2"'
+            self.read(self.url + '?c')
+        self.assertIsNotNone(source_cache.get_cache_entry(self.url + '?a'))
+        self.assertIsNone(source_cache.get_cache_entry(self.url + '?b'))
+        self.assertIsNotNone(source_cache.get_cache_entry(self.url + '?c'))
+
+    def test_evict_least_recently_used(self):
+        index = {
+            'a': {'digest': 'x', 'size': 10, 'last_used': 3},
+            'b': {'digest': 'y', 'size': 10, 'last_used': 1},
+            'c': {'digest': 'x', 'size': 10, 'last_used': 2},
+        }
+        source_cache.evict_least_recently_used(index, 10)
+        # `a` and `c` share one file, so evicting `b` is enough
+        self.assertEqual(sorted(index), ['a', 'c'])
+
+    def test_unreadable_index(self):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(os.path.join(CACHE_DIR, source_cache.INDEX_FILE_NAME), 'wb') as file:
+            file.write(b'not a pickle')
+        self.assertEqual(source_cache.load_index(), {})
+        self.assertEqual(self.read(self.url), ETagRequestHandler.content)
+
+
+# pylint: disable=invalid-name
+
+class ETagRequestHandler(http.server.BaseHTTPRequestHandler):
+    content = b''
+    etag = ''
+    full_responses = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        ETagRequestHandler.full_responses += 1
+        self.send_response(200)
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(self.content)))
+        self.end_headers()
+        self.wfile.write(self.content)
@@ -1,8 +1,8 @@
 """This file contains unit tests for functions in `tasks.py`"""
 
-import datetime
 import sys
 import unittest
+from unittest.mock import patch
 
 sys.path.append('.')
 
@@ -10,7 +10,9 @@ sys.path.append('.')
 
 import pandas as pd
 
-from app import tasks
+from app import custom_exceptions as ce
+from app import data_operations as data_op
+from app import registry, tasks
 
 # pylint: disable=missing-class-docstring
 # pylint: disable=missing-function-docstring
@@ -20,123 +22,461 @@ class TestTasks(unittest.TestCase):
         input_data = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature','Low Temperature'],
             data=[
-                ['31/05/2006',datetime.time(9,00),9.3,9.7,9.1],
-                ['31/05/2006',datetime.time(9,10),10.1,10.4,9.7],
-                ['01/06/2006',datetime.time(9,20),10.7,11.0,10.4],
-                ['01/06/2006',datetime.time(9,30),11.2,11.3,10.9],
-                ['02/06/2006',datetime.time(9,40),11.4,11.6,11.3],
-                ['02/06/2006',datetime.time(10,10),18.6,18.6,18.5],
-                ['03/06/2006',datetime.time(10,20),18.4,18.5,18.3],
-                ['03/06/2006',datetime.time(10,30),18.3,18.3,18.2],
-                ['04/06/2006',datetime.time(10,40),18.2,18.3,18.2],
-                ['04/06/2006',datetime.time(10,50),18.4,18.6,18.3]
+                ['31/05/2006',540,9.3,9.7,9.1],
+                ['31/05/2006',550,10.1,10.4,9.7],
+                ['01/06/2006',560,10.7,11.0,10.4],
+                ['01/06/2006',570,11.2,11.3,10.9],
+                ['02/06/2006',580,11.4,11.6,11.3],
+                ['02/06/2006',610,18.6,18.6,18.5],
+                ['03/06/2006',620,18.4,18.5,18.3],
+                ['03/06/2006',630,18.3,18.3,18.2],
+                ['04/06/2006',640,18.2,18.3,18.2],
+                ['04/06/2006',650,18.4,18.6,18.3]
             ]
         )
         output = {}
         expected = {
-            '31/05/2006': {'time': datetime.time(9, 10), 'temp': 10.1},
-            '01/06/2006': {'time': datetime.time(9, 30), 'temp': 11.2},
-            '02/06/2006': {'time': datetime.time(10, 10), 'temp': 18.6},
-            '03/06/2006': {'time': datetime.time(10, 20), 'temp': 18.4},
-            '04/06/2006': {'time': datetime.time(10, 50), 'temp': 18.4}
+            732462: {'time': 550, 'temp': 10.1}, # 31/05/2006
+            732463: {'time': 570, 'temp': 11.2}, # 01/06/2006
+            732464: {'time': 610, 'temp': 18.6}, # 02/06/2006
+            732465: {'time': 620, 'temp': 18.4}, # 03/06/2006
+            732466: {'time': 650, 'temp': 18.4} # 04/06/2006
         }
-        tasks.perform_task_1(input_data, output)
+        data_op.convert_date_col_to_ordinal(input_data)
+        tasks.perform_task_1(data_op.to_columnar_chunk(input_data), output)
         self.assertEqual(output, expected)
 
+    def test_perform_task_1_merges_previous_chunks(self):
+        input_data = pd.DataFrame(
+            columns=['Date','Time','Outside Temperature','Hi Temperature','Low Temperature'],
+            data=[
+                ['01/06/2006',560,12.0,12.0,12.0],
+                ['01/06/2006',570,12.0,12.0,12.0],
+                ['02/06/2006',580,9.0,9.0,9.0],
+                ['03/06/2006',590,7.0,7.0,7.0],
+            ]
+        )
+        output = {
+            732463: {'time': 10, 'temp': 11.0}, # 01/06/2006
+            732464: {'time': 20, 'temp': 15.0}, # 02/06/2006
+        }
+        expected = {
+            732463: {'time': 560, 'temp': 12.0}, # 01/06/2006
+            732464: {'time': 20, 'temp': 15.0}, # 02/06/2006
+            732465: {'time': 590, 'temp': 7.0}, # 03/06/2006
+        }
+        data_op.convert_date_col_to_ordinal(input_data)
+        tasks.perform_task_1(data_op.to_columnar_chunk(input_data), output)
+        self.assertEqual(output, expected)
+        self.assertEqual(list(output), list(expected))
+
     def test_perform_task_2(self):
         input_data = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature','Low Temperature'],
             data=[
-                ['31/05/2006',datetime.time(9,00),9.3,9.7,9.1],
-                ['01/06/2006',datetime.time(9,10),10.1,21.2,9.7],
-                ['01/06/2006',datetime.time(9,20),10.7,21.3,10.4],
-                ['01/06/2006',datetime.time(9,30),11.2,23.3,10.9],
-                ['02/06/2006',datetime.time(9,40),11.4,23.4,11.3],
-                ['02/06/2006',datetime.time(10,10),18.6,18.6,10.0],
-                ['03/06/2006',datetime.time(10,20),18.4,18.5,10.1],
-                ['09/06/2006',datetime.time(10,30),18.3,18.3,10.5],
-                ['09/06/2006',datetime.time(10,40),18.2,18.3,10.6],
-                ['12/06/2006',datetime.time(10,50),18.4,18.6,18.3]
+                ['31/05/2006',540,9.3,9.7,9.1],
+                ['01/06/2006',550,10.1,21.2,9.7],
+                ['01/06/2006',560,10.7,21.3,10.4],
+                ['01/06/2006',570,11.2,23.3,10.9],
+                ['02/06/2006',580,11.4,23.4,11.3],
+                ['02/06/2006',610,18.6,18.6,10.0],
+                ['03/06/2006',620,18.4,18.5,10.1],
+                ['09/06/2006',630,18.3,18.3,10.5],
+                ['09/06/2006',640,18.2,18.3,10.6],
+                ['12/06/2006',650,18.4,18.6,18.3]
             ]
         )
         expected = [
-            ('01/06/2006', '09:20'),
-            ('01/06/2006', '09:30'),
-            ('01/06/2006', '09:20'),
-            ('03/06/2006', '10:20'),
-            ('09/06/2006', '10:30')
+            (732463, 560), # 01/06/2006
+            (732463, 570), # 01/06/2006
+            (732465, 620), # 03/06/2006
+            (732471, 630) # 09/06/2006
         ]
-        output = tasks.perform_task_2(input_data)
+        data_op.convert_date_col_to_ordinal(input_data)
+        output = tasks.perform_task_2(data_op.to_columnar_chunk(input_data))
         self.assertEqual(output, expected)
 
     def test_perform_task_3(self):
         input_data = pd.DataFrame(
             columns=['Date','Time','Outside Temperature','Hi Temperature','Low Temperature'],
             data=[
-                ['31/05/2006',datetime.time(9,00),9.3,9.7,9.1],
-                ['01/06/2006',datetime.time(9,10),10.1,21.2,9.7],
-                ['01/06/2006',datetime.time(9,20),10.7,21.3,10.4],
-                ['01/06/2006',datetime.time(9,30),11.2,23.3,10.9],
-                ['02/06/2006',datetime.time(9,40),11.4,23.4,11.3],
-                ['02/06/2006',datetime.time(10,10),18.6,18.6,10.0],
-                ['03/06/2006',datetime.time(10,20),18.4,18.5,10.1],
-                ['09/06/2006',datetime.time(10,30),18.3,18.3,10.5],
-                ['09/06/2006',datetime.time(10,40),18.2,18.3,10.6],
-                ['12/06/2006',datetime.time(10,50),18.4,18.6,18.3]
+                ['31/05/2006',540,9.3,9.7,9.1],
+                ['01/06/2006',550,10.1,21.2,9.7],
+                ['01/06/2006',560,10.7,21.3,10.4],
+                ['01/06/2006',570,11.2,23.3,10.9],
+                ['02/06/2006',580,11.4,23.4,11.3],
+                ['02/06/2006',610,18.6,18.6,10.0],
+                ['03/06/2006',620,18.4,18.5,10.1],
+                ['09/06/2006',630,18.3,18.3,10.5],
+                ['09/06/2006',640,18.2,18.3,10.6],
+                ['12/06/2006',650,18.4,18.6,18.3]
             ]
         )
         expected = [
-            ('01/07/2006', '09:10', '23.671875'),
-            ('01/07/2006', '09:20', '25.078125'),
-            ('01/07/2006', '09:30', '26.25'),
-            ('02/07/2006', '09:40', '19.0'),
-            ('02/07/2006', '10:10', '31.000000000000004'),
-            ('03/07/2006', '10:20', '25.0'),
-            ('09/07/2006', '10:30', '25.068493150684933'),
-            ('09/07/2006', '10:40', '24.931506849315067')
+            (732493, 550, '23.671875'), # 01/07/2006
+            (732493, 560, '25.078125'), # 01/07/2006
+            (732493, 570, '26.25'), # 01/07/2006
+            (732494, 580, '19.0'), # 02/07/2006
+            (732494, 610, '31.000000000000004'), # 02/07/2006
+            (732495, 620, '25.0'), # 03/07/2006
+            (732501, 630, '25.068493150684933'), # 09/07/2006
+            (732501, 640, '24.931506849315067') # 09/07/2006
         ]
-        output = tasks.perform_task_3(input_data)
+        data_op.convert_date_col_to_ordinal(input_data)
+        output, state = tasks.perform_task_3(data_op.to_columnar_chunk(input_data))
+        self.assertIsNone(state)
         self.assertEqual(output, expected)
 
-    def test_get_avg_time(self):
-        time1 = datetime.time(10,20)
-        time2 = datetime.time(12,50)
-        expected = datetime.time(11, 35)
-        output = tasks.get_avg_time(time1, time2)
-        self.assertEqual(output, expected)
+    def test_perform_task_3_day_split_across_chunks(self):
+        input_data = pd.DataFrame(
+            columns=['Date','Time','Outside Temperature','Hi Temperature','Low Temperature'],
+            data=[
+                ['01/06/2006',550,10.1,21.2,9.7],
+                ['01/06/2006',560,10.7,21.3,10.4],
+                ['01/06/2006',570,11.2,23.3,10.9],
+                ['02/06/2006',580,11.4,23.4,11.3],
+                ['02/06/2006',610,18.6,18.6,10.0],
+            ]
+        )
+        data_op.convert_date_col_to_ordinal(input_data)
+        _, whole_day_state = tasks.perform_task_3(
+            data_op.to_columnar_chunk(input_data.iloc[:3])
+        )
+        whole_day = tasks.finish_task_3(whole_day_state)
+        first_part, state = tasks.perform_task_3(
+            data_op.to_columnar_chunk(input_data.iloc[:2])
+        )
+        self.assertEqual(first_part, [])
+        self.assertEqual(state['Time'].tolist(), [550, 560])
+        second_part, state = tasks.perform_task_3(
+            data_op.to_columnar_chunk(input_data.iloc[2:]), state
+        )
+        self.assertEqual(second_part, whole_day)
+        self.assertEqual(len(whole_day), 3)
+        self.assertEqual(state['Date'].tolist(), [732464, 732464])
+        self.assertEqual(len(tasks.finish_task_3(state)), 2)
+
+    def get_chunk(self, rows):
+        input_data = pd.DataFrame(
+            columns=['Date','Time','Outside Temperature'], data=rows
+        )
+        data_op.convert_date_col_to_ordinal(input_data)
+        return data_op.to_columnar_chunk(input_data)
+
+    def test_task_1_lifecycle(self):
+        first = self.get_chunk([['31/05/2006',540,9.3], ['01/06/2006',560,10.7]])
+        second = self.get_chunk([['01/06/2006',570,11.2], ['02/06/2006',580,8.0]])
+        state = tasks.init_task_1(True)
+        state = tasks.combine_task_1(state, tasks.map_task_1(first))
+        self.assertEqual(list(state['days']), [732463])
+        first_summary, state = tasks.flush_task_1(state, False)
+        # the first day of the source can continue in the previous source
+        self.assertEqual(first_summary['top_days'], [])
+        self.assertEqual(first_summary['edge_days'],
+            {732462: {'time': 540, 'temp': 9.3}})
+        state = tasks.combine_task_1(state, tasks.map_task_1(second))
+        summary, state = tasks.flush_task_1(state, True)
+        self.assertEqual(summary['top_days'], [(11.2, -732463)])
+        self.assertEqual(summary['edge_days'],
+            {732464: {'time': 580, 'temp': 8.0}})
+        self.assertEqual(state['days'], {})
+        merged = tasks.merge_task_1([first_summary, summary])
+        self.assertEqual(sorted(merged['top_days']),
+            [(8.0, -732464), (9.3, -732462), (11.2, -732463)])
+        self.assertEqual(merged['edge_days'], {})
+
+    def test_task_1_date_that_reappears(self):
+        state = tasks.init_task_1(True)
+        state = tasks.combine_task_1(state, tasks.map_task_1(self.get_chunk(
+            [['31/05/2006',540,9.3], ['01/06/2006',560,10.7]]
+        )))
+        # a day before the open one is summarized once it is complete
+        state = tasks.combine_task_1(state, tasks.map_task_1(self.get_chunk(
+            [['02/06/2006',570,11.2], ['01/06/2006',580,12.0]]
+        )))
+        self.assertEqual(list(state['days']), [732464])
+        self.assertEqual(state['summary']['top_days'], [(12.0, -732463)])
+        summary, state = tasks.flush_task_1(state, False)
+        with self.assertRaises(ce.InvalidFormatError):
+            tasks.combine_task_1(state, tasks.map_task_1(self.get_chunk(
+                [['01/06/2006',590,20.0]]
+            )))
+
+    def test_task_1_lifecycle_out_of_order(self):
+        state = tasks.init_task_1(False)
+        state = tasks.combine_task_1(state, tasks.map_task_1(self.get_chunk(
+            [['31/05/2006',540,9.3], ['01/06/2006',560,10.7]]
+        )))
+        summary, state = tasks.flush_task_1(state, False)
+        # a day can continue in any later chunk, so no day is complete
+        self.assertEqual(summary['top_days'], [])
+        self.assertEqual(list(state['days']), [732462, 732463])
+
+    def test_map_task_1_is_per_chunk(self):
+        chunk = self.get_chunk([['31/05/2006',540,9.3], ['31/05/2006',550,9.3]])
+        self.assertEqual(tasks.map_task_1(chunk), {732462: {'time': 540, 'temp': 9.3}})
+
+    def test_combine_day_maxima_keeps_first_max(self):
+        days = {732462: {'time': 540, 'temp': 9.3}}
+        partial = {
+            732462: {'time': 600, 'temp': 9.3},
+            732463: {'time': 10, 'temp': 8.0},
+        }
+        output = tasks.combine_day_maxima(days, partial)
+        self.assertEqual(output, {
+            732462: {'time': 540, 'temp': 9.3},
+            732463: {'time': 10, 'temp': 8.0},
+        })
+
+    def test_task_3_lifecycle(self):
+        state = tasks.init_task_3(True)
+        state = tasks.combine_task_3(state, tasks.map_task_3(self.get_chunk(
+            [['01/06/2006',0,10.0], ['01/06/2006',10,12.0]]
+        )))
+        result, state = tasks.flush_task_3(state, False)
+        self.assertEqual(result, {'rows': [], 'edge_days': {}})
+        result, state = tasks.flush_task_3(state, True)
+        # the only day of the source can continue in other sources
+        self.assertEqual(list(result['edge_days']), [732463])
+        self.assertEqual([row[:2] for row in tasks.merge_task_3([result])],
+            [(732493, 0), (732493, 10)])
+        self.assertEqual(state['rows'], None)
+
+    def test_task_3_lifecycle_out_of_order(self):
+        rows = [
+            ['31/05/2006',1430,9.0], ['01/06/2006',0,10.0],
+            ['01/06/2006',10,12.0], ['02/06/2006',0,11.0],
+            ['02/06/2006',10,13.0], ['03/06/2006',0,14.0],
+            ['03/06/2006',10,15.0], ['04/06/2006',0,16.0],
+        ]
+        expected, state = tasks.perform_task_3(self.get_chunk(rows))
+        expected = sorted(expected + tasks.finish_task_3(state))
+        for size in [1, 3]:
+            chunks = [rows[start:start+size] for start in range(0, len(rows), size)]
+            state = tasks.init_task_3(False)
+            # the days split across chunks arrive in reverse order
+            for chunk in reversed(chunks):
+                state = tasks.combine_task_3(
+                    state, tasks.map_task_3(self.get_chunk(chunk))
+                )
+            result, state = tasks.flush_task_3(state, False)
+            # a day can continue in any later chunk, so it is not forecasted
+            self.assertLess(len(result['rows']), len(expected))
+            self.assertTrue(state['days'])
+            remaining, state = tasks.flush_task_3(state, True)
+            # the first and the last day can continue in other sources
+            self.assertEqual(list(remaining['edge_days']), [732463, 732466])
+            # the forecasts of the open days are written in order
+            self.assertEqual(tasks.merge_task_3([result, remaining]), expected)
+            self.assertEqual(state, tasks.init_task_3(False))
+
+    def test_task_3_partials_match_serial_chunks(self):
+        rows = [
+            ['31/05/2006',1430,9.0], ['01/06/2006',0,10.0],
+            ['01/06/2006',10,12.0], ['02/06/2006',0,11.0],
+            ['02/06/2006',10,13.0], ['03/06/2006',0,14.0],
+        ]
+        expected = tasks.finish_task_3(
+            tasks.perform_task_3(self.get_chunk(rows))[1]
+        )
+        expected = tasks.perform_task_3(self.get_chunk(rows))[0] + expected
+        for size in [1, 2, 4]:
+            state = tasks.init_task_3(True)
+            # the partials of all the chunks are mapped before combining
+            partials = [
+                tasks.map_task_3(self.get_chunk(rows[start:start+size]))
+                for start in range(0, len(rows), size)
+            ]
+            for partial in partials:
+                state = tasks.combine_task_3(state, partial)
+            result, _ = tasks.flush_task_3(state, True)
+            self.assertEqual(tasks.merge_task_3([result]), expected)
+
+    def test_compact_chunks_give_the_same_output(self):
+        rows = [
+            [f'{day:02d}/06/2006', f'{hour:02d}:{minute:02d}',
+             str(round(8.3 + (day * 7 + hour * 3 + minute) % 97 / 10, 1))]
+            for day in range(1, 4) for hour in range(24) for minute in [0, 30]
+        ]
+        outputs = []
+        for compact in [False, True]:
+            with patch('app.config.COMPACT', compact):
+                chunk = data_op.transform_data(pd.DataFrame(
+                    columns=['Date', 'Time', 'Outside Temperature'], data=rows
+                ))
+            lines = {}
+            for name in ['task1', 'task3']:
+                task = registry.get_task(name)
+                state = task['update'](task['init'](True), chunk)
+                result, _ = task['flush'](state, True)
+                lines[name] = list(task['finalize'](task['merge']([result])))
+            outputs.append(lines)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_finalize_rows_in_batches(self):
+        rows = [(732463, minute) for minute in range(5)]
+        with patch('app.config.CHUNK_ROWS', 2):
+            output = list(tasks.finalize_rows(tasks.merge_rows([rows[:3], rows[3:]]), 2))
+        self.assertEqual(output, [f'01/06/2006 00:0{minute}' for minute in range(5)])
+
+    def get_summary(self, days, top_count=10):
+        summary = tasks.new_task_1_summary(top_count)
+        tasks.update_task_1_summary(summary, days)
+        return summary
+
+    def test_update_task_1_summary(self):
+        input_data = {
+            732462: {'time': 880, 'temp': 15.5}, # 31/05/2006
+            732463: {'time': 900, 'temp': 17.2}, # 01/06/2006
+            732464: {'time': 900, 'temp': 17.7}, # 02/06/2006
+        }
+        output = self.get_summary(input_data, 2)
+        self.assertEqual(output['month_minutes'],
+            {(2006, 5): [880, 1], (2006, 6): [1800, 2]})
+        self.assertEqual(output['hottest_times'],
+            {880: [1, 732462], 900: [2, 732463]})
+        self.assertEqual(sorted(output['top_days']),
+            [(17.2, -732463), (17.7, -732464)])
+
+    def test_update_task_1_summary_invalid_days(self):
+        with self.assertRaises(ce.InvalidFormatError):
+            self.get_summary({'01/06/2006': {'time': 900, 'temp': 17.2}})
+
+    def test_summarize_complete_days(self):
+        input_data = {
+            732462: {'time': 880, 'temp': 15.5}, # 31/05/2006
+            732463: {'time': 900, 'temp': 17.2}, # 01/06/2006
+        }
+        summary = tasks.new_task_1_summary(10)
+        open_days = tasks.summarize_complete_days(summary, input_data)
+        self.assertEqual(open_days, {732463: {'time': 900, 'temp': 17.2}})
+        self.assertEqual(summary['top_days'], [(15.5, -732462)])
+
+    def test_merge_task_1_summaries(self):
+        days = {
+            732462: {'time': 880, 'temp': 15.5}, # 31/05/2006
+            732463: {'time': 900, 'temp': 17.2}, # 01/06/2006
+            732464: {'time': 800, 'temp': 17.7}, # 02/06/2006
+            732465: {'time': 890, 'temp': 19.6}, # 03/06/2006
+        }
+        whole = self.get_summary(days, 3)
+        first = self.get_summary(dict(list(days.items())[:2]), 3)
+        second = self.get_summary(dict(list(days.items())[2:]), 3)
+        output = tasks.merge_task_1_summaries([second, first], 3)
+        self.assertEqual(output['month_minutes'], whole['month_minutes'])
+        self.assertEqual(output['hottest_times'], whole['hottest_times'])
+        self.assertEqual(sorted(output['top_days']), sorted(whole['top_days']))
+
+    def test_merge_task_1_summaries_split_day(self):
+        # a day that is split between two sources is counted once
+        first = self.get_summary({732462: {'time': 900, 'temp': 15.0}})
+        first['edge_days'] = {732463: {'time': 900, 'temp': 17.2}}
+        second = self.get_summary({732464: {'time': 800, 'temp': 16.0}})
+        second['edge_days'] = {732463: {'time': 800, 'temp': 18.1}}
+        output = tasks.merge_task_1_summaries([first, second], 10)
+        self.assertEqual(sorted(output['top_days']),
+            [(15.0, -732462), (16.0, -732464), (18.1, -732463)])
+        self.assertEqual(output['month_minutes'],
+            {(2006, 5): [900, 1], (2006, 6): [1600, 2]})
+        self.assertEqual(output['edge_days'], {})
+
+    def test_sources_that_split_a_day(self):
+        rows = [
+            [f'{day:02d}/06/2006', minute, float((day * 7 + minute) % 11)]
+            for day in range(1, 4) for minute in range(0, 1440, 180)
+        ]
+        outputs = []
+        # one source, and the same rows split into sources at noon
+        for sources in [[rows], [rows[:12], rows[12:]], [rows[:3], rows[3:]]]:
+            lines = {}
+            for name in ['task1', 'task3']:
+                task = registry.get_task(name)
+                results = []
+                for source in sources:
+                    state = task['init'](True)
+                    for start in range(0, len(source), 5):
+                        state = task['combine'](state, task['map'](
+                            self.get_chunk(source[start:start+5])
+                        ))
+                    results.append(task['flush'](state, True)[0])
+                lines[name] = list(task['finalize'](task['merge'](results)))
+            outputs.append(lines)
+        self.assertEqual(outputs[1], outputs[0])
+        self.assertEqual(outputs[2], outputs[0])
+
+    def test_push_top_days(self):
+        top_days = []
+        tasks.push_top_days(top_days, [(15.5, -2), (17.2, -3), (15.5, -1)], 2)
+        tasks.push_top_days(top_days, [(15.5, -4), (17.7, -5)], 2)
+        self.assertEqual(sorted(top_days, reverse=True), [(17.7, -5), (17.2, -3)])
+
+    def test_merged_top_days_match_full_sort(self):
+        # temperatures with many ties, split into unordered partial
+        # summaries of three sizes
+        days = {
+            732400 + ind: {'time': 600, 'temp': float(ind * 7 % 13)}
+            for ind in range(200)
+        }
+        expected = sorted(
+            ((str(val['temp']), day) for day, val in days.items()),
+            key=lambda ele: (-float(ele[0]), ele[1]),
+        )[:10]
+        expected = [(temp, data_op.ordinal_to_date(day)) for temp, day in expected]
+        items = list(days.items())
+        for size in [1, 7, 64]:
+            summaries = [
+                self.get_summary(dict(items[start:start+size]))
+                for start in reversed(range(0, len(items), size))
+            ]
+            output = tasks.top_hottest_times(
+                tasks.merge_task_1_summaries(summaries, 10)
+            )
+            self.assertEqual(output, expected)
 
     def test_avg_time_of_hottest_daily_temp(self):
         input_data = {
-            '31/05/2006': {'time': '14:40:00', 'temp': 15.5},
-            '01/06/2006': {'time': '15:00:00', 'temp': 17.2},
-            '02/06/2006': {'time': '13:20:00', 'temp': 17.7},
-            '03/06/2006': {'time': '14:50:00', 'temp': 19.6},
+            732462: {'time': 880, 'temp': 15.5}, # 31/05/2006
+            732463: {'time': 900, 'temp': 17.2}, # 01/06/2006
+            732464: {'time': 800, 'temp': 17.7}, # 02/06/2006
+            732465: {'time': 890, 'temp': 19.6}, # 03/06/2006
         }
-        expected = [('05/2006', '14:40'), ('06/2006', '14:30')]
-        output = tasks.avg_time_of_hottest_daily_temp(input_data)
+        expected = [('05/2006', '14:40'), ('06/2006', '14:23')]
+        output = tasks.avg_time_of_hottest_daily_temp(self.get_summary(input_data))
         self.assertEqual(output, expected)
 
     def test_hottest_time_with_hightest_freq(self):
         input_data = {
-            '31/05/2006': {'time': '14:40:00', 'temp': 15.5},
-            '01/06/2006': {'time': '15:00:00', 'temp': 17.2},
-            '02/06/2006': {'time': '13:20:00', 'temp': 17.7},
-            '03/06/2006': {'time': '14:50:00', 'temp': 19.6},
+            732462: {'time': 880, 'temp': 15.5}, # 31/05/2006
+            732463: {'time': 900, 'temp': 17.2}, # 01/06/2006
+            732464: {'time': 800, 'temp': 17.7}, # 02/06/2006
+            732465: {'time': 890, 'temp': 19.6}, # 03/06/2006
         }
         expected = '14:40'
-        output = tasks.hottest_time_with_hightest_freq(input_data)
+        output = tasks.hottest_time_with_hightest_freq(self.get_summary(input_data))
         self.assertEqual(output, expected)
 
+    def test_hottest_time_with_hightest_freq_no_days(self):
+        output = tasks.hottest_time_with_hightest_freq(self.get_summary({}))
+        self.assertEqual(output, '')
+
     def test_top_hottest_times(self):
         input_data = {
-            '31/05/2006': {'time': datetime.time(14, 40), 'temp': 15.5},
-            '01/06/2006': {'time': datetime.time(15, 0), 'temp': 17.2},
-            '02/06/2006': {'time': datetime.time(13, 20), 'temp': 17.7},
-            '03/06/2006': {'time': datetime.time(14, 50), 'temp': 19.6},
+            732462: {'time': 880, 'temp': 15.5}, # 31/05/2006
+            732463: {'time': 900, 'temp': 17.2}, # 01/06/2006
+            732464: {'time': 800, 'temp': 17.7}, # 02/06/2006
+            732465: {'time': 890, 'temp': 19.6}, # 03/06/2006
         }
         expected = [('19.6', '03/06/2006'), ('17.7', '02/06/2006'),
                 ('17.2', '01/06/2006'), ('15.5', '31/05/2006')]
-        output = tasks.top_hottest_times(
-            input_data, 10
-        )
+        output = tasks.top_hottest_times(self.get_summary(input_data))
+        self.assertEqual(output, expected)
+
+    def test_top_hottest_times_ties_in_date_order(self):
+        input_data = {
+            732524: {'time': 880, 'temp': 20.0}, # 01/08/2006
+            732494: {'time': 900, 'temp': 20.0}, # 02/07/2006
+            732495: {'time': 900, 'temp': 20.0}, # 03/07/2006
+        }
+        expected = [('20.0', '02/07/2006'), ('20.0', '03/07/2006')]
+        output = tasks.top_hottest_times(self.get_summary(input_data, 2))
         self.assertEqual(output, expected)
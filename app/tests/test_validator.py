@@ -17,15 +17,16 @@ class TestValidator(unittest.TestCase):
 
     def test_check_task_1_dict_format(self):
         valid_inp = {
-            '01/06/2006': {'temp': 17.2, 'time': '15:00:00'},
-            '01/07/2006': {'temp': 16.0, 'time': '08:50:00'},
+            732463: {'temp': 17.2, 'time': 900}, # 01/06/2006
+            732493: {'temp': 16.0, 'time': 530}, # 01/07/2006
         }
         invalid_inp_1 = []
-        invalid_inp_2 = {1: {'temp': 17.2, 'time': '15:00:00'}}
-        invalid_inp_3 = {'01/06/2006': [1,2,3]}
-        invalid_inp_4 = {'01/06/2006': {'a': 17.2, 'b': '15:00:00'}}
-        invalid_inp_5 = {'1': {'temp': 'abc', 'time': '15:00:00'}}
-        invalid_inp_6 = {'1': {'temp': 17.2, 'time': '15:00'}}
+        invalid_inp_2 = {'01/06/2006': {'temp': 17.2, 'time': 900}}
+        invalid_inp_3 = {732463: [1,2,3]}
+        invalid_inp_4 = {732463: {'a': 17.2, 'b': 900}}
+        invalid_inp_5 = {1: {'temp': 'abc', 'time': 900}}
+        invalid_inp_6 = {1: {'temp': 17.2, 'time': '15:00'}}
+        invalid_inp_7 = {1: {'temp': 17.2, 'time': 1440}}
 
         test_cases = [
             # case: input has expected format
@@ -34,7 +35,7 @@ class TestValidator(unittest.TestCase):
             # case: invalid format: not instance of dict
             (invalid_inp_1, ce.InvalidFormatError),
 
-            # case: invalid format: key not str
+            # case: invalid format: key not a day ordinal
             (invalid_inp_2, ce.InvalidFormatError),
 
             # case: invalid format: dict value not dict
@@ -49,6 +50,9 @@ class TestValidator(unittest.TestCase):
             # case: invalid format: value of key 'time' is not as expected
             (invalid_inp_6, ce.InvalidFormatError),
 
+            # case: invalid format: value of key 'time' is not in a day
+            (invalid_inp_7, ce.InvalidFormatError),
+
         ]
         for cols, expected in test_cases:
             with self.subTest(cols=cols, expected=expected):
@@ -2,7 +2,6 @@
 Contains functions that perform validation on data, argument values, etc
 """
 
-import datetime
 import numbers
 import os
 import typing as ty
@@ -18,9 +17,11 @@ def check_task_1_dict_format(task_1_output: ty.Dict) -> None:
     Checks task 1 output dictionary where each element of the dictionary
     is expected of the format:
         {
-            '01/06/2006': {'temp': 17.2, 'time': '15:00:00')},
-            '01/07/2006': {'temp': 16.0, 'time': '08:50:00')},
+            732463: {'temp': 17.2, 'time': 900},
+            732493: {'temp': 16.0, 'time': 530},
         }
+    where the keys are day ordinals, i.e. 732463 is 01/06/2006, and
+    'time' is in minutes of the day, i.e. 900 is 15:00
 
     Args:
         task_1_output (dict): output of task 1
@@ -37,10 +38,10 @@ def check_task_1_dict_format(task_1_output: ty.Dict) -> None:
             )
 
     for key in task_1_output:
-        if not isinstance(key, str):
+        if not isinstance(key, numbers.Integral):
             raise ce.InvalidFormatError(
                 'Expected the key of Task 1 output dictionaries '
-                f'to be of type `str` but it is `{type(key)}`'
+                f'to be a day ordinal but it is `{type(key)}`'
             )
 
         if not isinstance(task_1_output[key], dict):
@@ -63,14 +64,74 @@ def check_task_1_dict_format(task_1_output: ty.Dict) -> None:
                 f'`{task_1_output[key]["temp"]}`'
             )
 
-        try:
-            datetime.datetime.strptime(task_1_output[key]["time"], "%H:%M:%S")
-        except ValueError as err:
+        time_val = task_1_output[key]['time']
+        if not isinstance(time_val, numbers.Integral) or \
+                not 0 <= time_val < config.MINUTES_PER_DAY:
             raise ce.InvalidFormatError(
                 'Expected the value of "time" key in Task 1 output '
-                'dictionary elements be of type HH:MM:SS but it is of '
-                f'type `{task_1_output[key]["time"]}`'
-            ) from err
+                'dictionary elements be the minutes of the day but it is '
+                f'`{time_val}`'
+            )
+
+@decorators.log_method
+def check_task_1_summary_format(summary: ty.Dict) -> None:
+    """
+    Checks a summary of task 1 results (see
+    `tasks.new_task_1_summary`), expected of the format:
+        {
+            'top_count': 10,
+            'month_minutes': {(2006, 6): [1770, 2]},
+            'hottest_times': {900: [1, 732463], 870: [1, 732464]},
+            'top_days': [(16.0, -732464), (17.2, -732463)],
+            'edge_days': {732465: {'temp': 15.1, 'time': 840}},
+        }
+
+    Args:
+        summary (dict): summary of task 1 results
+
+    Raises:
+        - `InvalidFormatError` exception if the summary is not in the
+        expected format
+    """
+
+    expected_keys = {
+        'top_count', 'month_minutes', 'hottest_times', 'top_days', 'edge_days'
+    }
+    if not isinstance(summary, dict) or set(summary.keys()) != expected_keys:
+        raise ce.InvalidFormatError(
+                'Expected the summary of Task 1 results to be a `dict` '
+                f'with keys `{expected_keys}` but got `{summary}` instead'
+            )
+
+    if len(summary['top_days']) > summary['top_count']:
+        raise ce.InvalidFormatError(
+                'Expected at most `top_count` top days in the summary of '
+                f'Task 1 results but got {len(summary["top_days"])}'
+            )
+
+@decorators.log_method
+def check_checkpoint_format(checkpoint: ty.Any, file_name: str) -> None:
+    """
+    Checks the contents of the checkpoint of a task (see
+    `file_operations.save_checkpoints`), expected of the format:
+        {'result': ..., 'state': ...}
+
+    Args:
+        checkpoint (Any): the unpickled contents of the checkpoint
+        file_name (str): name of the checkpoint file, for the error
+
+    Raises:
+        - `InvalidFormatError` exception if the checkpoint is not in the
+        expected format, eg: a checkpoint saved by an older version
+    """
+
+    expected_keys = {'result', 'state'}
+    if not isinstance(checkpoint, dict) or set(checkpoint) != expected_keys:
+        raise ce.InvalidFormatError(
+                f'Expected the checkpoint `{file_name}` to be a `dict` with '
+                f'keys `{expected_keys}` but got `{type(checkpoint)}` '
+                'instead. Checkpoints of an older version are not supported'
+            )
 
 @decorators.log_method
 def check_for_expected_columns(column_names: ty.List) -> None:
@@ -95,6 +156,25 @@ def check_for_expected_columns(column_names: ty.List) -> None:
                 f'Fetched columns: {column_names}'
             )
 
+@decorators.log_method
+def check_file_name(file_name: str) -> None:
+    """
+    Checks the name of the checkpoint and output files of a task, which
+    must not contain a '-', as it separates the parts of the names of
+    the checkpoint files (see `file_operations.get_checkpoint_name`)
+
+    Args:
+        file_name (str): the file name, eg: 'task1'
+
+    Raises:
+        - `InvalidConfigError` if the file name is empty or contains a '-'
+    """
+
+    if not file_name or '-' in file_name:
+        raise ce.InvalidConfigError(
+            f'Expected a task file name without a `-` but got `{file_name}`'
+        )
+
 @decorators.log_method
 def validate_dir_path(path: str) -> None:
     """